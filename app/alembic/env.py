@@ -15,7 +15,7 @@ load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), "..", ".env"))
 
 # Lấy metadata từ models
 from app.core.database import Base
-from app.models import User, RefreshToken, VideoScript, Scene, VoiceAudio, SceneImage
+from app.models import User, RefreshToken, VideoScript, Scene, VoiceAudio, SceneImage, ScriptBatchJob, ScriptBatchItem
 from app.core.config import get_settings
 
 # Alembic config object
@@ -0,0 +1,30 @@
+"""add prediction_id to scene_images
+
+Revision ID: 8c3d5e1a9b42
+Revises: 24177c6ec161
+Create Date: 2026-10-18 09:12:40.118203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8c3d5e1a9b42'
+down_revision: Union[str, None] = '24177c6ec161'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('scene_images', sa.Column('prediction_id', sa.String(length=64), nullable=True))
+    op.create_index(op.f('ix_scene_images_prediction_id'), 'scene_images', ['prediction_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_scene_images_prediction_id'), table_name='scene_images')
+    op.drop_column('scene_images', 'prediction_id')
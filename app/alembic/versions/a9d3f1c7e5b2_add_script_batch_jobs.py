@@ -0,0 +1,55 @@
+"""add script batch jobs
+
+Revision ID: a9d3f1c7e5b2
+Revises: f2c6a8d4b1e3
+Create Date: 2026-10-18 22:41:09.318254
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a9d3f1c7e5b2'
+down_revision: Union[str, None] = 'f2c6a8d4b1e3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'script_batch_jobs',
+        sa.Column('id', sa.String(length=36), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('total', sa.Integer(), nullable=False),
+        sa.Column('completed', sa.Integer(), nullable=False),
+        sa.Column('failed', sa.Integer(), nullable=False),
+        sa.Column('duplicates_skipped', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table(
+        'script_batch_items',
+        sa.Column('id', sa.String(length=36), nullable=False),
+        sa.Column('job_id', sa.String(length=36), nullable=False),
+        sa.Column('position', sa.Integer(), nullable=False),
+        sa.Column('topic', sa.Text(), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('script_id', sa.String(length=36), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.ForeignKeyConstraint(['job_id'], ['script_batch_jobs.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['script_id'], ['video_scripts.id'], ondelete='SET NULL'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_script_batch_items_job_id_position', 'script_batch_items', ['job_id', 'position'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_script_batch_items_job_id_position', table_name='script_batch_items')
+    op.drop_table('script_batch_items')
+    op.drop_table('script_batch_jobs')
@@ -0,0 +1,28 @@
+"""add duration_ms to voice_audios
+
+Revision ID: b7e2f4a1c9d3
+Revises: 8c3d5e1a9b42
+Create Date: 2026-10-18 14:03:27.519844
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e2f4a1c9d3'
+down_revision: Union[str, None] = '8c3d5e1a9b42'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('voice_audios', sa.Column('duration_ms', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('voice_audios', 'duration_ms')
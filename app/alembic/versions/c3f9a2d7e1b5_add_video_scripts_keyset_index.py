@@ -0,0 +1,33 @@
+"""add keyset pagination index to video_scripts
+
+Revision ID: c3f9a2d7e1b5
+Revises: b7e2f4a1c9d3
+Create Date: 2026-10-18 16:41:08.362915
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3f9a2d7e1b5'
+down_revision: Union[str, None] = 'b7e2f4a1c9d3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        'ix_video_scripts_creator_status_created_id',
+        'video_scripts',
+        ['creator_id', 'status', 'created_at', 'id'],
+        unique=False
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_video_scripts_creator_status_created_id', table_name='video_scripts')
@@ -0,0 +1,39 @@
+"""add indexes on foreign keys and filter columns
+
+Revision ID: d5a8e3b2f7c4
+Revises: c3f9a2d7e1b5
+Create Date: 2026-10-18 17:20:45.904117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd5a8e3b2f7c4'
+down_revision: Union[str, None] = 'c3f9a2d7e1b5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # video_scripts.creator_id dùng index (creator_id, status, created_at, id) của c3f9a2d7e1b5
+    op.create_index(op.f('ix_video_scripts_status'), 'video_scripts', ['status'], unique=False)
+    op.create_index('ix_video_scripts_created_id', 'video_scripts', ['created_at', 'id'], unique=False)
+    op.create_index('ix_scenes_script_id_scene_number', 'scenes', ['script_id', 'scene_number'], unique=False)
+    op.create_index(op.f('ix_scene_images_scene_id'), 'scene_images', ['scene_id'], unique=False)
+    op.create_index('ix_scene_images_status_created_at', 'scene_images', ['status', 'created_at'], unique=False)
+    op.create_index('ix_voice_audios_scene_id_created_at', 'voice_audios', ['scene_id', 'created_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_voice_audios_scene_id_created_at', table_name='voice_audios')
+    op.drop_index('ix_scene_images_status_created_at', table_name='scene_images')
+    op.drop_index(op.f('ix_scene_images_scene_id'), table_name='scene_images')
+    op.drop_index('ix_scenes_script_id_scene_number', table_name='scenes')
+    op.drop_index('ix_video_scripts_created_id', table_name='video_scripts')
+    op.drop_index(op.f('ix_video_scripts_status'), table_name='video_scripts')
@@ -0,0 +1,42 @@
+"""make video_scripts.created_at not null
+
+Revision ID: e7b1c4d9a2f6
+Revises: d5a8e3b2f7c4
+Create Date: 2026-10-18 19:05:12.417390
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7b1c4d9a2f6'
+down_revision: Union[str, None] = 'd5a8e3b2f7c4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Phân trang keyset mã hóa created_at vào cursor: bản ghi cũ thiếu created_at lấy updated_at hoặc thời điểm hiện tại
+    op.execute("UPDATE video_scripts SET created_at = COALESCE(updated_at, now()) WHERE created_at IS NULL")
+    op.alter_column(
+        'video_scripts',
+        'created_at',
+        existing_type=sa.DateTime(timezone=True),
+        existing_server_default=sa.text('now()'),
+        nullable=False
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.alter_column(
+        'video_scripts',
+        'created_at',
+        existing_type=sa.DateTime(timezone=True),
+        existing_server_default=sa.text('now()'),
+        nullable=True
+    )
@@ -0,0 +1,34 @@
+"""add generation parameters to scene_images
+
+Revision ID: f2c6a8d4b1e3
+Revises: e7b1c4d9a2f6
+Create Date: 2026-10-18 20:14:37.552801
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2c6a8d4b1e3'
+down_revision: Union[str, None] = 'e7b1c4d9a2f6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('scene_images', sa.Column('negative_prompt', sa.Text(), nullable=True))
+    op.add_column('scene_images', sa.Column('num_inference_steps', sa.Integer(), nullable=True))
+    op.add_column('scene_images', sa.Column('guidance_scale', sa.Float(), nullable=True))
+    op.add_column('scene_images', sa.Column('seed', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('scene_images', 'seed')
+    op.drop_column('scene_images', 'guidance_scale')
+    op.drop_column('scene_images', 'num_inference_steps')
+    op.drop_column('scene_images', 'negative_prompt')
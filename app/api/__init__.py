@@ -1,5 +1,5 @@
 from fastapi import APIRouter
-from app.api import user, auth, video_script, voice, image, video_search, project_manager
+from app.api import user, auth, video_script, voice, image, video_search, project_manager, metrics, media
 
 api_router = APIRouter()
 api_router.include_router(user.router, prefix="/users", tags=["users"])
@@ -8,4 +8,6 @@ api_router.include_router(video_script.router, prefix="/video-scripts", tags=["v
 api_router.include_router(voice.router, prefix="/voice", tags=["voice"])
 api_router.include_router(image.router, prefix="/images", tags=["images"])
 api_router.include_router(video_search.router, prefix="/search", tags=["search"])
-api_router.include_router(project_manager.router, prefix="/project-manager", tags=["project-manager"]) 
\ No newline at end of file
+api_router.include_router(project_manager.router, prefix="/project-manager", tags=["project-manager"])
+api_router.include_router(metrics.router, prefix="/metrics", tags=["metrics"])
+api_router.include_router(media.router, prefix="/media", tags=["media"])
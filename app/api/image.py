@@ -1,6 +1,12 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request
 from sqlalchemy.orm import Session
-from app.services.image_generation_service import ImageGenerationService
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.services.image_generation_service import (
+    ImageGenerationService, DEFAULT_GUIDANCE_SCALE, DEFAULT_NEGATIVE_PROMPT, DEFAULT_NUM_INFERENCE_STEPS
+)
+from app.services.prediction_tracker import (
+    PredictionPoller, apply_prediction_update, verify_webhook_signature, webhook_signing_key
+)
 from app.schemas.image import (
     ImageGenerationRequest, 
     ImageGenerationResponse, 
@@ -8,15 +14,26 @@ from app.schemas.image import (
     UpdateSceneImageRequest
 )
 from app.database import get_db
-from app.crud.video_script import get_scene, get_script
+from app.core.database import get_async_db
+from app.core.config import get_settings
+from app.crud.video_script import get_scene, get_script, create_scene_images_bulk, WITH_SCENE_IMAGES
+from app.crud import video_script_async as async_crud
 from app.models.video_script import SceneImage, MediaStatus, ScriptStatus
-from typing import List
+from typing import List, Optional
 import os
 import tempfile
 import shutil
+import asyncio
+import logging
+import uuid
 
+logger = logging.getLogger(__name__)
 router = APIRouter()
+settings = get_settings()
 image_service = ImageGenerationService()
+prediction_poller = PredictionPoller(image_service)
+# Giải mã secret một lần khi khởi động: secret sai định dạng làm ứng dụng dừng ngay thay vì trả 500 ở mỗi webhook
+webhook_key = webhook_signing_key(settings.REPLICATE_WEBHOOK_SECRET) if settings.REPLICATE_WEBHOOK_SECRET else None
 
 @router.post("/generate", response_model=ImageGenerationResponse)
 async def generate_image(request: ImageGenerationRequest, db: Session = Depends(get_db)):
@@ -42,7 +59,13 @@ async def generate_image(request: ImageGenerationRequest, db: Session = Depends(
 
         try:
             # Tạo hình ảnh từ prompt
-            image_url = image_service.generate_image(prompt)
+            image_url = await image_service.generate_image_async(
+                prompt,
+                width=request.width,
+                height=request.height,
+                seed=request.seed,
+                force_new=request.force_new_variation
+            )
             if not image_url:
                 scene.image_status = MediaStatus.FAILED
                 db.commit()
@@ -55,6 +78,7 @@ async def generate_image(request: ImageGenerationRequest, db: Session = Depends(
                 prompt=prompt,
                 width=request.width,
                 height=request.height,
+                seed=request.seed,
                 status=MediaStatus.COMPLETED
             )
             db.add(scene_image)
@@ -74,67 +98,253 @@ async def generate_image(request: ImageGenerationRequest, db: Session = Depends(
         db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
+def _webhook_url() -> Optional[str]:
+    """
+    URL webhook gửi kèm prediction. Chỉ đăng ký khi có REPLICATE_WEBHOOK_SECRET để xác thực
+    được chữ ký; không có secret thì poller nền là đường cập nhật kết quả duy nhất
+    """
+    if not settings.REPLICATE_WEBHOOK_URL:
+        return None
+    if not settings.REPLICATE_WEBHOOK_SECRET:
+        logger.warning("REPLICATE_WEBHOOK_URL is set without REPLICATE_WEBHOOK_SECRET; webhook disabled, using poller")
+        return None
+    return settings.REPLICATE_WEBHOOK_URL
+
+async def _submit_scene_image(
+    scene_id: str,
+    prompt: str,
+    width: int = 1024,
+    height: int = 768,
+    seed: Optional[int] = None,
+    force_new: bool = False
+) -> SceneImage:
+    """Tạo SceneImage từ cache nếu có, nếu không thì gửi prediction lên Replicate và trả về bản ghi PROCESSING"""
+    cached_url = None if force_new else image_service.get_cached_image(prompt, width, height, seed=seed)
+    scene_image = SceneImage(
+        id=str(uuid.uuid4()),
+        scene_id=scene_id,
+        prompt=prompt,
+        width=width,
+        height=height,
+        # Tham số submit_prediction dùng: khi prediction xong ảnh được cache đúng khóa của chúng
+        negative_prompt=DEFAULT_NEGATIVE_PROMPT,
+        num_inference_steps=DEFAULT_NUM_INFERENCE_STEPS,
+        guidance_scale=DEFAULT_GUIDANCE_SCALE,
+        seed=seed
+    )
+    if cached_url:
+        scene_image.image_url = cached_url
+        scene_image.status = MediaStatus.COMPLETED.value
+    else:
+        prediction = await image_service.submit_prediction_async(
+            prompt, width, height, seed, _webhook_url()
+        )
+        scene_image.prediction_id = prediction.id
+        scene_image.status = MediaStatus.PROCESSING.value
+    return scene_image
+
+def _image_response(scene_image: SceneImage, scene_number: int) -> ImageGenerationResponse:
+    return ImageGenerationResponse(
+        id=scene_image.id,
+        scene_id=scene_image.scene_id,
+        image_url=scene_image.image_url,
+        prompt=scene_image.prompt,
+        width=scene_image.width,
+        height=scene_image.height,
+        status=scene_image.status,
+        scene_number=scene_number
+    )
+
+@router.post("/submit", response_model=ImageGenerationResponse, status_code=202)
+async def submit_image(request: ImageGenerationRequest, db: Session = Depends(get_db)):
+    """
+    Gửi yêu cầu tạo hình ảnh cho scene và trả về ngay với trạng thái processing.
+    Kết quả được cập nhật qua webhook hoặc poller nền
+    """
+    try:
+        scene = get_scene(db, request.scene_id)
+        if not scene:
+            raise HTTPException(status_code=404, detail="Scene not found")
+
+        prompt = request.prompt or scene.visual_elements
+        if not prompt:
+            raise HTTPException(status_code=400, detail="No prompt provided and scene has no visual elements")
+
+        scene_number = scene.scene_number
+        scene_image = await _submit_scene_image(
+            scene.id, prompt, request.width, request.height, request.seed, request.force_new_variation
+        )
+        response = _image_response(scene_image, scene_number)
+        db.add(scene_image)
+        scene.image_status = scene_image.status
+        db.commit()
+        return response
+    except HTTPException:
+        raise
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/submit-for-script/{script_id}", response_model=List[ImageGenerationResponse], status_code=202)
+async def submit_images_for_script(
+    script_id: str,
+    force_new_variation: bool = False,
+    db: Session = Depends(get_db)
+):
+    """
+    Gửi yêu cầu tạo hình ảnh cho tất cả scenes cần ảnh của script, không chờ ảnh tạo xong
+    """
+    try:
+        script = get_script(db, script_id, options=WITH_SCENE_IMAGES)
+        if not script:
+            raise HTTPException(status_code=404, detail="Script not found")
+
+        targets = []
+        for scene in script.scenes:
+            stale_images = list(scene.images) if scene.image_status == MediaStatus.STALE.value else []
+            if scene.images and not stale_images:
+                continue
+            if not scene.visual_elements:
+                scene.image_status = MediaStatus.FAILED.value
+                continue
+            targets.append((scene, stale_images))
+
+        submitted = await asyncio.gather(
+            *(_submit_scene_image(scene.id, scene.visual_elements, force_new=force_new_variation) for scene, _ in targets),
+            return_exceptions=True
+        )
+
+        responses = []
+        for (scene, stale_images), result in zip(targets, submitted):
+            if isinstance(result, Exception):
+                logger.error(f"Error submitting image for scene {scene.id}: {str(result)}")
+                scene.image_status = MediaStatus.FAILED.value
+                continue
+            db.add(result)
+            for old_image in stale_images:
+                db.delete(old_image)
+            scene.image_status = result.status
+            responses.append(_image_response(result, scene.scene_number))
+
+        script.status = ScriptStatus.PROCESSING.value
+        db.commit()
+        return responses
+    except HTTPException:
+        raise
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/webhooks/replicate")
+async def replicate_webhook(request: Request, db: Session = Depends(get_db)):
+    """
+    Nhận thông báo hoàn thành prediction từ Replicate
+    """
+    # Không có secret thì không xác thực được người gửi: từ chối thay vì tin payload
+    if webhook_key is None:
+        raise HTTPException(status_code=503, detail="Replicate webhook is not configured")
+
+    body = await request.body()
+    if not verify_webhook_signature(
+        webhook_key,
+        request.headers.get("webhook-id", ""),
+        request.headers.get("webhook-timestamp", ""),
+        request.headers.get("webhook-signature", ""),
+        body
+    ):
+        raise HTTPException(status_code=401, detail="Invalid webhook signature")
+
+    payload = await request.json()
+    scene_image = db.query(SceneImage).filter(SceneImage.prediction_id == payload.get("id")).first()
+    if not scene_image:
+        # Bản ghi có thể chưa commit xong; poller sẽ xử lý sau
+        return {"status": "ignored"}
+
+    try:
+        updated = apply_prediction_update(
+            image_service, scene_image, payload.get("status"), payload.get("output"), payload.get("error")
+        )
+        db.commit()
+        return {"status": "updated" if updated else "ignored"}
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.post("/generate-for-script/{script_id}", response_model=List[ImageGenerationResponse])
-async def generate_images_for_script(script_id: str, db: Session = Depends(get_db)):
+async def generate_images_for_script(
+    script_id: str,
+    concurrency: Optional[int] = None,
+    force_new_variation: bool = False,
+    db: Session = Depends(get_db)
+):
     """
-    Tạo hình ảnh cho tất cả các scenes trong một script
+    Tạo hình ảnh cho tất cả các scenes trong một script.
+    Các scene được tạo song song, tối đa `concurrency` ảnh cùng lúc cho request này
+    (không vượt quá giới hạn chung IMAGE_GENERATION_MAX_CONCURRENCY)
     """
     try:
         # Kiểm tra script có tồn tại không
-        script = get_script(db, script_id)
+        script = get_script(db, script_id, options=WITH_SCENE_IMAGES)
         if not script:
             raise HTTPException(status_code=404, detail="Script not found")
 
         # Cập nhật trạng thái script thành processing
         script.status = ScriptStatus.PROCESSING.value
-        db.commit()
 
-        generated_images = []
-        
-        # Duyệt qua từng scene trong script
+        # Chọn các scene cần tạo ảnh: chưa có hình ảnh hoặc có hình ảnh đã lỗi thời (STALE)
+        pending = []
         for scene in script.scenes:
-            # Kiểm tra xem scene đã có hình ảnh chưa
-            if not scene.images:
-                # Cập nhật trạng thái scene thành processing
-                scene.image_status = MediaStatus.PROCESSING.value
-                db.commit()
+            stale_images = list(scene.images) if scene.image_status == MediaStatus.STALE.value else []
+            if scene.images and not stale_images:
+                continue
 
-                # Sử dụng visual_elements của scene làm prompt
-                prompt = scene.visual_elements
-                if not prompt:
-                    scene.image_status = MediaStatus.FAILED.value
-                    db.commit()
-                    continue  # Bỏ qua scene không có visual_elements
+            # Sử dụng visual_elements của scene làm prompt
+            prompt = scene.visual_elements
+            if not prompt:
+                scene.image_status = MediaStatus.FAILED.value
+                continue  # Bỏ qua scene không có visual_elements
+
+            scene.image_status = MediaStatus.PROCESSING.value
+            pending.append((scene, scene.id, scene.scene_number, prompt, stale_images))
+        db.commit()
 
+        limit = concurrency or settings.IMAGE_GENERATION_DEFAULT_CONCURRENCY
+        semaphore = asyncio.Semaphore(max(1, min(limit, image_service.max_concurrency)))
+
+        async def generate(item):
+            async with semaphore:
                 try:
-                    # Tạo hình ảnh từ prompt
-                    image_url = image_service.generate_image(prompt)
-                    if not image_url:
-                        scene.image_status = MediaStatus.FAILED.value
-                        db.commit()
-                        continue  # Bỏ qua nếu tạo hình ảnh thất bại
-
-                    # Tạo bản ghi SceneImage mới
-                    scene_image = SceneImage(
-                        scene_id=scene.id,
-                        image_url=image_url,
-                        prompt=prompt,
-                        width=1024,  # Giá trị mặc định
-                        height=768,   # Giá trị mặc định
-                        status=MediaStatus.COMPLETED.value
-                    )
-                    db.add(scene_image)
-                    
-                    # Cập nhật trạng thái scene thành completed
-                    scene.image_status = MediaStatus.COMPLETED.value
-                    generated_images.append(scene_image)
+                    return item, await image_service.generate_image_async(item[3], force_new=force_new_variation)
                 except Exception as e:
-                    scene.image_status = MediaStatus.FAILED.value
-                    db.commit()
-                    continue
+                    logger.error(f"Error generating image for scene {item[1]}: {str(e)}")
+                    return item, None
+
+        generated_images = []
+        for next_done in asyncio.as_completed([generate(item) for item in pending]):
+            (scene, scene_id, scene_number, prompt, stale_images), image_url = await next_done
+            if not image_url:
+                scene.image_status = MediaStatus.FAILED.value
+                db.commit()
+                continue  # Bỏ qua nếu tạo hình ảnh thất bại
+
+            row = {
+                "scene_id": scene_id,
+                "image_url": image_url,
+                "prompt": prompt,
+                "width": 1024,  # Giá trị mặc định
+                "height": 768,   # Giá trị mặc định
+                "status": MediaStatus.COMPLETED.value
+            }
+            image_id = create_scene_images_bulk(db, [row], commit=False)[0]
+            for old_image in stale_images:
+                db.delete(old_image)
+
+            # Cập nhật trạng thái scene thành completed và commit ngay: ảnh đã tạo (đã trả phí)
+            # được lưu lại kể cả khi các scene sau lỗi hoặc request bị huỷ giữa chừng
+            scene.image_status = MediaStatus.COMPLETED.value
+            db.commit()
+            generated_images.append(ImageGenerationResponse(id=image_id, scene_number=scene_number, **row))
 
-        db.commit()
-        
         # Kiểm tra xem tất cả scenes đã hoàn thành chưa
         all_completed = all(scene.image_status == MediaStatus.COMPLETED.value for scene in script.scenes)
         if all_completed:
@@ -142,13 +352,11 @@ async def generate_images_for_script(script_id: str, db: Session = Depends(get_d
         else:
             script.status = ScriptStatus.FAILED.value
         db.commit()
-        
-        # Refresh tất cả các scene_image để lấy thông tin đầy đủ
-        for image in generated_images:
-            db.refresh(image)
 
         return generated_images
 
+    except HTTPException:
+        raise
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
@@ -184,8 +392,10 @@ async def update_scene_image(
         db.commit()
 
         try:
-            # Tạo hình ảnh mới từ prompt mới
-            new_image_url = image_service.generate_image(request.prompt)
+            # Tạo hình ảnh mới từ prompt mới (không chặn event loop trong lúc chờ Replicate)
+            width = request.width or scene_image.width or 1024
+            height = request.height or scene_image.height or 768
+            new_image_url = await image_service.generate_image_async(request.prompt, width=width, height=height)
             if not new_image_url:
                 scene.image_status = MediaStatus.FAILED.value
                 script.status = ScriptStatus.FAILED.value
@@ -198,10 +408,8 @@ async def update_scene_image(
             # Cập nhật thông tin SceneImage
             scene_image.prompt = request.prompt
             scene_image.image_url = new_image_url
-            if request.width:
-                scene_image.width = request.width
-            if request.height:
-                scene_image.height = request.height
+            scene_image.width = width
+            scene_image.height = height
             scene_image.status = MediaStatus.COMPLETED.value
             
             # Cập nhật trạng thái scene thành completed
@@ -229,13 +437,13 @@ async def update_scene_image(
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/list/{script_id}", response_model=List[ImageGenerationResponse])
-async def get_script_images(script_id: str, db: Session = Depends(get_db)):
+async def get_script_images(script_id: str, db: AsyncSession = Depends(get_async_db)):
     """
     Lấy tất cả hình ảnh của một script
     """
     try:
         # Kiểm tra script có tồn tại không
-        script = get_script(db, script_id)
+        script = await async_crud.get_script(db, script_id, options=WITH_SCENE_IMAGES)
         if not script:
             raise HTTPException(status_code=404, detail="Script not found")
 
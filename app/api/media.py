@@ -0,0 +1,19 @@
+from fastapi import APIRouter, HTTPException, Request
+from app.core.media_storage import get_media_storage, verify_media_signature
+from app.utils.media_response import ranged_file_response
+
+router = APIRouter()
+
+@router.get("/{path:path}")
+async def get_media_file(path: str, request: Request, expires: int = 0, sig: str = ""):
+    """
+    Stream file media (audio, ...) dạng binary, hỗ trợ HTTP Range để tua/tải tiếp.
+    Chỉ phục vụ URL đã ký do API cấp (media_url), còn hạn
+    """
+    if not verify_media_signature(path, expires, sig):
+        raise HTTPException(status_code=403, detail="Invalid or expired media URL")
+    try:
+        full_path = get_media_storage().path(path)
+    except ValueError:
+        raise HTTPException(status_code=404, detail="File not found")
+    return ranged_file_response(full_path, request.headers.get("range"))
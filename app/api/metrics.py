@@ -0,0 +1,33 @@
+from fastapi import APIRouter
+from app.core.metrics import metrics
+
+router = APIRouter()
+
+def _cache_hit_rates(counters: dict) -> dict:
+    """Tính tỉ lệ hit của từng cache từ counter cache_requests_total{cache=...,result=...}"""
+    totals = {}
+    prefix = "cache_requests_total{"
+    for key, value in counters.items():
+        if not key.startswith(prefix):
+            continue
+        labels = dict(part.split("=", 1) for part in key[len(prefix):-1].split(","))
+        stats = totals.setdefault(labels.get("cache"), {"hits": 0, "requests": 0})
+        stats["requests"] += value
+        if labels.get("result", "").startswith("hit"):
+            stats["hits"] += value
+    return {
+        name: {**stats, "hit_rate": stats["hits"] / stats["requests"] if stats["requests"] else None}
+        for name, stats in totals.items()
+    }
+
+@router.get("")
+async def get_metrics():
+    """
+    Lấy các chỉ số nội bộ của process (counter, độ trễ p50/p95, tỉ lệ hit của các cache)
+
+    Ví dụ: tỉ lệ fallback của chế độ tạo kịch bản một lần gọi là
+    script_generation_fallback_total / (script_generation_total{mode=single} + script_generation_fallback_total)
+    """
+    snapshot = metrics.snapshot()
+    snapshot["caches"] = _cache_hit_rates(snapshot["counters"])
+    return snapshot
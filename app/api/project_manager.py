@@ -1,6 +1,6 @@
 from fastapi import APIRouter, HTTPException, Depends, Response
 from sqlalchemy.orm import Session
-from app.schemas.video_script import VideoScript, CreateScriptRequest
+from app.schemas.video_script import VideoScript, VideoScriptSummary, CreateScriptRequest
 from app.crud import video_script as crud
 from app.database import get_db
 from app.models.video_script import ScriptStatus
@@ -18,17 +18,55 @@ class ScriptUpdateRequest(BaseModel):
 @router.get("/user/{user_id}/scripts", response_model=List[VideoScript])
 async def get_user_scripts(
     user_id: str,
+    response: Response,
     skip: int = 0,
     limit: int = 100,
     status: Optional[ScriptStatus] = None,
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
     """
-    Lấy danh sách kịch bản video của một người dùng
+    Lấy danh sách kịch bản video của một người dùng, mới nhất trước.
+    Phân trang bằng cursor: gửi lại giá trị header X-Next-Cursor để lấy trang tiếp theo
+    (`skip` vẫn được hỗ trợ cho client cũ)
     """
     try:
-        scripts = crud.get_scripts_by_user(db, user_id, skip=skip, limit=limit, status=status)
+        if skip:
+            return crud.get_scripts_by_user(db, user_id, skip=skip, limit=limit, status=status, options=crud.WITH_SCENES)
+        scripts, next_cursor = crud.get_scripts_page(
+            db, cursor=cursor, limit=limit, user_id=user_id, status=status, options=crud.WITH_SCENES
+        )
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
         return scripts
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/user/{user_id}/scripts/summary", response_model=List[VideoScriptSummary])
+async def get_user_script_summaries(
+    user_id: str,
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    status: Optional[ScriptStatus] = None,
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Lấy danh sách rút gọn kịch bản video của một người dùng (không kèm nội dung cảnh),
+    phân trang bằng cursor (header X-Next-Cursor)
+    """
+    try:
+        summaries, next_cursor = crud.get_script_summaries(
+            db, user_id=user_id, skip=skip, limit=limit, status=status, cursor=cursor
+        )
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
+        return summaries
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -41,7 +79,7 @@ async def get_script(
     Lấy thông tin chi tiết của một kịch bản video
     """
     try:
-        script = crud.get_script(db, script_id)
+        script = crud.get_script(db, script_id, options=crud.WITH_SCENES)
         if not script:
             raise HTTPException(status_code=404, detail="Script not found")
         return script
@@ -1,18 +1,27 @@
-from fastapi import APIRouter, HTTPException, Depends, Response
+from fastapi import APIRouter, HTTPException, Depends, Response, BackgroundTasks
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from app.schemas.video_script import VideoScript, CreateScriptRequest
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.schemas.video_script import VideoScript, VideoScriptSummary, CreateScriptRequest, BatchScriptRequest, BatchScriptJob
 from app.services.deepseek_service import DeepSeekService
+from app.services.script_batch_service import ScriptBatchService
 from app.crud import video_script as crud
+from app.crud import video_script_async as async_crud
+from app.core.database import get_async_db, get_async_session_factory
 from app.database import get_db
 from app.models.video_script import ScriptStatus, MediaStatus
 from typing import Optional, List
 import os
 import tempfile
 import shutil
+import json
+import logging
 from pydantic import BaseModel
 
+logger = logging.getLogger(__name__)
 router = APIRouter()
 deepseek_service = DeepSeekService()
+script_batch_service = ScriptBatchService(deepseek_service)
 
 class TextToSpeechRequest(BaseModel):
     text: str
@@ -20,113 +29,219 @@ class TextToSpeechRequest(BaseModel):
     speed: float = 1.0
 
 @router.post("/generate", response_model=VideoScript)
-async def generate_video_script(request: CreateScriptRequest, db: Session = Depends(get_db)):
+async def generate_video_script(request: CreateScriptRequest, db: AsyncSession = Depends(get_async_db)):
     """
     Tạo kịch bản video tự động dựa trên chủ đề, đối tượng mục tiêu và thời lượng
     """
-    db_script = None  # Khởi tạo biến db_script
     try:
         # Tạo nội dung script bằng DeepSeek
-        script = deepseek_service.generate_video_script(
+        script = await deepseek_service.generate_video_script_async(
             topic=request.topic,
             target_audience=request.target_audience,
-            duration=request.duration
+            duration=request.duration,
+            mode=request.generation_mode,
+            bypass_cache=request.bypass_cache
         )
-        
-        # Tạo script trong database với status DRAFT
-        db_script = crud.create_script(db, request)
-        
-        # Cập nhật thông tin script trong database
-        crud.update_script(db, db_script.id, {
+
+        # Lưu script và toàn bộ scene trong một transaction (một INSERT cho tất cả scene)
+        script_id = (await async_crud.create_scripts_bulk(db, [{
             "title": script.title,
             "description": script.description,
+            "target_audience": request.target_audience,
             "total_duration": script.total_duration,
-            "status": ScriptStatus.DRAFT.value  
-        })
-        
-        # Tạo các scene trong database
-        for scene in script.scenes:
-            # Tạo scene với visual_elements là mô tả chi tiết
-            db_scene = crud.create_scene(db, db_script.id, {
+            "status": ScriptStatus.DRAFT.value
+        }], commit=False))[0]
+        await async_crud.create_scenes_bulk(db, [
+            {
+                "script_id": script_id,
                 "scene_number": scene.scene_number,
                 "description": scene.description,
                 "duration": scene.duration,
-                "visual_elements": scene.visual_elements,
+                "visual_elements": scene.visual_elements,  # Mô tả chi tiết để tạo hình ảnh
                 "background_music": scene.background_music,
                 "voice_over": scene.voice_over,
                 "image_status": MediaStatus.PENDING.value,
                 "voice_status": MediaStatus.PENDING.value
-            })
-        
+            }
+            for scene in script.scenes
+        ], commit=False)
+        await db.commit()
+
         # Lấy script đã lưu từ database để trả về
-        saved_script = crud.get_script(db, db_script.id)
-        return saved_script
+        return await async_crud.get_script(db, script_id, options=crud.WITH_SCENES)
     except Exception as e:
-        # Nếu có lỗi, cập nhật status thành FAILED
-        if db_script:
-            crud.update_script(db, db_script.id, {"status": ScriptStatus.FAILED.value})
+        await db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
+def _ndjson(event: dict) -> str:
+    return json.dumps(event, ensure_ascii=False, default=str) + "\n"
+
+@router.post("/generate/stream")
+async def generate_video_script_stream(request: CreateScriptRequest):
+    """
+    Tạo kịch bản video và stream kết quả dạng NDJSON: mỗi cảnh được lưu vào
+    database và gửi về client ngay khi LLM sinh xong cảnh đó
+    """
+    async def event_stream():
+        # Session riêng cho stream vì response kéo dài hơn vòng đời của dependency
+        async with get_async_session_factory()() as db:
+            script_id = None
+            try:
+                script_id = (await async_crud.create_scripts_bulk(db, [{
+                    "title": request.topic,
+                    "description": "",
+                    "target_audience": request.target_audience,
+                    "total_duration": request.duration,
+                    "status": ScriptStatus.DRAFT.value
+                }]))[0]
+                yield _ndjson({"event": "script", "script_id": script_id})
+
+                async for item in deepseek_service.stream_video_script(
+                    topic=request.topic,
+                    target_audience=request.target_audience,
+                    duration=request.duration,
+                    bypass_cache=request.bypass_cache
+                ):
+                    if isinstance(item, VideoScript):
+                        await async_crud.update_script(db, script_id, {
+                            "title": item.title,
+                            "description": item.description,
+                            "total_duration": item.total_duration,
+                            "status": ScriptStatus.DRAFT.value
+                        })
+                        yield _ndjson({
+                            "event": "completed",
+                            "script_id": script_id,
+                            "title": item.title,
+                            "description": item.description,
+                            "total_duration": item.total_duration
+                        })
+                    else:
+                        # Commit từng scene để client đọc được ngay, không cần refresh lại bản ghi
+                        scene_id = (await async_crud.create_scenes_bulk(db, [{
+                            "script_id": script_id,
+                            **item.dict(),
+                            "image_status": MediaStatus.PENDING.value,
+                            "voice_status": MediaStatus.PENDING.value
+                        }]))[0]
+                        yield _ndjson({"event": "scene", "scene": {"id": scene_id, **item.dict()}})
+            except Exception as e:
+                logger.error(f"Error streaming video script: {str(e)}")
+                await db.rollback()
+                if script_id:
+                    await async_crud.update_script(db, script_id, {"status": ScriptStatus.FAILED.value})
+                yield _ndjson({"event": "error", "detail": str(e)})
+
+    return StreamingResponse(event_stream(), media_type="application/x-ndjson")
+
+@router.post("/batch", response_model=BatchScriptJob, status_code=202)
+async def generate_video_scripts_batch(request: BatchScriptRequest, background_tasks: BackgroundTasks):
+    """
+    Tạo kịch bản cho nhiều chủ đề cùng lúc. Trả về job để theo dõi trạng thái từng chủ đề.
+    Trạng thái job được lưu trong database nên đọc được từ mọi worker
+    """
+    try:
+        job = await script_batch_service.create_job(request)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    background_tasks.add_task(script_batch_service.run_job, job.job_id, request)
+    return job
+
+@router.get("/batch/{job_id}", response_model=BatchScriptJob)
+async def get_video_scripts_batch(job_id: str):
+    """
+    Lấy trạng thái của một job tạo kịch bản hàng loạt
+    """
+    job = await script_batch_service.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Batch job not found")
+    return job
+
 @router.post("/enhance/{script_id}", response_model=VideoScript)
-async def enhance_video_script(script_id: str, db: Session = Depends(get_db)):
+async def enhance_video_script(script_id: str, bypass_cache: bool = False, db: Session = Depends(get_db)):
     """
     Cải thiện kịch bản video với các đề xuất chi tiết hơn
     """
     try:
         # Lấy script từ database
-        db_script = crud.get_script(db, script_id)
+        # apply_scene_changes cần cả hình ảnh/giọng nói của từng cảnh để đánh dấu STALE
+        db_script = crud.get_script(db, script_id, options=crud.WITH_SCENE_MEDIA)
         if not db_script:
             raise HTTPException(status_code=404, detail="Script not found")
         
         # Cải thiện script bằng DeepSeek
-        enhanced_script = deepseek_service.enhance_script(db_script)
-        
-        # Cập nhật thông tin trong database
-        crud.update_script(db, script_id, {
-            "title": enhanced_script.title,
-            "description": enhanced_script.description,
-            "total_duration": enhanced_script.total_duration
-        })
+        enhanced_script = await deepseek_service.enhance_script_async(
+            VideoScript.model_validate(db_script),
+            bypass_cache=bypass_cache
+        )
         
-        # Xóa các scene cũ
-        for scene in db_script.scenes:
-            db.delete(scene)
-        db.commit()
-        
-        # Tạo các scene mới với mô tả chi tiết
-        for scene in enhanced_script.scenes:
-            db_scene = crud.create_scene(db, script_id, {
-                "scene_number": scene.scene_number,
-                "description": scene.description,
-                "duration": scene.duration,
-                "visual_elements": scene.visual_elements,  # Mô tả chi tiết cho việc tạo hình ảnh
-                "background_music": scene.background_music,
-                "voice_over": scene.voice_over
-            })
+        # Cập nhật thông tin kịch bản và chỉ những cảnh thay đổi, trong một transaction
+        db_script.title = enhanced_script.title
+        db_script.description = enhanced_script.description
+        db_script.total_duration = enhanced_script.total_duration
+        changes = crud.apply_scene_changes(db, db_script, [scene.dict() for scene in enhanced_script.scenes])
+        logger.info(f"Enhanced script {script_id}: {changes}")
         
         # Lấy script đã cập nhật
-        updated_script = crud.get_script(db, script_id)
+        updated_script = crud.get_script(db, script_id, options=crud.WITH_SCENES)
         return updated_script
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/scripts", response_model=List[VideoScript])
-async def list_scripts(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+async def list_scripts(
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
     """
-    Lấy danh sách các kịch bản video
+    Lấy danh sách các kịch bản video, mới nhất trước.
+    Phân trang bằng cursor: gửi lại giá trị header X-Next-Cursor để lấy trang tiếp theo
+    (`skip` vẫn được hỗ trợ cho client cũ)
     """
     try:
-        return crud.get_scripts(db, skip=skip, limit=limit)
+        if skip:
+            return await async_crud.get_scripts(db, skip=skip, limit=limit, options=crud.WITH_SCENES)
+        scripts, next_cursor = await async_crud.get_scripts_page(db, cursor=cursor, limit=limit, options=crud.WITH_SCENES)
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
+        return scripts
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/scripts/summary", response_model=List[VideoScriptSummary])
+async def list_script_summaries(
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Lấy danh sách rút gọn các kịch bản video (không kèm nội dung cảnh) cho màn hình danh sách,
+    phân trang bằng cursor như /scripts
+    """
+    try:
+        summaries, next_cursor = await async_crud.get_script_summaries(db, skip=skip, limit=limit, cursor=cursor)
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
+        return summaries
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/scripts/{script_id}", response_model=VideoScript)
-async def get_script(script_id: str, db: Session = Depends(get_db)):
+async def get_script(script_id: str, db: AsyncSession = Depends(get_async_db)):
     """
     Lấy thông tin chi tiết của một kịch bản video
     """
     try:
-        script = crud.get_script(db, script_id)
+        script = await async_crud.get_script(db, script_id, options=crud.WITH_SCENES)
         if not script:
             raise HTTPException(status_code=404, detail="Script not found")
         return script
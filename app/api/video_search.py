@@ -1,25 +1,174 @@
 from fastapi import APIRouter, HTTPException
-from typing import Dict, List
-import requests
-from googleapiclient.discovery import build
+from typing import Dict, List, Optional
+import asyncio
+import time
+import httpx
 from bs4 import BeautifulSoup
 import logging
 from datetime import datetime
 import os
 from app.core.config import get_settings
+from app.core.cache import SWRCache, hash_key
+from app.core.google_api import get_google_api_client
+from app.core.http_client import get_http_client
+from app.core.metrics import metrics
+from app.schemas.content_suggestion import AggregatedSearchResponse, SourceStatus, VideoInfo
+from app.services.google_search_service import GoogleSearchService
+from app.services.search_aggregator import merge_and_rank, to_video_info
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
+settings = get_settings()
 
-# Khởi tạo YouTube client
+# Cache kết quả tìm kiếm: giảm quota YouTube/RapidAPI, request trùng nhau chỉ gọi upstream một lần
+search_cache = SWRCache("search", max_entries=settings.SEARCH_CACHE_MAX_ENTRIES)
+
+RAPIDAPI_TIKTOK_HOST = "tiktok-api23.p.rapidapi.com"
+
+# Dùng chung pool trình duyệt: không khởi động Chrome cho mỗi lần tìm
+google_search_service = GoogleSearchService()
+
+# YouTube client dùng chung (tạo một lần, không đọc lại discovery document mỗi request)
 def get_youtube_client():
     settings = get_settings()
-    return build('youtube', 'v3', developerKey=settings.YOUTUBE_API_KEY)
+    return get_google_api_client('youtube', 'v3', settings.YOUTUBE_API_KEY)
 
-# Khởi tạo Google Custom Search client
+# Google Custom Search client dùng chung
 def get_google_search_client():
     settings = get_settings()
-    return build('customsearch', 'v1', developerKey=settings.GOOGLE_API_KEY)
+    return get_google_api_client('customsearch', 'v1', settings.GOOGLE_API_KEY)
+
+def _fetch_youtube_videos(keyword: str, max_results: int) -> List[Dict]:
+    """Gọi YouTube Data API (blocking): tìm video ngắn theo lượt xem rồi lấy thông tin chi tiết"""
+    youtube = get_youtube_client()
+
+    # Tìm kiếm video
+    search_response = youtube.search().list(
+        q=keyword,
+        part='snippet',
+        maxResults=max_results,
+        type='video',
+        videoDuration='short',
+        order='viewCount'
+    ).execute()
+
+    video_ids = [item['id']['videoId'] for item in search_response.get('items', [])]
+
+    # Lấy thông tin chi tiết
+    videos_response = youtube.videos().list(
+        part='snippet,statistics,contentDetails',
+        id=','.join(video_ids)
+    ).execute()
+
+    videos = []
+    for item in videos_response.get('items', []):
+        video = {
+            'title': item['snippet']['title'],
+            'description': item['snippet']['description'],
+            'url': f"https://www.youtube.com/watch?v={item['id']}",
+            'thumbnail_url': item['snippet']['thumbnails']['high']['url'],
+            'view_count': int(item['statistics']['viewCount']),
+            'like_count': int(item['statistics'].get('likeCount', 0)),
+            'published_at': item['snippet']['publishedAt'],
+            'duration': item['contentDetails']['duration'],
+            'channel_name': item['snippet']['channelTitle']
+        }
+        videos.append(video)
+    return videos
+
+async def _search_youtube_cached(keyword: str, max_results: int) -> List[Dict]:
+    async def fetch():
+        # Client Google API là blocking: chạy trong thread pool để không chặn event loop
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, _fetch_youtube_videos, keyword, max_results)
+
+    return await search_cache.get_or_fetch(
+        hash_key({"source": "youtube", "keyword": keyword, "max_results": max_results}),
+        fetch,
+        settings.SEARCH_CACHE_YOUTUBE_TTL_SECONDS,
+        settings.SEARCH_CACHE_STALE_SECONDS
+    )
+
+async def _rapidapi_tiktok_get(path: str, params: Dict, check_access: bool = True) -> Dict:
+    """Gọi TikTok API qua RapidAPI bằng HTTP client dùng chung"""
+    settings = get_settings()
+    headers = {
+        "X-RapidAPI-Key": settings.RAPIDAPI_KEY,
+        "X-RapidAPI-Host": RAPIDAPI_TIKTOK_HOST
+    }
+    response = await get_http_client().get(f"https://{RAPIDAPI_TIKTOK_HOST}{path}", headers=headers, params=params)
+
+    # Kiểm tra lỗi chi tiết
+    if check_access and response.status_code == 403:
+        logger.error("TikTok API access forbidden. Please check your API key and subscription status.")
+        raise HTTPException(
+            status_code=403,
+            detail="Access to TikTok API is forbidden. Please check your API key and subscription status."
+        )
+    elif check_access and response.status_code == 429:
+        logger.error("TikTok API rate limit exceeded.")
+        raise HTTPException(
+            status_code=429,
+            detail="TikTok API rate limit exceeded. Please try again later."
+        )
+
+    response.raise_for_status()
+    return response.json()
+
+def _tiktok_video(item: Dict) -> Dict:
+    return {
+        'title': item.get('title', ''),
+        'description': item.get('desc', ''),
+        'url': item.get('video_url', ''),
+        'thumbnail_url': item.get('cover', ''),
+        'view_count': item.get('play_count', 0),
+        'like_count': item.get('digg_count', 0),
+        'published_at': datetime.fromtimestamp(item.get('create_time', 0)).isoformat(),
+        'channel_name': item.get('author', {}).get('nickname', ''),
+        'platform': 'tiktok',
+        'music': item.get('music', {}).get('title', ''),
+        'duration': item.get('duration', 0),
+        'share_count': item.get('share_count', 0),
+        'comment_count': item.get('comment_count', 0)
+    }
+
+async def _search_tiktok_cached(keyword: str, cursor: str, search_id: str) -> Dict:
+    async def fetch():
+        data = await _rapidapi_tiktok_get("/api/search/general", {
+            "keyword": keyword,
+            "cursor": cursor,
+            "search_id": search_id
+        })
+
+        # Xử lý dữ liệu từ response
+        videos = []
+        items = data.get('data', [])
+
+        # Kiểm tra nếu items là list
+        if isinstance(items, list):
+            videos = [_tiktok_video(item) for item in items if item.get('type') == 'video']
+
+        # Lấy cursor và search_id cho trang tiếp theo
+        next_cursor = data.get('cursor', '0')
+        next_search_id = data.get('search_id', '0')
+
+        if next_cursor == '-1':
+            next_cursor = None
+
+        return {
+            'videos': videos,
+            'total': len(videos),
+            'has_more': len(videos) > 0,
+            'cursor': next_cursor,
+            'search_id': next_search_id
+        }
+
+    return await search_cache.get_or_fetch(
+        hash_key({"source": "tiktok", "keyword": keyword, "cursor": cursor, "search_id": search_id}),
+        fetch,
+        settings.SEARCH_CACHE_TIKTOK_TTL_SECONDS,
+        settings.SEARCH_CACHE_STALE_SECONDS
+    )
 
 @router.get("/youtube/{keyword}")
 async def search_youtube(keyword: str, max_results: int = 10):
@@ -27,41 +176,7 @@ async def search_youtube(keyword: str, max_results: int = 10):
     Tìm kiếm video trên YouTube
     """
     try:
-        youtube = get_youtube_client()
-        
-        # Tìm kiếm video
-        search_response = youtube.search().list(
-            q=keyword,
-            part='snippet',
-            maxResults=max_results,
-            type='video',
-            videoDuration='short',
-            order='viewCount'
-        ).execute()
-
-        video_ids = [item['id']['videoId'] for item in search_response.get('items', [])]
-        
-        # Lấy thông tin chi tiết
-        videos_response = youtube.videos().list(
-            part='snippet,statistics,contentDetails',
-            id=','.join(video_ids)
-        ).execute()
-
-        videos = []
-        for item in videos_response.get('items', []):
-            video = {
-                'title': item['snippet']['title'],
-                'description': item['snippet']['description'],
-                'url': f"https://www.youtube.com/watch?v={item['id']}",
-                'thumbnail_url': item['snippet']['thumbnails']['high']['url'],
-                'view_count': int(item['statistics']['viewCount']),
-                'like_count': int(item['statistics'].get('likeCount', 0)),
-                'published_at': item['snippet']['publishedAt'],
-                'duration': item['contentDetails']['duration'],
-                'channel_name': item['snippet']['channelTitle']
-            }
-            videos.append(video)
-
+        videos = await _search_youtube_cached(keyword, max_results)
         return {'videos': videos, 'total': len(videos)}
 
     except Exception as e:
@@ -74,132 +189,75 @@ async def search_google(keyword: str, max_results: int = 10):
     Tìm kiếm video trên Google (sử dụng YouTube API)
     """
     try:
-        youtube = get_youtube_client()
-        
-        # Tìm kiếm video
-        search_response = youtube.search().list(
-            q=keyword,
-            part='snippet',
-            maxResults=max_results,
-            type='video',
-            videoDuration='short',
-            order='viewCount'
-        ).execute()
-
-        video_ids = [item['id']['videoId'] for item in search_response.get('items', [])]
-        
-        # Lấy thông tin chi tiết
-        videos_response = youtube.videos().list(
-            part='snippet,statistics,contentDetails',
-            id=','.join(video_ids)
-        ).execute()
-
-        videos = []
-        for item in videos_response.get('items', []):
-            video = {
-                'title': item['snippet']['title'],
-                'description': item['snippet']['description'],
-                'url': f"https://www.youtube.com/watch?v={item['id']}",
-                'thumbnail_url': item['snippet']['thumbnails']['high']['url'],
-                'view_count': int(item['statistics']['viewCount']),
-                'like_count': int(item['statistics'].get('likeCount', 0)),
-                'published_at': item['snippet']['publishedAt'],
-                'duration': item['contentDetails']['duration'],
-                'channel_name': item['snippet']['channelTitle'],
-                'platform': 'youtube'
-            }
-            videos.append(video)
-
+        # Dùng chung kết quả (và cache) với /youtube
+        videos = [{**video, 'platform': 'youtube'} for video in await _search_youtube_cached(keyword, max_results)]
         return {'videos': videos, 'total': len(videos)}
 
     except Exception as e:
         logger.error(f"Error searching Google: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.get("/tiktok/{keyword}")
-async def search_tiktok(
-    keyword: str, 
-    cursor: str = "0",
-    search_id: str = "0"
+# Khai báo trước /tiktok/{keyword} để "trending" không bị hiểu là keyword
+@router.get("/tiktok/trending")
+async def get_tiktok_trending(
+    page: int = 1,
+    limit: int = 20,
+    period: int = 30,
+    order_by: str = "vv",
+    country: str = "US"
 ):
     """
-    Tìm kiếm video trên TikTok sử dụng RapidAPI
+    Lấy danh sách video trending trên TikTok
     """
-    try:
-        settings = get_settings()
-        
-        # Gọi TikTok API thông qua RapidAPI
-        url = "https://tiktok-api23.p.rapidapi.com/api/search/general"
-        headers = {
-            "X-RapidAPI-Key": settings.RAPIDAPI_KEY,
-            "X-RapidAPI-Host": "tiktok-api23.p.rapidapi.com"
-        }
-        params = {
-            "keyword": keyword,
-            "cursor": cursor,
-            "search_id": search_id
-        }
-        
-        response = requests.get(url, headers=headers, params=params)
-        
-        # Kiểm tra lỗi chi tiết
-        if response.status_code == 403:
-            logger.error("TikTok API access forbidden. Please check your API key and subscription status.")
-            raise HTTPException(
-                status_code=403,
-                detail="Access to TikTok API is forbidden. Please check your API key and subscription status."
-            )
-        elif response.status_code == 429:
-            logger.error("TikTok API rate limit exceeded.")
-            raise HTTPException(
-                status_code=429,
-                detail="TikTok API rate limit exceeded. Please try again later."
-            )
-        
-        response.raise_for_status()
-        data = response.json()
-
-        # Xử lý dữ liệu từ response
-        videos = []
-        items = data.get('data', [])
-        
-        # Kiểm tra nếu items là list
-        if isinstance(items, list):
-            for item in items:
-                if item.get('type') == 'video':
-                    video = {
-                        'title': item.get('title', ''),
-                        'description': item.get('desc', ''),
-                        'url': item.get('video_url', ''),
-                        'thumbnail_url': item.get('cover', ''),
-                        'view_count': item.get('play_count', 0),
-                        'like_count': item.get('digg_count', 0),
-                        'published_at': datetime.fromtimestamp(item.get('create_time', 0)).isoformat(),
-                        'channel_name': item.get('author', {}).get('nickname', ''),
-                        'platform': 'tiktok',
-                        'music': item.get('music', {}).get('title', ''),
-                        'duration': item.get('duration', 0),
-                        'share_count': item.get('share_count', 0),
-                        'comment_count': item.get('comment_count', 0)
-                    }
-                    videos.append(video)
+    async def fetch():
+        data = await _rapidapi_tiktok_get("/api/trending/video", {
+            "page": page,
+            "limit": limit,
+            "period": period,
+            "order_by": order_by,
+            "country": country
+        }, check_access=False)
 
-        # Lấy cursor và search_id cho trang tiếp theo
-        next_cursor = data.get('cursor', '0')
-        next_search_id = data.get('search_id', '0')
-        
-        if next_cursor == '-1':
-            next_cursor = None
+        videos = [_tiktok_video(item) for item in data.get('data', [])]
 
         return {
             'videos': videos,
             'total': len(videos),
-            'has_more': len(videos) > 0,
-            'cursor': next_cursor,
-            'search_id': next_search_id
+            'page': page,
+            'limit': limit,
+            'has_more': data.get('has_more', False)
         }
 
-    except requests.exceptions.RequestException as e:
+    try:
+        return await search_cache.get_or_fetch(
+            hash_key({
+                "source": "tiktok_trending", "page": page, "limit": limit,
+                "period": period, "order_by": order_by, "country": country
+            }),
+            fetch,
+            settings.SEARCH_CACHE_TRENDING_TTL_SECONDS,
+            settings.SEARCH_CACHE_STALE_SECONDS
+        )
+
+    except Exception as e:
+        logger.error(f"Error getting TikTok trending: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/tiktok/{keyword}")
+async def search_tiktok(
+    keyword: str,
+    cursor: str = "0",
+    search_id: str = "0"
+):
+    """
+    Tìm kiếm video trên TikTok sử dụng RapidAPI
+    """
+    try:
+        return await _search_tiktok_cached(keyword, cursor, search_id)
+
+    except HTTPException:
+        raise
+    except httpx.HTTPError as e:
         logger.error(f"Error calling TikTok API: {e}")
         raise HTTPException(
             status_code=500,
@@ -221,59 +279,15 @@ async def get_user_posts(
     """
     Lấy danh sách video của một user TikTok
     """
-    try:
-        settings = get_settings()
-        
-        # Gọi TikTok API thông qua RapidAPI
-        url = "https://tiktok-api23.p.rapidapi.com/api/user/posts"
-        headers = {
-            "X-RapidAPI-Key": settings.RAPIDAPI_KEY,
-            "X-RapidAPI-Host": "tiktok-api23.p.rapidapi.com"
-        }
-        params = {
+    async def fetch():
+        data = await _rapidapi_tiktok_get("/api/user/posts", {
             "secUid": sec_uid,
             "count": max_results,
             "cursor": cursor
-        }
-        
-        response = requests.get(url, headers=headers, params=params)
-        
-        # Kiểm tra lỗi chi tiết
-        if response.status_code == 403:
-            logger.error("TikTok API access forbidden. Please check your API key and subscription status.")
-            raise HTTPException(
-                status_code=403,
-                detail="Access to TikTok API is forbidden. Please check your API key and subscription status."
-            )
-        elif response.status_code == 429:
-            logger.error("TikTok API rate limit exceeded.")
-            raise HTTPException(
-                status_code=429,
-                detail="TikTok API rate limit exceeded. Please try again later."
-            )
-        
-        response.raise_for_status()
-        data = response.json()
+        })
 
         # Xử lý dữ liệu từ response
-        videos = []
-        for item in data.get('data', {}).get('itemList', []):
-            video = {
-                'title': item.get('title', ''),
-                'description': item.get('desc', ''),
-                'url': item.get('video_url', ''),
-                'thumbnail_url': item.get('cover', ''),
-                'view_count': item.get('play_count', 0),
-                'like_count': item.get('digg_count', 0),
-                'published_at': datetime.fromtimestamp(item.get('create_time', 0)).isoformat(),
-                'channel_name': item.get('author', {}).get('nickname', ''),
-                'platform': 'tiktok',
-                'music': item.get('music', {}).get('title', ''),
-                'duration': item.get('duration', 0),
-                'share_count': item.get('share_count', 0),
-                'comment_count': item.get('comment_count', 0)
-            }
-            videos.append(video)
+        videos = [_tiktok_video(item) for item in data.get('data', {}).get('itemList', [])]
 
         # Lấy cursor cho trang tiếp theo
         next_cursor = data.get('data', {}).get('cursor')
@@ -288,7 +302,17 @@ async def get_user_posts(
             'extra': data.get('data', {}).get('extra', {})
         }
 
-    except requests.exceptions.RequestException as e:
+    try:
+        return await search_cache.get_or_fetch(
+            hash_key({"source": "tiktok_user", "sec_uid": sec_uid, "max_results": max_results, "cursor": cursor}),
+            fetch,
+            settings.SEARCH_CACHE_TIKTOK_USER_TTL_SECONDS,
+            settings.SEARCH_CACHE_STALE_SECONDS
+        )
+
+    except HTTPException:
+        raise
+    except httpx.HTTPError as e:
         logger.error(f"Error calling TikTok API: {e}")
         raise HTTPException(
             status_code=500,
@@ -301,65 +325,63 @@ async def get_user_posts(
             detail=f"Error getting user posts: {str(e)}"
         )
 
-@router.get("/tiktok/trending")
-async def get_tiktok_trending(
-    page: int = 1,
-    limit: int = 20,
-    period: int = 30,
-    order_by: str = "vv",
-    country: str = "US"
-):
+async def _youtube_source(keyword: str, max_results: int) -> List[VideoInfo]:
+    videos = await _search_youtube_cached(keyword, max_results)
+    return [video for video in (to_video_info(item, "youtube") for item in videos) if video]
+
+async def _tiktok_source(keyword: str, max_results: int) -> List[VideoInfo]:
+    result = await _search_tiktok_cached(keyword, "0", "0")
+    videos = [video for video in (to_video_info(item, "tiktok") for item in result['videos']) if video]
+    return videos[:max_results]
+
+async def _google_source(keyword: str, max_results: int) -> List[VideoInfo]:
+    async def fetch():
+        return await google_search_service.search(keyword, max_results)
+
+    return await search_cache.get_or_fetch(
+        hash_key({"source": "google", "keyword": keyword, "max_results": max_results}),
+        fetch,
+        settings.SEARCH_CACHE_YOUTUBE_TTL_SECONDS,
+        settings.SEARCH_CACHE_STALE_SECONDS
+    )
+
+SEARCH_SOURCES = {
+    "youtube": _youtube_source,
+    "tiktok": _tiktok_source,
+    "google": _google_source,
+}
+
+@router.get("/all/{keyword}", response_model=AggregatedSearchResponse)
+async def search_all(keyword: str, max_results: int = 10, timeout: Optional[float] = None):
     """
-    Lấy danh sách video trending trên TikTok
+    Tìm kiếm đồng thời trên YouTube, TikTok và Google, gộp kết quả về VideoInfo,
+    loại trùng và xếp hạng chung. Mỗi nguồn có thời gian chờ riêng: nguồn chậm hoặc lỗi
+    được bỏ qua (xem `sources`) nên tổng thời gian bằng nguồn chậm nhất, không phải tổng các nguồn
     """
-    try:
-        settings = get_settings()
-        
-        # Gọi TikTok API thông qua RapidAPI
-        url = "https://tiktok-api23.p.rapidapi.com/api/trending/video"
-        headers = {
-            "X-RapidAPI-Key": settings.RAPIDAPI_KEY,
-            "X-RapidAPI-Host": "tiktok-api23.p.rapidapi.com"
-        }
-        params = {
-            "page": page,
-            "limit": limit,
-            "period": period,
-            "order_by": order_by,
-            "country": country
-        }
-        
-        response = requests.get(url, headers=headers, params=params)
-        response.raise_for_status()
-        data = response.json()
-
-        videos = []
-        for item in data.get('data', []):
-            video = {
-                'title': item.get('title', ''),
-                'description': item.get('desc', ''),
-                'url': item.get('video_url', ''),
-                'thumbnail_url': item.get('cover', ''),
-                'view_count': item.get('play_count', 0),
-                'like_count': item.get('digg_count', 0),
-                'published_at': datetime.fromtimestamp(item.get('create_time', 0)).isoformat(),
-                'channel_name': item.get('author', {}).get('nickname', ''),
-                'platform': 'tiktok',
-                'music': item.get('music', {}).get('title', ''),
-                'duration': item.get('duration', 0),
-                'share_count': item.get('share_count', 0),
-                'comment_count': item.get('comment_count', 0)
-            }
-            videos.append(video)
+    timeout = timeout or settings.SEARCH_SOURCE_TIMEOUT_SECONDS
 
-        return {
-            'videos': videos,
-            'total': len(videos),
-            'page': page,
-            'limit': limit,
-            'has_more': data.get('has_more', False)
-        }
+    async def run(name, source):
+        started = time.perf_counter()
+        try:
+            # Hết thời gian chờ thì lời gọi upstream vẫn chạy tiếp trong cache và dùng được cho lần sau
+            videos = await asyncio.wait_for(source(keyword, max_results), timeout)
+            status = SourceStatus(status="ok", count=len(videos), elapsed_ms=0)
+        except asyncio.TimeoutError:
+            videos = []
+            status = SourceStatus(status="timeout", elapsed_ms=0)
+        except Exception as e:
+            logger.error(f"Error searching {name}: {e}")
+            videos = []
+            status = SourceStatus(status="error", elapsed_ms=0, error=str(getattr(e, "detail", e)))
+        elapsed = time.perf_counter() - started
+        status.elapsed_ms = round(elapsed * 1000)
+        metrics.observe("search_source_seconds", elapsed, source=name, status=status.status)
+        return name, videos, status
 
-    except Exception as e:
-        logger.error(f"Error getting TikTok trending: {e}")
-        raise HTTPException(status_code=500, detail=str(e)) 
\ No newline at end of file
+    outcomes = await asyncio.gather(*(run(name, source) for name, source in SEARCH_SOURCES.items()))
+    videos = merge_and_rank({name: videos for name, videos, _ in outcomes})
+    return AggregatedSearchResponse(
+        videos=videos,
+        total_results=len(videos),
+        sources={name: status for name, _, status in outcomes}
+    )
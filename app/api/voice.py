@@ -1,18 +1,30 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response, StreamingResponse
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.services.google_tts_service import GoogleTTSService
+from app.services.narration_service import NarrationService
 from app.schemas.video_script import VideoScript
-from app.schemas.voice import VoiceRequest, VoiceResponse, ScriptVoiceRequest, TextToSpeechRequest, TextToSpeechResponse, UpdateVoiceRequest
+from app.schemas.voice import VoiceRequest, VoiceResponse, ScriptVoiceRequest, TextToSpeechRequest, TextToSpeechResponse, UpdateVoiceRequest, NarrationResponse
 from app.crud import video_script as crud
-from app.core.database import get_db
+from app.crud import video_script_async as async_crud
+from app.core.database import get_db, get_async_db, SessionLocal
+from app.core.config import get_settings
+from app.core.media_storage import media_url
+from app.utils.media_response import ranged_file_response
 from app.models.video_script import MediaStatus, ScriptStatus, VoiceAudio
-from typing import List
+from typing import List, Optional
+import asyncio
+import json
 import logging
 from pydantic import BaseModel
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
+settings = get_settings()
 google_tts_service = GoogleTTSService()
+narration_service = NarrationService(google_tts_service.media)
 
 class TextToSpeechRequest(BaseModel):
     text: str
@@ -22,22 +34,22 @@ class TextToSpeechRequest(BaseModel):
 @router.post("/text-to-speech", response_model=VoiceResponse)
 async def text_to_speech(request: VoiceRequest, db: Session = Depends(get_db)):
     """
-    Chuyển đổi một đoạn text thành giọng nói và trả về base64 audio
+    Chuyển đổi một đoạn text thành giọng nói và trả về URL tải file audio
     """
     try:
         logger.info(f"Generating voice for text: {request.text[:100]}...")
 
-        # Tạo audio base64 từ text
-        audio_base64 = google_tts_service.generate_voice(
+        # Tạo file audio trong thư mục media
+        audio_url = await google_tts_service.generate_voice_async(
             text=request.text,
             voice_id=request.voice_id,
             speed=request.speed
         )
 
-        logger.info("Successfully generated base64 audio")
+        logger.info("Successfully generated audio")
 
         return VoiceResponse(
-            audio_base64=audio_base64,
+            url=media_url(audio_url),
             text=request.text,
             voice_id=request.voice_id,
             speed=request.speed
@@ -47,99 +59,186 @@ async def text_to_speech(request: VoiceRequest, db: Session = Depends(get_db)):
         logger.error(f"Error in text_to_speech: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/text-to-speech/audio")
+async def text_to_speech_audio(request: VoiceRequest):
+    """
+    Chuyển đổi một đoạn text thành giọng nói và trả về trực tiếp nội dung MP3 (binary)
+    """
+    try:
+        audio_content = await google_tts_service.synthesize_async(
+            text=request.text,
+            voice_id=request.voice_id,
+            speed=request.speed
+        )
+        return Response(content=audio_content, media_type="audio/mpeg")
+    except Exception as e:
+        logger.error(f"Error in text_to_speech_audio: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+def _ndjson(event: dict) -> str:
+    return json.dumps(event, ensure_ascii=False, default=lambda o: o.dict() if isinstance(o, BaseModel) else str(o)) + "\n"
+
+async def _script_voice_events(
+    db: Session,
+    script,
+    request: TextToSpeechRequest,
+    concurrency: Optional[int] = None,
+    batch: bool = False
+):
+    """
+    Tạo voice song song cho các scene có voice_over của script
+    (batch=True: gom nhiều scene vào một request SSML).
+    Yield một sự kiện "scene" khi mỗi scene xong và sự kiện "completed" cuối cùng;
+    toàn bộ kết quả được ghi vào database trong một transaction ở cuối
+    """
+    # Đánh dấu processing trước để client khác thấy script đang được xử lý
+    statuses = {scene.id: scene.voice_status for scene in script.scenes}
+    targets = []
+    for scene in script.scenes:
+        if not scene.voice_over:
+            continue
+        targets.append((scene, scene.id, scene.scene_number, scene.voice_over))
+        scene.voice_status = MediaStatus.PROCESSING.value
+        statuses[scene.id] = MediaStatus.PROCESSING.value
+    script.status = ScriptStatus.PROCESSING.value
+    script_id = script.id
+    db.commit()
+
+    limit = concurrency or settings.TTS_DEFAULT_CONCURRENCY
+    semaphore = asyncio.Semaphore(max(1, min(limit, google_tts_service.max_concurrency)))
+
+    async def synthesize(target):
+        async with semaphore:
+            try:
+                return target, await google_tts_service.generate_voice_async(
+                    text=target[3],
+                    voice_id=request.voice_id,
+                    speed=request.speed
+                )
+            except Exception as e:
+                logger.error(f"Error generating voice for scene {target[1]}: {str(e)}")
+                return target, None
+
+    async def synthesized():
+        if batch:
+            async for index, audio_url in google_tts_service.iter_voices_batch(
+                [target[3] for target in targets],
+                voice_id=request.voice_id,
+                speed=request.speed
+            ):
+                yield targets[index], audio_url
+            return
+        for next_done in asyncio.as_completed([synthesize(target) for target in targets]):
+            yield await next_done
+
+    responses = []
+    voice_audios = []
+    async for (scene, scene_id, scene_number, text), audio_url in synthesized():
+        status = MediaStatus.COMPLETED.value if audio_url else MediaStatus.FAILED.value
+        statuses[scene_id] = status
+        scene.voice_status = status
+        yield {"event": "scene", "scene_id": scene_id, "scene_number": scene_number, "status": status}
+        if not audio_url:
+            continue
+
+        voice_audios.append({
+            "scene_id": scene_id,
+            "audio_url": audio_url,
+            "text_content": text,
+            "voice_id": request.voice_id,
+            "speed": request.speed,
+            "status": MediaStatus.COMPLETED.value
+        })
+        responses.append(TextToSpeechResponse(
+            audio_url=media_url(audio_url),
+            text=text,
+            voice_id=request.voice_id,
+            speed=request.speed,
+            scene_number=scene_number
+        ))
+
+    # Script hoàn thành khi tất cả scenes đã có voice
+    all_completed = all(status == MediaStatus.COMPLETED.value for status in statuses.values())
+    script_status = ScriptStatus.COMPLETED.value if all_completed else ScriptStatus.FAILED.value
+    try:
+        # Một INSERT cho tất cả voice audio, commit cùng trạng thái script
+        crud.create_voice_audios_bulk(db, voice_audios, commit=False)
+        script.status = script_status
+        db.commit()
+    except Exception:
+        # Không lưu được thì xóa các file vừa tạo để không để lại file mồ côi
+        for voice_audio in voice_audios:
+            google_tts_service.media.delete(voice_audio["audio_url"])
+        raise
+
+    responses.sort(key=lambda response: response.scene_number)
+    yield {"event": "completed", "script_id": script_id, "status": script_status, "voices": responses}
+
 @router.post("/script-to-speech/{script_id}", response_model=List[TextToSpeechResponse])
 async def script_to_speech(
     script_id: str,
     request: TextToSpeechRequest,
+    concurrency: Optional[int] = None,
+    stream: bool = False,
+    batch: Optional[bool] = None,
     db: Session = Depends(get_db)
 ):
     """
-    Tạo voice cho tất cả các scene trong một video script
+    Tạo voice cho tất cả các scene trong một video script.
+    Các scene được tạo song song, tối đa `concurrency` scene cùng lúc cho request này
+    (không vượt quá giới hạn chung TTS_MAX_CONCURRENCY).
+    Với stream=true, trạng thái từng scene được trả về dạng NDJSON ngay khi scene đó xong.
+    Với batch=true (mặc định theo TTS_SSML_BATCH_ENABLED), voice_over của nhiều scene được gom
+    vào một request SSML để giảm số lời gọi API
     """
     try:
         logger.info(f"Generating voices for script: {script_id}")
 
         # Lấy script từ database
-        script = crud.get_script(db, script_id)
+        script = crud.get_script(db, script_id, options=crud.WITH_SCENES)
         if not script:
             raise HTTPException(status_code=404, detail="Script not found")
 
-        # Cập nhật trạng thái script thành processing
-        script.status = ScriptStatus.PROCESSING.value
-        db.commit()
+        batch = settings.TTS_SSML_BATCH_ENABLED if batch is None else batch
+        if stream:
+            async def event_stream():
+                # Session riêng cho stream vì response kéo dài hơn vòng đời của dependency
+                stream_db = SessionLocal()
+                try:
+                    async for event in _script_voice_events(
+                        stream_db, crud.get_script(stream_db, script_id, options=crud.WITH_SCENES), request, concurrency, batch
+                    ):
+                        yield _ndjson(event)
+                except Exception as e:
+                    stream_db.rollback()
+                    logger.error(f"Error in script_to_speech stream: {str(e)}")
+                    crud.update_script(stream_db, script_id, {"status": ScriptStatus.FAILED.value})
+                    yield _ndjson({"event": "error", "detail": str(e)})
+                finally:
+                    stream_db.close()
+
+            return StreamingResponse(event_stream(), media_type="application/x-ndjson")
 
         responses = []
-        # Tạo voice cho từng scene
-        for scene in script.scenes:
-            if not scene.voice_over:
-                continue
-
-            logger.info(f"Generating voice for scene: {scene.id}")
-
-            # Cập nhật trạng thái scene thành processing
-            scene.voice_status = MediaStatus.PROCESSING.value
-            db.commit()
-
-            try:
-                # Tạo voice cho scene
-                audio_base64 = google_tts_service.generate_voice(
-                    text=scene.voice_over,
-                    voice_id=request.voice_id,
-                    speed=request.speed
-                )
-
-                # Lưu thông tin voice vào database
-                audio_data = {
-                    "audio_base64": audio_base64,
-                    "text_content": scene.voice_over,
-                    "voice_id": request.voice_id,
-                    "speed": request.speed,
-                    "status": MediaStatus.COMPLETED.value
-                }
-                voice_audio = crud.create_voice_audio(
-                    db=db,
-                    scene_id=scene.id,
-                    audio_data=audio_data
-                )
-
-                # Cập nhật trạng thái scene thành completed
-                scene.voice_status = MediaStatus.COMPLETED.value
-                db.commit()
-
-                responses.append(TextToSpeechResponse(
-                    audio_base64=audio_base64,
-                    text=scene.voice_over,
-                    voice_id=request.voice_id,
-                    speed=request.speed,
-                    scene_number=scene.scene_number
-                ))
-            except Exception as e:
-                scene.voice_status = MediaStatus.FAILED.value
-                db.commit()
-                continue
-
-        # Kiểm tra xem tất cả scenes đã hoàn thành chưa
-        all_completed = all(scene.voice_status == MediaStatus.COMPLETED.value for scene in script.scenes)
-        if all_completed:
-            script.status = ScriptStatus.COMPLETED.value
-        else:
-            script.status = ScriptStatus.FAILED.value
-        db.commit()
-
+        async for event in _script_voice_events(db, script, request, concurrency, batch):
+            if event["event"] == "completed":
+                responses = event["voices"]
         return responses
+    except HTTPException:
+        raise
     except Exception as e:
         db.rollback()
         logger.error(f"Error in script_to_speech: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/list/{script_id}", response_model=List[TextToSpeechResponse])
-async def get_script_voices(script_id: str, db: Session = Depends(get_db)):
+async def get_script_voices(script_id: str, db: AsyncSession = Depends(get_async_db)):
     """
-    Lấy tất cả các voice audio của một script
+    Lấy tất cả các voice audio của một script (chỉ trả về URL, tải audio qua /api/media)
     """
     try:
         # Lấy script từ database
-        script = crud.get_script(db, script_id)
+        script = await async_crud.get_script(db, script_id, options=crud.WITH_SCENE_VOICES)
         if not script:
             raise HTTPException(status_code=404, detail="Script not found")
 
@@ -148,17 +247,91 @@ async def get_script_voices(script_id: str, db: Session = Depends(get_db)):
         for scene in script.scenes:
             for voice_audio in scene.voice_audios:
                 responses.append(TextToSpeechResponse(
-                    audio_base64=voice_audio.audio_base64,
+                    audio_url=media_url(voice_audio.audio_url),
                     text=voice_audio.text_content,
                     voice_id=voice_audio.voice_id,
                     speed=voice_audio.speed,
-                    scene_number=scene.scene_number
+                    scene_number=scene.scene_number,
+                    duration_ms=voice_audio.duration_ms
                 ))
 
         return responses
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/play/{scene_id}")
+async def play_scene_voice(scene_id: str, request: Request, db: Session = Depends(get_db)):
+    """
+    Stream voice audio mới nhất của scene (binary, hỗ trợ HTTP Range)
+    """
+    voice_audio = (
+        db.query(VoiceAudio)
+        .filter(VoiceAudio.scene_id == scene_id, VoiceAudio.status == MediaStatus.COMPLETED.value)
+        .order_by(VoiceAudio.created_at.desc())
+        .first()
+    )
+    if not voice_audio or not voice_audio.audio_url:
+        raise HTTPException(status_code=404, detail="Voice audio not found")
+    try:
+        audio_path = google_tts_service.media.path(voice_audio.audio_url)
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Voice audio not found")
+    return ranged_file_response(audio_path, request.headers.get("range"))
+
+def _narration_pause(pause_ms: Optional[int]) -> int:
+    return settings.NARRATION_PAUSE_MS if pause_ms is None else max(0, pause_ms)
+
+def _assemble_narration(db: Session, script_id: str, pause_ms: Optional[int]) -> dict:
+    """Ghép track thuyết minh (query và đọc/ghi file đồng bộ: chạy trong threadpool)"""
+    script = crud.get_script(db, script_id, options=crud.WITH_SCENE_VOICES)
+    if not script:
+        raise HTTPException(status_code=404, detail="Script not found")
+    try:
+        return narration_service.assemble(db, script, _narration_pause(pause_ms))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/narration/{script_id}", response_model=NarrationResponse)
+async def build_narration(script_id: str, pause_ms: Optional[int] = None, db: Session = Depends(get_db)):
+    """
+    Ghép voice audio của tất cả scenes thành một track thuyết minh, cập nhật thời lượng thực
+    của từng scene. Track chỉ được ghép lại khi có scene thay đổi
+    """
+    try:
+        narration = await run_in_threadpool(_assemble_narration, db, script_id, pause_ms)
+        return NarrationResponse(**narration, audio_url=media_url(narration["audio_path"]))
+    except HTTPException:
+        raise
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error in build_narration: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/play-script/{script_id}")
+async def play_script_voice(
+    script_id: str,
+    request: Request,
+    pause_ms: Optional[int] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Stream track thuyết minh đã ghép của toàn bộ script (binary, hỗ trợ HTTP Range).
+    Chỉ đọc: track phải được tạo trước bằng POST /narration/{script_id}
+    """
+    script = await async_crud.get_script(db, script_id, options=crud.WITH_SCENE_VOICES)
+    if not script:
+        raise HTTPException(status_code=404, detail="Script not found")
+    try:
+        audio_path = narration_service.find_track(script, _narration_pause(pause_ms))
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if audio_path is None:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Narration is not assembled for the current voices; POST /api/voice/narration/{script_id} first"
+        )
+    return ranged_file_response(google_tts_service.media.path(audio_path), request.headers.get("range"))
+
 @router.put("/update/{scene_id}", response_model=TextToSpeechResponse)
 async def update_voice(
     scene_id: str,
@@ -180,48 +353,50 @@ async def update_voice(
 
         try:
             # Tạo voice mới cho scene
-            audio_base64 = google_tts_service.generate_voice(
+            audio_url = await google_tts_service.generate_voice_async(
                 text=request.voice_over,
                 voice_id=request.voice_id,
                 speed=request.speed
             )
 
-            # Cập nhật voice_over trong scene
+            # Cập nhật voice_over và thay các voice audio cũ của scene trong một transaction
             scene.voice_over = request.voice_over
-            db.commit()
-
-            # Xóa các voice audio cũ của scene
+            old_audio_urls = [voice_audio.audio_url for voice_audio in scene.voice_audios]
             for voice_audio in scene.voice_audios:
                 db.delete(voice_audio)
-            db.commit()
 
-            # Lưu thông tin voice mới vào database
-            audio_data = {
-                "audio_base64": audio_base64,
-                "text_content": request.voice_over,
-                "voice_id": request.voice_id,
-                "speed": request.speed,
-                "status": MediaStatus.COMPLETED.value
-            }
-            voice_audio = crud.create_voice_audio(
-                db=db,
+            db.add(VoiceAudio(
                 scene_id=scene.id,
-                audio_data=audio_data
-            )
+                audio_url=audio_url,
+                text_content=request.voice_over,
+                voice_id=request.voice_id,
+                speed=request.speed,
+                status=MediaStatus.COMPLETED.value
+            ))
 
             # Cập nhật trạng thái scene thành completed
             scene.voice_status = MediaStatus.COMPLETED.value
-            db.commit()
+            scene_number = scene.scene_number
+            try:
+                db.commit()
+            except Exception:
+                google_tts_service.media.delete(audio_url)
+                raise
+
+            # Chỉ xóa file cũ sau khi database đã không còn tham chiếu tới chúng
+            for old_audio_url in old_audio_urls:
+                google_tts_service.media.delete(old_audio_url)
 
             return TextToSpeechResponse(
-                audio_base64=audio_base64,
+                audio_url=media_url(audio_url),
                 text=request.voice_over,
                 voice_id=request.voice_id,
                 speed=request.speed,
-                scene_number=scene.scene_number
+                scene_number=scene_number
             )
 
         except Exception as e:
+            db.rollback()
             scene.voice_status = MediaStatus.FAILED.value
             db.commit()
             raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,355 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+def hash_key(data: Any) -> str:
+    """Tạo key SHA-256 ổn định từ dữ liệu có thể serialize JSON"""
+    raw = json.dumps(data, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class LRUCache:
+    """Cache LRU trong bộ nhớ, giới hạn số phần tử và có TTL"""
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: Optional[float] = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.time():
+                del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value: Any, ttl_seconds: Optional[float] = None) -> None:
+        ttl = ttl_seconds if ttl_seconds is not None else self.ttl_seconds
+        expires_at = time.time() + ttl if ttl else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class SQLiteCache:
+    """
+    Tầng cache trên đĩa dùng SQLite cho giá trị dạng text.
+    Có TTL và giới hạn theo số phần tử / tổng dung lượng (xóa bản ghi ít được dùng nhất trước).
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_entries: int = 10000,
+        max_bytes: Optional[int] = None,
+        ttl_seconds: Optional[float] = None,
+    ):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, "
+            "expires_at REAL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_cache_last_access ON cache (last_access)")
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, expires_at = row
+            if expires_at is not None and expires_at <= now:
+                self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+                return None
+            self._conn.execute("UPDATE cache SET last_access = ? WHERE key = ?", (now, key))
+            return value
+
+    def set(self, key: str, value: str, ttl_seconds: Optional[float] = None) -> None:
+        ttl = ttl_seconds if ttl_seconds is not None else self.ttl_seconds
+        now = time.time()
+        expires_at = now + ttl if ttl else None
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, size, expires_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                (key, value, len(value.encode("utf-8")), expires_at, now),
+            )
+            self._evict(now)
+
+    def _evict(self, now: float) -> None:
+        self._conn.execute("DELETE FROM cache WHERE expires_at IS NOT NULL AND expires_at <= ?", (now,))
+        count, total = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache").fetchone()
+        over_count = max(0, count - self.max_entries)
+        if over_count:
+            self._conn.execute(
+                "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY last_access LIMIT ?)",
+                (over_count,),
+            )
+        if self.max_bytes is not None and total > self.max_bytes:
+            # Xóa dần các bản ghi cũ nhất cho tới khi về dưới giới hạn dung lượng
+            to_free = total - self.max_bytes
+            rows = self._conn.execute("SELECT key, size FROM cache ORDER BY last_access").fetchall()
+            victims = []
+            for key, size in rows:
+                if to_free <= 0:
+                    break
+                victims.append((key,))
+                to_free -= size
+            self._conn.executemany("DELETE FROM cache WHERE key = ?", victims)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM cache")
+
+
+class TieredCache:
+    """Cache hai tầng: LRU trong bộ nhớ và (tùy chọn) SQLite trên đĩa, có đếm hit/miss"""
+
+    def __init__(self, name: str, memory: LRUCache, disk: Optional[SQLiteCache] = None):
+        self.name = name
+        self.memory = memory
+        self.disk = disk
+
+    def get(self, key: str) -> Optional[str]:
+        value = self.memory.get(key)
+        if value is not None:
+            metrics.inc("cache_requests_total", cache=self.name, result="hit_memory")
+            return value
+        if self.disk is not None:
+            try:
+                value = self.disk.get(key)
+            except sqlite3.Error as e:
+                logger.error(f"Disk cache '{self.name}' read failed: {e}")
+                value = None
+            if value is not None:
+                self.memory.set(key, value)
+                metrics.inc("cache_requests_total", cache=self.name, result="hit_disk")
+                return value
+        metrics.inc("cache_requests_total", cache=self.name, result="miss")
+        return None
+
+    def set(self, key: str, value: str) -> None:
+        self.memory.set(key, value)
+        if self.disk is not None:
+            try:
+                self.disk.set(key, value)
+            except sqlite3.Error as e:
+                logger.error(f"Disk cache '{self.name}' write failed: {e}")
+
+    def delete(self, key: str) -> None:
+        self.memory.delete(key)
+        if self.disk is not None:
+            self.disk.delete(key)
+
+    def stats(self) -> dict:
+        return {
+            "hit_memory": metrics.get_counter("cache_requests_total", cache=self.name, result="hit_memory"),
+            "hit_disk": metrics.get_counter("cache_requests_total", cache=self.name, result="hit_disk"),
+            "miss": metrics.get_counter("cache_requests_total", cache=self.name, result="miss"),
+            "memory_entries": len(self.memory),
+        }
+
+
+class BlobCache:
+    """
+    Kho blob theo nội dung trên đĩa: mỗi key là một file trong `directory`.
+    Giới hạn tổng dung lượng, xóa file ít được dùng nhất trước (thứ tự LRU lưu qua mtime).
+    """
+
+    def __init__(self, name: str, directory: str, max_bytes: int, suffix: str = ""):
+        self.name = name
+        self.directory = os.path.abspath(directory)
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self._index: "OrderedDict[str, int]" = OrderedDict()
+        self._total = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+        self._load()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key + self.suffix)
+
+    def _load(self) -> None:
+        """Dựng lại chỉ mục từ các file có sẵn, file cũ nhất đứng đầu"""
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for filename in files:
+                path = os.path.join(root, filename)
+                if filename.endswith(".tmp"):
+                    # File ghi dở từ lần chạy trước
+                    os.remove(path)
+                    continue
+                if not filename.endswith(self.suffix):
+                    continue
+                stat = os.stat(path)
+                entries.append((stat.st_mtime, filename[:len(filename) - len(self.suffix)], stat.st_size))
+        for _, key, size in sorted(entries):
+            self._index[key] = size
+            self._total += size
+        with self._lock:
+            self._evict()
+
+    def get(self, key: str) -> Optional[str]:
+        """Trả về đường dẫn file của key, hoặc None nếu chưa có"""
+        path = self._path(key)
+        with self._lock:
+            if key in self._index and os.path.exists(path):
+                self._index.move_to_end(key)
+                os.utime(path)
+                metrics.inc("cache_requests_total", cache=self.name, result="hit_disk")
+                return path
+            if key in self._index:
+                self._total -= self._index.pop(key)
+        metrics.inc("cache_requests_total", cache=self.name, result="miss")
+        return None
+
+    def put(self, key: str, data: bytes) -> str:
+        """Ghi blob (atomic) và trả về đường dẫn file"""
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self._total -= self._index.pop(key, 0)
+            self._index[key] = len(data)
+            self._total += len(data)
+            self._evict()
+        return path
+
+    def _evict(self) -> None:
+        # Luôn giữ lại blob mới nhất kể cả khi một mình nó vượt giới hạn
+        while self._total > self.max_bytes and len(self._index) > 1:
+            key, size = self._index.popitem(last=False)
+            self._total -= size
+            try:
+                os.remove(self._path(key))
+            except FileNotFoundError:
+                pass
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._total -= self._index.pop(key, 0)
+            try:
+                os.remove(self._path(key))
+            except FileNotFoundError:
+                pass
+
+    def stats(self) -> dict:
+        return {
+            "hit_disk": metrics.get_counter("cache_requests_total", cache=self.name, result="hit_disk"),
+            "miss": metrics.get_counter("cache_requests_total", cache=self.name, result="miss"),
+            "entries": len(self._index),
+            "bytes": self._total,
+        }
+
+
+class SWRCache:
+    """
+    Cache kết quả async trong bộ nhớ với TTL và stale-while-revalidate:
+    - còn hạn: trả về ngay
+    - hết hạn nhưng còn trong cửa sổ stale: trả về giá trị cũ và làm mới ở nền
+    - không có: gọi upstream; các request trùng key đang chờ dùng chung một lời gọi (singleflight)
+    Lỗi từ upstream không được cache.
+    """
+
+    def __init__(self, name: str, max_entries: int = 1024):
+        self.name = name
+        self.memory = LRUCache(max_entries=max_entries)
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+    async def get_or_fetch(
+        self,
+        key: str,
+        fetch: Callable[[], Awaitable[Any]],
+        ttl_seconds: float,
+        stale_seconds: float = 0,
+    ) -> Any:
+        entry = self.memory.get(key)
+        if entry is not None:
+            value, fresh_until = entry
+            if time.time() < fresh_until:
+                metrics.inc("cache_requests_total", cache=self.name, result="hit_memory")
+                return value
+            metrics.inc("cache_requests_total", cache=self.name, result="hit_stale")
+            self._start_fetch(key, fetch, ttl_seconds, stale_seconds)
+            return value
+
+        if key in self._inflight:
+            metrics.inc("cache_requests_total", cache=self.name, result="hit_coalesced")
+        else:
+            metrics.inc("cache_requests_total", cache=self.name, result="miss")
+        # shield: một client hủy request không hủy lời gọi upstream mà request khác đang chờ
+        return await asyncio.shield(self._start_fetch(key, fetch, ttl_seconds, stale_seconds))
+
+    def _start_fetch(self, key: str, fetch, ttl_seconds: float, stale_seconds: float) -> asyncio.Task:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch(key, fetch, ttl_seconds, stale_seconds))
+            task.add_done_callback(self._log_failure)
+            self._inflight[key] = task
+        return task
+
+    async def _fetch(self, key: str, fetch, ttl_seconds: float, stale_seconds: float) -> Any:
+        try:
+            value = await fetch()
+            self.memory.set(key, (value, time.time() + ttl_seconds), ttl_seconds=ttl_seconds + stale_seconds)
+            return value
+        finally:
+            self._inflight.pop(key, None)
+
+    def _log_failure(self, task: asyncio.Task) -> None:
+        # Lấy exception để lần làm mới ở nền bị lỗi không bị báo "exception was never retrieved"
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"Cache '{self.name}' fetch failed: {task.exception()}")
@@ -22,16 +22,80 @@ class Settings(BaseSettings):
 
     # DeepSeek Configuration
     DEEPSEEK_API_KEY: str = os.getenv("DEEPSEEK_API_KEY", "")
+    DEEPSEEK_API_URL: str = os.getenv("DEEPSEEK_API_URL", "https://openrouter.ai/api/v1/chat/completions")
+    DEEPSEEK_MODEL: str = os.getenv("DEEPSEEK_MODEL", "deepseek/deepseek-chat:free")
+    # "single": một lần gọi trả về cả kịch bản và cảnh; "two_step": hai lần gọi như cũ
+    DEEPSEEK_GENERATION_MODE: str = os.getenv("DEEPSEEK_GENERATION_MODE", "single")
+
+    # Batch script generation
+    SCRIPT_BATCH_MAX_TOPICS: int = int(os.getenv("SCRIPT_BATCH_MAX_TOPICS", "500"))
+    SCRIPT_BATCH_MAX_CONCURRENCY: int = int(os.getenv("SCRIPT_BATCH_MAX_CONCURRENCY", "8"))
+    # Số kịch bản lưu vào database mỗi lần (lưu ngay khi đủ nhóm, không chờ cả batch)
+    SCRIPT_BATCH_PERSIST_CHUNK_SIZE: int = int(os.getenv("SCRIPT_BATCH_PERSIST_CHUNK_SIZE", "10"))
+
+    # LLM response cache
+    LLM_CACHE_ENABLED: bool = os.getenv("LLM_CACHE_ENABLED", "True").lower() == "true"
+    LLM_CACHE_MAX_ENTRIES: int = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "512"))
+    LLM_CACHE_TTL_SECONDS: int = int(os.getenv("LLM_CACHE_TTL_SECONDS", "86400"))
+    # Để trống để tắt tầng cache SQLite trên đĩa
+    LLM_CACHE_SQLITE_PATH: str = os.getenv("LLM_CACHE_SQLITE_PATH", "")
+    LLM_CACHE_SQLITE_MAX_ENTRIES: int = int(os.getenv("LLM_CACHE_SQLITE_MAX_ENTRIES", "10000"))
+    LLM_CACHE_SQLITE_MAX_BYTES: int = int(os.getenv("LLM_CACHE_SQLITE_MAX_BYTES", str(200 * 1024 * 1024)))
+
+    # Shared async HTTP client (connection pool)
+    HTTP_MAX_CONNECTIONS: int = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+    HTTP_KEEPALIVE_EXPIRY: float = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+    HTTP_CONNECT_TIMEOUT: float = float(os.getenv("HTTP_CONNECT_TIMEOUT", "10"))
+    HTTP_READ_TIMEOUT: float = float(os.getenv("HTTP_READ_TIMEOUT", "120"))
 
     # Zalo AI Configuration
     ZALO_AI_API_KEY: str = os.getenv("ZALO_AI_API_KEY", "")
 
     # Google TTS Configuration
     GOOGLE_APPLICATION_CREDENTIALS: str = os.getenv("GOOGLE_APPLICATION_CREDENTIALS", "")
+    # Số lời gọi synthesize_speech song song tối đa trên toàn process / mặc định cho mỗi request.
+    # Giữ thấp hơn quota requests/phút của project Google Cloud
+    TTS_MAX_CONCURRENCY: int = int(os.getenv("TTS_MAX_CONCURRENCY", "8"))
+    TTS_DEFAULT_CONCURRENCY: int = int(os.getenv("TTS_DEFAULT_CONCURRENCY", "4"))
+    # Gom voice_over của nhiều scene vào một request SSML (<mark>) khi tạo voice cho cả script
+    TTS_SSML_BATCH_ENABLED: bool = os.getenv("TTS_SSML_BATCH_ENABLED", "False").lower() == "true"
+    # Khoảng lặng mặc định giữa các scene khi ghép track thuyết minh (ms)
+    NARRATION_PAUSE_MS: int = int(os.getenv("NARRATION_PAUSE_MS", "0"))
+    # Cache audio đã tổng hợp theo hash (text, voice_id, speed), lưu file MP3 trên đĩa
+    TTS_CACHE_ENABLED: bool = os.getenv("TTS_CACHE_ENABLED", "True").lower() == "true"
+    TTS_CACHE_DIR: str = os.getenv("TTS_CACHE_DIR", "storage/tts_cache")
+    TTS_CACHE_MAX_BYTES: int = int(os.getenv("TTS_CACHE_MAX_BYTES", str(1024 * 1024 * 1024)))
+    # Thư mục lưu file media (audio, ...) do ứng dụng quản lý
+    MEDIA_ROOT: str = os.getenv("MEDIA_ROOT", "storage/media")
+    # Prefix URL trả về cho client để tải file media (route /api/media)
+    MEDIA_URL_PREFIX: str = os.getenv("MEDIA_URL_PREFIX", "/api/media")
+    # Thời hạn (giây) của URL media đã ký; URL thực tế còn hiệu lực từ 1 tới 2 lần giá trị này
+    MEDIA_URL_TTL_SECONDS: int = int(os.getenv("MEDIA_URL_TTL_SECONDS", "3600"))
 
     # Replicate Configuration
     REPLICATE_API_TOKEN: str = os.getenv("REPLICATE_API_TOKEN", "")
     REPLICATE_MODEL_ID: str = os.getenv("REPLICATE_MODEL_ID", "stability-ai/sdxl:39ed52f2a78e934b3ba6e2a89f5b1c712de7dfea535525255b1aa35c5565e08b")
+    # Số ảnh được tạo song song tối đa trên toàn process / mặc định cho mỗi request
+    IMAGE_GENERATION_MAX_CONCURRENCY: int = int(os.getenv("IMAGE_GENERATION_MAX_CONCURRENCY", "8"))
+    IMAGE_GENERATION_DEFAULT_CONCURRENCY: int = int(os.getenv("IMAGE_GENERATION_DEFAULT_CONCURRENCY", "4"))
+    # Thời gian URL output của Replicate còn tải được sau khi tạo (khoảng 1 giờ)
+    REPLICATE_OUTPUT_URL_LIFETIME_SECONDS: int = int(os.getenv("REPLICATE_OUTPUT_URL_LIFETIME_SECONDS", "3600"))
+    # Cache ảnh theo hash tham số tạo ảnh. TTL thực tế không vượt quá một nửa thời gian sống của URL
+    # output, để URL lấy từ cache (và lưu vào SceneImage) còn dùng được ít nhất nửa thời gian đó
+    IMAGE_CACHE_ENABLED: bool = os.getenv("IMAGE_CACHE_ENABLED", "True").lower() == "true"
+    IMAGE_CACHE_MAX_ENTRIES: int = int(os.getenv("IMAGE_CACHE_MAX_ENTRIES", "2048"))
+    IMAGE_CACHE_TTL_SECONDS: int = int(os.getenv("IMAGE_CACHE_TTL_SECONDS", "1800"))
+    IMAGE_CACHE_SQLITE_PATH: str = os.getenv("IMAGE_CACHE_SQLITE_PATH", "")
+    IMAGE_CACHE_SQLITE_MAX_ENTRIES: int = int(os.getenv("IMAGE_CACHE_SQLITE_MAX_ENTRIES", "50000"))
+    # Tạo ảnh bất đồng bộ: URL public của endpoint /api/images/webhooks/replicate (để trống: chỉ dùng poller).
+    # Webhook chỉ được đăng ký và chấp nhận khi có REPLICATE_WEBHOOK_SECRET
+    REPLICATE_WEBHOOK_URL: str = os.getenv("REPLICATE_WEBHOOK_URL", "")
+    REPLICATE_WEBHOOK_SECRET: str = os.getenv("REPLICATE_WEBHOOK_SECRET", "")
+    REPLICATE_POLL_INTERVAL_SECONDS: float = float(os.getenv("REPLICATE_POLL_INTERVAL_SECONDS", "5"))
+    REPLICATE_POLL_BATCH_SIZE: int = int(os.getenv("REPLICATE_POLL_BATCH_SIZE", "100"))
+    # Prediction chưa có kết quả sau thời gian này (giây) bị đánh dấu FAILED
+    REPLICATE_PREDICTION_MAX_AGE_SECONDS: int = int(os.getenv("REPLICATE_PREDICTION_MAX_AGE_SECONDS", "1800"))
 
     # YouTube API Configuration
     YOUTUBE_API_KEY: str = os.getenv("YOUTUBE_API_KEY", "")
@@ -39,6 +103,24 @@ class Settings(BaseSettings):
     # TikTok API Configuration (RapidAPI)
     RAPIDAPI_KEY: str = os.getenv("RAPIDAPI_KEY", "")
 
+    # Cache kết quả tìm kiếm video (TTL theo từng endpoint, giây) và cửa sổ stale-while-revalidate
+    SEARCH_CACHE_MAX_ENTRIES: int = int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", "2048"))
+    SEARCH_CACHE_YOUTUBE_TTL_SECONDS: int = int(os.getenv("SEARCH_CACHE_YOUTUBE_TTL_SECONDS", "900"))
+    SEARCH_CACHE_TIKTOK_TTL_SECONDS: int = int(os.getenv("SEARCH_CACHE_TIKTOK_TTL_SECONDS", "600"))
+    SEARCH_CACHE_TIKTOK_USER_TTL_SECONDS: int = int(os.getenv("SEARCH_CACHE_TIKTOK_USER_TTL_SECONDS", "600"))
+    SEARCH_CACHE_TRENDING_TTL_SECONDS: int = int(os.getenv("SEARCH_CACHE_TRENDING_TTL_SECONDS", "1800"))
+    SEARCH_CACHE_STALE_SECONDS: int = int(os.getenv("SEARCH_CACHE_STALE_SECONDS", "3600"))
+    # Thời gian chờ tối đa cho mỗi nguồn của /search/all (nguồn chậm hơn bị bỏ qua)
+    SEARCH_SOURCE_TIMEOUT_SECONDS: float = float(os.getenv("SEARCH_SOURCE_TIMEOUT_SECONDS", "8"))
+
+    # Tìm Google qua trang HTML tĩnh trước, chỉ dùng trình duyệt khi trang tĩnh không có kết quả
+    GOOGLE_SEARCH_STATIC_ENABLED: bool = os.getenv("GOOGLE_SEARCH_STATIC_ENABLED", "True").lower() == "true"
+
+    # Pool Chrome headless cho GoogleSearchService
+    WEBDRIVER_POOL_SIZE: int = int(os.getenv("WEBDRIVER_POOL_SIZE", "2"))
+    WEBDRIVER_MAX_USES: int = int(os.getenv("WEBDRIVER_MAX_USES", "50"))  # Thay phiên mới sau số lần dùng này
+    WEBDRIVER_ACQUIRE_TIMEOUT_SECONDS: float = float(os.getenv("WEBDRIVER_ACQUIRE_TIMEOUT_SECONDS", "30"))
+
     # Google Custom Search API Configuration
     GOOGLE_API_KEY: str = os.getenv("GOOGLE_API_KEY", "")
     GOOGLE_SEARCH_ENGINE_ID: str = os.getenv("GOOGLE_SEARCH_ENGINE_ID", "")
@@ -1,5 +1,7 @@
-from databases import Database
+from typing import AsyncIterator, Optional
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
 from sqlalchemy.orm import declarative_base
 from app.core.config import settings  # Sử dụng settings từ config
 from sqlalchemy.orm import sessionmaker, Session
@@ -20,5 +22,63 @@ def get_db():
         db.close()
 
 
-database = Database(DATABASE_URL)
+# Driver async tương ứng với driver sync trong DATABASE_URL
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+
+def async_database_url(url: str) -> str:
+    """Đổi DATABASE_URL (psycopg2/sqlite) sang driver async (asyncpg/aiosqlite)"""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for database backend '{backend}'")
+    query = dict(parsed.query)
+    if backend == "postgresql":
+        # asyncpg không nhận tham số libpq: sslmode -> ssl, bỏ channel_binding (vd. URL của Neon)
+        if "sslmode" in query:
+            query["ssl"] = query.pop("sslmode")
+        query.pop("channel_binding", None)
+    return parsed.set(drivername=ASYNC_DRIVERS[backend], query=query).render_as_string(hide_password=False)
+
+
+# Engine async tạo lần đầu khi được dùng (không bắt buộc cài driver async nếu chỉ dùng session sync)
+_async_engine: Optional[AsyncEngine] = None
+_async_session_factory: Optional[sessionmaker] = None
+
+
+def get_async_engine() -> AsyncEngine:
+    global _async_engine
+    if _async_engine is None:
+        _async_engine = create_async_engine(async_database_url(DATABASE_URL), echo=False)
+    return _async_engine
+
+
+def get_async_session_factory() -> sessionmaker:
+    global _async_session_factory
+    if _async_session_factory is None:
+        # expire_on_commit=False: đọc thuộc tính sau commit không cần (và không thể) lazy load
+        _async_session_factory = sessionmaker(
+            get_async_engine(), class_=AsyncSession, autoflush=False, expire_on_commit=False
+        )
+    return _async_session_factory
+
+
+async def get_async_db() -> AsyncIterator[AsyncSession]:
+    """Dependency AsyncSession: truy vấn database không chặn event loop"""
+    async with get_async_session_factory()() as db:
+        yield db
+
+
+async def close_async_engine() -> None:
+    """Đóng connection pool async (gọi khi tắt ứng dụng)"""
+    global _async_engine, _async_session_factory
+    if _async_engine is not None:
+        await _async_engine.dispose()
+    _async_engine = None
+    _async_session_factory = None
+
+
 Base = declarative_base()
@@ -0,0 +1,43 @@
+import logging
+import threading
+from functools import lru_cache
+import httplib2
+from googleapiclient.discovery import build_from_document
+from googleapiclient.discovery_cache import get_static_doc
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+# httplib2.Http (và Resource dùng nó) không thread-safe: mỗi thread giữ client riêng
+_local = threading.local()
+
+
+@lru_cache(maxsize=None)
+def _discovery_document(service_name: str, version: str) -> str:
+    """Discovery document đóng gói sẵn trong google-api-python-client, chỉ đọc một lần mỗi process"""
+    document = get_static_doc(service_name, version)
+    if document is None:
+        raise ValueError(f"No bundled discovery document for {service_name} {version}")
+    return document
+
+
+def get_google_api_client(service_name: str, version: str, developer_key: str):
+    """
+    Lấy client Google API (YouTube, Custom Search, ...) dùng lại được giữa các request.
+    Client được tạo một lần cho mỗi thread, với Http riêng giữ kết nối keep-alive
+    """
+    clients = getattr(_local, "clients", None)
+    if clients is None:
+        clients = _local.clients = {}
+    key = (service_name, version, developer_key)
+    client = clients.get(key)
+    if client is None:
+        settings = get_settings()
+        client = build_from_document(
+            _discovery_document(service_name, version),
+            developerKey=developer_key,
+            http=httplib2.Http(timeout=settings.HTTP_READ_TIMEOUT)
+        )
+        clients[key] = client
+        logger.info(f"Google API client {service_name} {version} created for thread {threading.current_thread().name}")
+    return client
@@ -0,0 +1,52 @@
+import logging
+from typing import Optional
+import httpx
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+# AsyncClient dùng chung cho toàn bộ process để tái sử dụng kết nối (keep-alive)
+_client: Optional[httpx.AsyncClient] = None
+
+
+def _http2_available() -> bool:
+    """HTTP/2 chỉ bật được khi đã cài package h2 (httpx[http2])"""
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Lấy AsyncClient dùng chung, khởi tạo lần đầu khi được gọi"""
+    global _client
+    if _client is None or _client.is_closed:
+        settings = get_settings()
+        http2 = _http2_available()
+        _client = httpx.AsyncClient(
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=settings.HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY,
+            ),
+            timeout=httpx.Timeout(
+                settings.HTTP_READ_TIMEOUT,
+                connect=settings.HTTP_CONNECT_TIMEOUT,
+            ),
+        )
+        logger.info(
+            f"Shared HTTP client initialized (http2={http2}, "
+            f"max_connections={settings.HTTP_MAX_CONNECTIONS})"
+        )
+    return _client
+
+
+async def close_http_client() -> None:
+    """Đóng AsyncClient dùng chung (gọi khi tắt ứng dụng)"""
+    global _client
+    if _client is not None and not _client.is_closed:
+        await _client.aclose()
+        logger.info("Shared HTTP client closed")
+    _client = None
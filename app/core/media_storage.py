@@ -0,0 +1,128 @@
+import hashlib
+import hmac
+import logging
+import os
+import shutil
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import BinaryIO, Iterator, Optional
+from urllib.parse import quote, urlencode
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+COPY_CHUNK_SIZE = 1024 * 1024
+
+
+class MediaStorage:
+    """
+    Thư mục media do ứng dụng quản lý. File được tham chiếu bằng đường dẫn tương đối
+    (lưu trong database); mọi lần ghi đều atomic và file ghi dở luôn được dọn ngay.
+    """
+
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+        os.makedirs(self.root, exist_ok=True)
+
+    def path(self, relative_path: str) -> str:
+        """Đường dẫn tuyệt đối của file, không cho phép thoát khỏi thư mục gốc"""
+        full_path = os.path.abspath(os.path.join(self.root, relative_path))
+        if os.path.commonpath([self.root, full_path]) != self.root:
+            raise ValueError(f"Invalid media path: {relative_path}")
+        return full_path
+
+    @staticmethod
+    def new_name(prefix: str, suffix: str) -> str:
+        """Tạo đường dẫn tương đối mới, duy nhất, dạng prefix/ab/<uuid><suffix>"""
+        name = uuid.uuid4().hex
+        return f"{prefix}/{name[:2]}/{name}{suffix}"
+
+    @contextmanager
+    def open_writer(self, relative_path: str) -> Iterator[BinaryIO]:
+        """
+        Ghi file theo từng phần vào file .tmp cạnh file đích rồi os.replace khi thành công;
+        nếu có lỗi thì xóa file .tmp
+        """
+        full_path = self.path(relative_path)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        tmp_path = f"{full_path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                yield f
+            os.replace(tmp_path, full_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def write_bytes(self, relative_path: str, data: bytes) -> str:
+        """Ghi nội dung vào file media, trả về đường dẫn tương đối"""
+        with self.open_writer(relative_path) as f:
+            f.write(data)
+        return relative_path
+
+    def import_file(self, source_path: str, relative_path: str) -> str:
+        """
+        Đưa một file có sẵn (vd. blob trong cache) vào thư mục media.
+        Dùng hard link nếu cùng filesystem, nếu không thì chép theo từng khối.
+        """
+        full_path = self.path(relative_path)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        try:
+            os.link(source_path, full_path)
+            return relative_path
+        except OSError:
+            pass
+        with open(source_path, "rb") as src, self.open_writer(relative_path) as dst:
+            shutil.copyfileobj(src, dst, COPY_CHUNK_SIZE)
+        return relative_path
+
+    def delete(self, relative_path: Optional[str]) -> None:
+        if not relative_path:
+            return
+        try:
+            os.remove(self.path(relative_path))
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            logger.error(f"Failed to delete media file {relative_path}: {e}")
+
+
+_storage: Optional[MediaStorage] = None
+
+
+def get_media_storage() -> MediaStorage:
+    """Lấy MediaStorage dùng chung tại MEDIA_ROOT, khởi tạo lần đầu khi được gọi"""
+    global _storage
+    if _storage is None:
+        _storage = MediaStorage(get_settings().MEDIA_ROOT)
+    return _storage
+
+
+def sign_media_path(relative_path: str, expires: int) -> str:
+    """Chữ ký HMAC-SHA256 (SECRET_KEY) cho quyền tải `relative_path` tới thời điểm `expires` (unix time)"""
+    message = f"{relative_path}\n{expires}".encode("utf-8")
+    return hmac.new(get_settings().SECRET_KEY.encode("utf-8"), message, hashlib.sha256).hexdigest()
+
+
+def verify_media_signature(relative_path: str, expires: int, signature: str) -> bool:
+    """URL media hợp lệ: chưa hết hạn và chữ ký khớp đường dẫn"""
+    if expires < time.time():
+        return False
+    return hmac.compare_digest(sign_media_path(relative_path, expires), signature)
+
+
+def media_url(relative_path: Optional[str]) -> Optional[str]:
+    """URL tải file media (ký, có hạn MEDIA_URL_TTL_SECONDS) từ đường dẫn tương đối lưu trong database"""
+    if not relative_path or os.path.isabs(relative_path) or "://" in relative_path:
+        # Bản ghi cũ lưu đường dẫn tuyệt đối/URL: giữ nguyên
+        return relative_path
+    settings = get_settings()
+    ttl = max(1, settings.MEDIA_URL_TTL_SECONDS)
+    # Làm tròn hạn theo TTL: URL giữ nguyên trong một khoảng TTL nên trình duyệt vẫn cache được,
+    # và luôn còn hiệu lực ít nhất TTL giây sau khi được cấp
+    expires = (int(time.time()) // ttl + 2) * ttl
+    query = urlencode({"expires": expires, "sig": sign_media_path(relative_path, expires)})
+    return f"{settings.MEDIA_URL_PREFIX.rstrip('/')}/{quote(relative_path)}?{query}"
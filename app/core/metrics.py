@@ -0,0 +1,73 @@
+import threading
+from collections import defaultdict, deque
+from typing import Deque, Dict, Optional
+
+
+def _metric_key(name: str, labels: Dict[str, str]) -> str:
+    if not labels:
+        return name
+    label_str = ",".join(f"{k}={v}" for k, v in sorted(labels.items()))
+    return f"{name}{{{label_str}}}"
+
+
+def _percentile(sorted_values, percent: float) -> Optional[float]:
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(percent / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class MetricsRegistry:
+    """Bộ đếm và thống kê độ trễ trong bộ nhớ của process (counter + p50/p95)"""
+
+    def __init__(self, max_samples: int = 2000):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, float] = defaultdict(float)
+        self._timings: Dict[str, Deque[float]] = {}
+        self._timing_counts: Dict[str, int] = defaultdict(int)
+        self._max_samples = max_samples
+
+    def inc(self, name: str, value: float = 1, **labels: str) -> None:
+        key = _metric_key(name, labels)
+        with self._lock:
+            self._counters[key] += value
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        """Ghi nhận một mẫu (thường là độ trễ tính bằng giây)"""
+        key = _metric_key(name, labels)
+        with self._lock:
+            samples = self._timings.get(key)
+            if samples is None:
+                samples = self._timings[key] = deque(maxlen=self._max_samples)
+            samples.append(value)
+            self._timing_counts[key] += 1
+
+    def get_counter(self, name: str, **labels: str) -> float:
+        with self._lock:
+            return self._counters.get(_metric_key(name, labels), 0)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            counters = dict(self._counters)
+            timings = {key: sorted(samples) for key, samples in self._timings.items()}
+            timing_counts = dict(self._timing_counts)
+
+        summary = {}
+        for key, values in timings.items():
+            summary[key] = {
+                "count": timing_counts[key],
+                "avg": sum(values) / len(values) if values else None,
+                "p50": _percentile(values, 50),
+                "p95": _percentile(values, 95),
+                "max": values[-1] if values else None,
+            }
+        return {"counters": counters, "timings": summary}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._timings.clear()
+            self._timing_counts.clear()
+
+
+metrics = MetricsRegistry()
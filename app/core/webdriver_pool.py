@@ -0,0 +1,180 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import List, Optional
+from selenium import webdriver
+from selenium.common.exceptions import TimeoutException, WebDriverException
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.chrome.service import Service
+from webdriver_manager.chrome import ChromeDriverManager
+from app.core.config import get_settings
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=None)
+def chromedriver_path() -> str:
+    """Đường dẫn chromedriver, chỉ tải/kiểm tra phiên bản một lần mỗi process"""
+    path = ChromeDriverManager().install()
+    logger.info(f"Using chromedriver at {path}")
+    return path
+
+
+class _PooledDriver:
+    def __init__(self, driver: webdriver.Chrome):
+        self.driver = driver
+        self.uses = 0
+
+
+class WebDriverPool:
+    """
+    Pool các phiên Chrome headless dùng lại giữa các request.
+    Giới hạn số phiên chạy đồng thời (request thừa chờ trong hàng đợi), kiểm tra phiên
+    còn sống trước khi cho mượn và thay phiên mới sau `max_uses` lần dùng
+    """
+
+    def __init__(self, size: int, max_uses: int, acquire_timeout: float):
+        self.size = size
+        self.max_uses = max_uses
+        self.acquire_timeout = acquire_timeout
+        self._idle: List[_PooledDriver] = []
+        self._created = 0
+        self._closed = False
+        self._condition = threading.Condition()
+
+    def _create(self) -> _PooledDriver:
+        chrome_options = Options()
+        chrome_options.add_argument("--headless")  # Chạy ẩn
+        chrome_options.add_argument("--no-sandbox")
+        chrome_options.add_argument("--disable-dev-shm-usage")
+
+        driver = webdriver.Chrome(service=Service(chromedriver_path()), options=chrome_options)
+        metrics.inc("webdriver_sessions_total", event="created")
+        return _PooledDriver(driver)
+
+    @staticmethod
+    def _healthy(pooled: _PooledDriver) -> bool:
+        try:
+            pooled.driver.execute_script("return 1")
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def _quit(pooled: _PooledDriver, event: str) -> None:
+        try:
+            pooled.driver.quit()
+        except Exception as e:
+            logger.warning(f"Error closing WebDriver session: {e}")
+        metrics.inc("webdriver_sessions_total", event=event)
+
+    def _discard(self, pooled: _PooledDriver, event: str) -> None:
+        """Đóng phiên và giải phóng chỗ trong pool"""
+        self._quit(pooled, event)
+        with self._condition:
+            self._created -= 1
+            self._condition.notify()
+
+    def _acquire(self) -> _PooledDriver:
+        started = time.perf_counter()
+        deadline = time.monotonic() + self.acquire_timeout
+        with self._condition:
+            while True:
+                if self._closed:
+                    raise RuntimeError("WebDriver pool is closed")
+                if self._idle:
+                    pooled = self._idle.pop()
+                    break
+                if self._created < self.size:
+                    self._created += 1
+                    pooled = None
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError(f"No WebDriver session available after {self.acquire_timeout}s")
+                self._condition.wait(remaining)
+        metrics.observe("webdriver_acquire_wait_seconds", time.perf_counter() - started)
+
+        if pooled is not None:
+            if self._healthy(pooled):
+                return pooled
+            # Giữ nguyên chỗ trong pool và thay bằng phiên mới
+            logger.warning("Replacing unhealthy WebDriver session")
+            self._quit(pooled, "unhealthy")
+
+        # Khởi động Chrome ngoài lock để không chặn các request đang trả phiên
+        try:
+            return self._create()
+        except Exception:
+            with self._condition:
+                self._created -= 1
+                self._condition.notify()
+            raise
+
+    def _release(self, pooled: _PooledDriver, broken: bool) -> None:
+        pooled.uses += 1
+        if broken:
+            self._discard(pooled, "failed")
+            return
+        if pooled.uses >= self.max_uses:
+            self._discard(pooled, "recycled")
+            return
+        with self._condition:
+            if not self._closed:
+                self._idle.append(pooled)
+                self._condition.notify()
+                return
+        self._discard(pooled, "closed")
+
+    @contextmanager
+    def session(self):
+        """Mượn một WebDriver trong khối `with`, trả lại pool khi xong"""
+        pooled = self._acquire()
+        broken = False
+        try:
+            yield pooled.driver
+        except TimeoutException:
+            # Chờ phần tử quá lâu không có nghĩa là trình duyệt hỏng
+            raise
+        except WebDriverException:
+            broken = True
+            raise
+        finally:
+            self._release(pooled, broken)
+
+    def close(self) -> None:
+        """Đóng các phiên đang rảnh; phiên đang được dùng sẽ đóng khi trả lại"""
+        with self._condition:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._condition.notify_all()
+        for pooled in idle:
+            self._discard(pooled, "closed")
+
+
+_pool: Optional[WebDriverPool] = None
+
+
+def get_webdriver_pool() -> WebDriverPool:
+    """Lấy WebDriverPool dùng chung, khởi tạo lần đầu khi được gọi"""
+    global _pool
+    if _pool is None or _pool._closed:
+        settings = get_settings()
+        _pool = WebDriverPool(
+            size=settings.WEBDRIVER_POOL_SIZE,
+            max_uses=settings.WEBDRIVER_MAX_USES,
+            acquire_timeout=settings.WEBDRIVER_ACQUIRE_TIMEOUT_SECONDS,
+        )
+    return _pool
+
+
+def close_webdriver_pool() -> None:
+    """Đóng pool dùng chung (gọi khi tắt ứng dụng)"""
+    global _pool
+    if _pool is not None:
+        _pool.close()
+        logger.info("WebDriver pool closed")
+    _pool = None
@@ -0,0 +1,118 @@
+from datetime import datetime, timezone
+from sqlalchemy import and_, bindparam, func, update
+from sqlalchemy.orm import Session, selectinload
+from app.models.script_batch import ScriptBatchJob, ScriptBatchItem
+from app.models.video_script import MediaStatus
+from typing import List, Dict, Any, Optional
+
+
+def create_batch_job(db: Session, status: str, topics: List[str], duplicates_skipped: int) -> ScriptBatchJob:
+    """Tạo job cùng các chủ đề (trạng thái pending) trong một transaction"""
+    db_job = ScriptBatchJob(
+        status=status,
+        total=len(topics),
+        duplicates_skipped=duplicates_skipped,
+        items=[
+            ScriptBatchItem(position=position, topic=topic, status=MediaStatus.PENDING.value)
+            for position, topic in enumerate(topics)
+        ]
+    )
+    db.add(db_job)
+    db.commit()
+    db.refresh(db_job)
+    return db_job
+
+
+def get_batch_job(db: Session, job_id: str) -> Optional[ScriptBatchJob]:
+    """Lấy job cùng các chủ đề theo thứ tự"""
+    return (
+        db.query(ScriptBatchJob)
+        .options(selectinload(ScriptBatchJob.items))
+        .filter(ScriptBatchJob.id == job_id)
+        .first()
+    )
+
+
+def start_batch_job(db: Session, job_id: str) -> None:
+    """Đánh dấu các chủ đề của job đang xử lý"""
+    db.execute(
+        update(ScriptBatchItem)
+        .where(ScriptBatchItem.job_id == job_id)
+        .values(status=MediaStatus.PROCESSING.value)
+    )
+    db.commit()
+
+
+def record_batch_results(db: Session, job_id: str, results: List[Dict[str, Any]], commit: bool = True) -> None:
+    """
+    Ghi kết quả một nhóm chủ đề (position, status, script_id, error) bằng một executemany
+    và cộng dồn bộ đếm của job trong cùng transaction
+    """
+    if not results:
+        return
+    db.execute(
+        update(ScriptBatchItem.__table__)
+        .where(and_(
+            ScriptBatchItem.__table__.c.job_id == bindparam("b_job_id"),
+            ScriptBatchItem.__table__.c.position == bindparam("b_position")
+        ))
+        .values(
+            status=bindparam("b_status"),
+            script_id=bindparam("b_script_id"),
+            error=bindparam("b_error")
+        ),
+        [
+            {
+                "b_job_id": job_id,
+                "b_position": result["position"],
+                "b_status": result["status"],
+                "b_script_id": result.get("script_id"),
+                "b_error": result.get("error")
+            }
+            for result in results
+        ]
+    )
+    completed = sum(1 for result in results if result["status"] == MediaStatus.COMPLETED.value)
+    db.execute(
+        update(ScriptBatchJob)
+        .where(ScriptBatchJob.id == job_id)
+        .values(
+            completed=ScriptBatchJob.completed + completed,
+            failed=ScriptBatchJob.failed + (len(results) - completed)
+        )
+    )
+    if commit:
+        db.commit()
+
+
+def finish_batch_job(db: Session, job_id: str, status: str, error: str) -> None:
+    """
+    Kết thúc job: các chủ đề chưa có kết quả được đánh dấu lỗi (giữ lỗi đã ghi nếu có),
+    bộ đếm được tính lại từ các chủ đề
+    """
+    items = ScriptBatchItem.__table__.c
+    db.execute(
+        update(ScriptBatchItem.__table__)
+        .where(and_(
+            items.job_id == job_id,
+            items.status.notin_([MediaStatus.COMPLETED.value, MediaStatus.FAILED.value])
+        ))
+        .values(status=MediaStatus.FAILED.value, error=func.coalesce(items.error, error))
+    )
+    counts = dict(
+        db.query(ScriptBatchItem.status, func.count(ScriptBatchItem.id))
+        .filter(ScriptBatchItem.job_id == job_id)
+        .group_by(ScriptBatchItem.status)
+        .all()
+    )
+    db.execute(
+        update(ScriptBatchJob)
+        .where(ScriptBatchJob.id == job_id)
+        .values(
+            status=status,
+            completed=counts.get(MediaStatus.COMPLETED.value, 0),
+            failed=counts.get(MediaStatus.FAILED.value, 0),
+            finished_at=datetime.now(timezone.utc)
+        )
+    )
+    db.commit()
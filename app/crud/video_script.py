@@ -1,9 +1,27 @@
-from sqlalchemy.orm import Session
-from app.models.video_script import VideoScript, Scene, VoiceAudio, SceneImage, ScriptStatus
+from sqlalchemy import and_, func, insert, or_, select
+from sqlalchemy.orm import Session, selectinload
+from app.models.video_script import VideoScript, Scene, VoiceAudio, SceneImage, ScriptStatus, MediaStatus
 from app.schemas.video_script import CreateScriptRequest
-from typing import List, Dict, Any, Optional
+from app.utils.pagination import decode_cursor, encode_cursor
+from typing import List, Dict, Any, Optional, Sequence, Tuple
+import logging
 import uuid
 
+logger = logging.getLogger(__name__)
+
+# Các trường nội dung của cảnh được so sánh khi cập nhật kịch bản
+SCENE_CONTENT_FIELDS = ("description", "duration", "visual_elements", "background_music", "voice_over")
+
+# Loader options cho từng kiểu truy cập: nạp trước quan hệ sẽ dùng bằng một truy vấn IN mỗi cấp
+# thay vì lazy load từng bản ghi (N+1) khi serialize response
+WITH_SCENES = (selectinload(VideoScript.scenes),)
+WITH_SCENE_IMAGES = (selectinload(VideoScript.scenes).selectinload(Scene.images),)
+WITH_SCENE_VOICES = (selectinload(VideoScript.scenes).selectinload(Scene.voice_audios),)
+WITH_SCENE_MEDIA = (
+    selectinload(VideoScript.scenes).selectinload(Scene.images),
+    selectinload(VideoScript.scenes).selectinload(Scene.voice_audios),
+)
+
 def create_script(db: Session, request: CreateScriptRequest) -> VideoScript:
     """Tạo mới một kịch bản video"""
     db_script = VideoScript(
@@ -18,13 +36,101 @@ def create_script(db: Session, request: CreateScriptRequest) -> VideoScript:
     db.refresh(db_script)
     return db_script
 
-def get_script(db: Session, script_id: str) -> VideoScript:
+def get_script(db: Session, script_id: str, options: Sequence = ()) -> VideoScript:
     """Lấy thông tin một kịch bản video"""
-    return db.query(VideoScript).filter(VideoScript.id == script_id).first()
+    return db.query(VideoScript).options(*options).filter(VideoScript.id == script_id).first()
+
+def newest_first(query):
+    # Thứ tự ổn định (id phân biệt các bản ghi cùng created_at), khớp index (..., created_at, id)
+    return query.order_by(VideoScript.created_at.desc(), VideoScript.id.desc())
+
+def keyset_query(query, cursor: Optional[str], limit: int):
+    """
+    Giới hạn Query/select vào trang sau vị trí `cursor` theo (created_at, id) giảm dần.
+    Chi phí không phụ thuộc độ sâu của trang như offset. Lấy thêm một bản ghi để biết còn trang sau
+    """
+    query = newest_first(query)
+    if cursor:
+        created_at, last_id = decode_cursor(cursor)
+        query = query.filter(or_(
+            VideoScript.created_at < created_at,
+            and_(VideoScript.created_at == created_at, VideoScript.id < last_id)
+        ))
+    return query.limit(limit + 1)
+
+def keyset_result(items: list, limit: int) -> Tuple[list, Optional[str]]:
+    """Tách kết quả của keyset_query thành (các bản ghi của trang, cursor trang sau hoặc None)"""
+    if limit <= 0 or len(items) <= limit:
+        return items[:max(limit, 0)], None
+    last = items[limit - 1]
+    return items[:limit], encode_cursor(last.created_at, last.id)
+
+def filter_scripts(query, user_id: Optional[str] = None, status: Optional[ScriptStatus] = None):
+    if user_id:
+        query = query.filter(VideoScript.creator_id == user_id)
+    if status:
+        query = query.filter(VideoScript.status == status.value)
+    return query
+
+def script_summary_columns() -> list:
+    """Các cột của màn hình danh sách kịch bản, kèm số cảnh"""
+    scene_count = (
+        select(func.count(Scene.id))
+        .where(Scene.script_id == VideoScript.id)
+        .scalar_subquery()
+        .label("scene_count")
+    )
+    return [
+        VideoScript.id,
+        VideoScript.creator_id,
+        VideoScript.title,
+        VideoScript.target_audience,
+        VideoScript.total_duration,
+        VideoScript.status,
+        VideoScript.created_at,
+        VideoScript.updated_at,
+        scene_count
+    ]
+
+def with_ids(rows_data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Gán id (uuid) phía client cho các bản ghi insert hàng loạt để không phải đọc lại"""
+    return [{**data, "id": data.get("id") or str(uuid.uuid4())} for data in rows_data]
 
-def get_scripts(db: Session, skip: int = 0, limit: int = 100) -> List[VideoScript]:
+def get_scripts(db: Session, skip: int = 0, limit: int = 100, options: Sequence = ()) -> List[VideoScript]:
     """Lấy danh sách các kịch bản video"""
-    return db.query(VideoScript).offset(skip).limit(limit).all()
+    return newest_first(db.query(VideoScript).options(*options)).offset(skip).limit(limit).all()
+
+def get_scripts_page(
+    db: Session,
+    cursor: Optional[str] = None,
+    limit: int = 100,
+    user_id: Optional[str] = None,
+    status: Optional[ScriptStatus] = None,
+    options: Sequence = ()
+) -> Tuple[List[VideoScript], Optional[str]]:
+    """Lấy một trang kịch bản (mới nhất trước) bằng phân trang keyset, trả về kèm cursor trang sau"""
+    query = filter_scripts(db.query(VideoScript).options(*options), user_id, status)
+    return keyset_result(keyset_query(query, cursor, limit).all(), limit)
+
+def get_script_summaries(
+    db: Session,
+    user_id: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 100,
+    status: Optional[ScriptStatus] = None,
+    cursor: Optional[str] = None
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Danh sách kịch bản cho màn hình danh sách: chỉ lấy các cột cần hiển thị và số cảnh,
+    không nạp nội dung cảnh/hình ảnh/giọng nói (một truy vấn duy nhất).
+    Phân trang keyset theo `cursor`, trừ khi truyền `skip` (offset, giữ cho client cũ)
+    """
+    query = filter_scripts(db.query(*script_summary_columns()), user_id, status)
+    if skip:
+        rows, next_cursor = newest_first(query).offset(skip).limit(limit).all(), None
+    else:
+        rows, next_cursor = keyset_result(keyset_query(query, cursor, limit).all(), limit)
+    return [dict(row._mapping) for row in rows], next_cursor
 
 def update_script(db: Session, script_id: str, update_data: Dict[str, Any]) -> VideoScript:
     """Cập nhật thông tin kịch bản video"""
@@ -60,6 +166,84 @@ def create_scene(db: Session, script_id: str, scene_data: Dict[str, Any]) -> Sce
     db.refresh(db_scene)
     return db_scene
 
+def create_scripts_bulk(db: Session, scripts_data: List[Dict[str, Any]], commit: bool = True) -> List[str]:
+    """Tạo nhiều kịch bản bằng một câu lệnh INSERT, trả về danh sách id"""
+    rows = with_ids(scripts_data)
+    if rows:
+        db.execute(insert(VideoScript), rows)
+    if commit:
+        db.commit()
+    return [row["id"] for row in rows]
+
+def create_scenes_bulk(db: Session, scenes_data: List[Dict[str, Any]], commit: bool = True) -> List[str]:
+    """Tạo nhiều cảnh (mỗi phần tử có script_id) bằng một câu lệnh INSERT, trả về danh sách id"""
+    rows = with_ids(scenes_data)
+    if rows:
+        db.execute(insert(Scene), rows)
+    if commit:
+        db.commit()
+    return [row["id"] for row in rows]
+
+def apply_scene_changes(
+    db: Session,
+    script: VideoScript,
+    scenes_data: List[Dict[str, Any]],
+    commit: bool = True
+) -> Dict[str, int]:
+    """
+    Đồng bộ các cảnh của kịch bản với danh sách cảnh mới (ghép theo scene_number).
+    Chỉ cập nhật các trường thay đổi và giữ nguyên hình ảnh/giọng nói của cảnh không đổi.
+    Cảnh đã có media mà visual_elements/voice_over thay đổi được đánh dấu STALE để tạo lại.
+    scene_number do LLM sinh ra có thể trùng: chỉ giữ cảnh đầu tiên của mỗi số, bỏ (và log) các cảnh sau.
+    """
+    existing = {scene.scene_number: scene for scene in script.scenes}
+    stats = {"created": 0, "updated": 0, "unchanged": 0, "deleted": 0, "duplicates": 0}
+    seen = set()
+    new_scenes = []
+
+    for data in scenes_data:
+        number = data["scene_number"]
+        if number in seen:
+            logger.warning(
+                f"Script {script.id}: dropping duplicate scene_number {number}: {str(data.get('description'))[:100]!r}"
+            )
+            stats["duplicates"] += 1
+            continue
+        seen.add(number)
+        scene = existing.get(number)
+        if scene is None:
+            new_scenes.append({
+                "script_id": script.id,
+                **data,
+                "image_status": MediaStatus.PENDING.value,
+                "voice_status": MediaStatus.PENDING.value
+            })
+            stats["created"] += 1
+            continue
+
+        changed = {field: data.get(field) for field in SCENE_CONTENT_FIELDS if getattr(scene, field) != data.get(field)}
+        if not changed:
+            stats["unchanged"] += 1
+            continue
+
+        for field, value in changed.items():
+            setattr(scene, field, value)
+        if "visual_elements" in changed:
+            scene.image_status = MediaStatus.STALE.value if scene.images else MediaStatus.PENDING.value
+        if "voice_over" in changed:
+            scene.voice_status = MediaStatus.STALE.value if scene.voice_audios else MediaStatus.PENDING.value
+        stats["updated"] += 1
+
+    for number, scene in existing.items():
+        if number not in seen:
+            db.delete(scene)
+            stats["deleted"] += 1
+
+    create_scenes_bulk(db, new_scenes, commit=False)
+    if commit:
+        db.commit()
+    return stats
+
 def create_voice_audio(db: Session, scene_id: str, audio_data: Dict[str, Any]) -> VoiceAudio:
     """Tạo mới một file audio cho cảnh"""
     db_voice = VoiceAudio(
@@ -81,17 +265,32 @@ def create_scene_image(db: Session, scene_id: str, image_data: Dict[str, Any]) -
     db.refresh(db_image)
     return db_image
 
+def create_voice_audios_bulk(db: Session, audios_data: List[Dict[str, Any]], commit: bool = True) -> List[str]:
+    """Tạo nhiều voice audio (mỗi phần tử có scene_id) bằng một câu lệnh INSERT, trả về danh sách id"""
+    rows = with_ids(audios_data)
+    if rows:
+        db.execute(insert(VoiceAudio), rows)
+    if commit:
+        db.commit()
+    return [row["id"] for row in rows]
+
+def create_scene_images_bulk(db: Session, images_data: List[Dict[str, Any]], commit: bool = True) -> List[str]:
+    """Tạo nhiều hình ảnh (mỗi phần tử có scene_id) bằng một câu lệnh INSERT, trả về danh sách id"""
+    rows = with_ids(images_data)
+    if rows:
+        db.execute(insert(SceneImage), rows)
+    if commit:
+        db.commit()
+    return [row["id"] for row in rows]
+
 def get_scripts_by_user(
     db: Session,
     user_id: str,
     skip: int = 0,
     limit: int = 100,
-    status: Optional[ScriptStatus] = None
+    status: Optional[ScriptStatus] = None,
+    options: Sequence = ()
 ) -> List[VideoScript]:
     """Lấy danh sách kịch bản video của một người dùng"""
-    query = db.query(VideoScript).filter(VideoScript.creator_id == user_id)
-    
-    if status:
-        query = query.filter(VideoScript.status == status)
-    
-    return query.offset(skip).limit(limit).all() 
\ No newline at end of file
+    query = filter_scripts(db.query(VideoScript).options(*options), user_id, status)
+    return newest_first(query).offset(skip).limit(limit).all() 
\ No newline at end of file
@@ -0,0 +1,82 @@
+"""
+Phiên bản async (AsyncSession) của các hàm CRUD kịch bản dùng ở các endpoint nóng.
+Truy vấn và điều kiện phân trang dùng chung với app/crud/video_script.py.
+"""
+from sqlalchemy import insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.crud.video_script import (
+    filter_scripts,
+    keyset_query,
+    keyset_result,
+    newest_first,
+    script_summary_columns,
+    with_ids,
+)
+from app.models.video_script import VideoScript, Scene, ScriptStatus
+from typing import List, Dict, Any, Optional, Sequence, Tuple
+
+
+async def get_script(db: AsyncSession, script_id: str, options: Sequence = ()) -> Optional[VideoScript]:
+    """Lấy thông tin một kịch bản video"""
+    result = await db.execute(select(VideoScript).options(*options).where(VideoScript.id == script_id))
+    return result.scalars().first()
+
+async def get_scripts(db: AsyncSession, skip: int = 0, limit: int = 100, options: Sequence = ()) -> List[VideoScript]:
+    """Lấy danh sách các kịch bản video"""
+    result = await db.execute(newest_first(select(VideoScript).options(*options)).offset(skip).limit(limit))
+    return result.scalars().all()
+
+async def get_scripts_page(
+    db: AsyncSession,
+    cursor: Optional[str] = None,
+    limit: int = 100,
+    user_id: Optional[str] = None,
+    status: Optional[ScriptStatus] = None,
+    options: Sequence = ()
+) -> Tuple[List[VideoScript], Optional[str]]:
+    """Lấy một trang kịch bản (mới nhất trước) bằng phân trang keyset, trả về kèm cursor trang sau"""
+    query = filter_scripts(select(VideoScript).options(*options), user_id, status)
+    result = await db.execute(keyset_query(query, cursor, limit))
+    return keyset_result(result.scalars().all(), limit)
+
+async def get_script_summaries(
+    db: AsyncSession,
+    user_id: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 100,
+    status: Optional[ScriptStatus] = None,
+    cursor: Optional[str] = None
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Danh sách rút gọn kịch bản (xem crud.video_script.get_script_summaries)"""
+    query = filter_scripts(select(*script_summary_columns()), user_id, status)
+    if skip:
+        result = await db.execute(newest_first(query).offset(skip).limit(limit))
+        rows, next_cursor = result.all(), None
+    else:
+        result = await db.execute(keyset_query(query, cursor, limit))
+        rows, next_cursor = keyset_result(result.all(), limit)
+    return [dict(row._mapping) for row in rows], next_cursor
+
+async def create_scripts_bulk(db: AsyncSession, scripts_data: List[Dict[str, Any]], commit: bool = True) -> List[str]:
+    """Tạo nhiều kịch bản bằng một câu lệnh INSERT, trả về danh sách id"""
+    rows = with_ids(scripts_data)
+    if rows:
+        await db.execute(insert(VideoScript), rows)
+    if commit:
+        await db.commit()
+    return [row["id"] for row in rows]
+
+async def create_scenes_bulk(db: AsyncSession, scenes_data: List[Dict[str, Any]], commit: bool = True) -> List[str]:
+    """Tạo nhiều cảnh (mỗi phần tử có script_id) bằng một câu lệnh INSERT, trả về danh sách id"""
+    rows = with_ids(scenes_data)
+    if rows:
+        await db.execute(insert(Scene), rows)
+    if commit:
+        await db.commit()
+    return [row["id"] for row in rows]
+
+async def update_script(db: AsyncSession, script_id: str, update_data: Dict[str, Any], commit: bool = True) -> None:
+    """Cập nhật các cột của kịch bản bằng một câu lệnh UPDATE (không nạp lại bản ghi)"""
+    await db.execute(update(VideoScript).where(VideoScript.id == script_id).values(**update_data))
+    if commit:
+        await db.commit()
@@ -1,15 +1,22 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.api import api_router
+from app.api import image as image_api
 from app.core.config import get_settings
 from app.common.exception.exception_handler import register_exception
 from app.core.logging import setup_logging
+from app.core.http_client import close_http_client
+from app.core.database import close_async_engine
+from app.core.webdriver_pool import chromedriver_path, close_webdriver_pool
+import asyncio
+import logging
 import uvicorn
 
 # Thiết lập logging
 setup_logging()
 
 settings = get_settings()
+logger = logging.getLogger(__name__)
 
 app = FastAPI(
     title=settings.APP_NAME,
@@ -24,6 +31,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],  # Cho phép client đọc cursor trang tiếp theo
 )
 
 # Đăng ký các router
@@ -33,6 +41,24 @@ app.include_router(api_router, prefix="/api")
 async def root():
     return {"message": "Welcome to Architecture Design API"}
 
+@app.on_event("startup")
+async def start_background_tasks():
+    # Theo dõi các prediction Replicate đang chạy
+    image_api.prediction_poller.start()
+    # Tải/kiểm tra chromedriver một lần khi khởi động thay vì ở lần tìm Google đầu tiên
+    try:
+        await asyncio.get_running_loop().run_in_executor(None, chromedriver_path)
+    except Exception as e:
+        logger.warning(f"Could not resolve chromedriver at startup: {e}")
+
+@app.on_event("shutdown")
+async def shutdown_http_client():
+    # Dừng task nền và đóng connection pool dùng chung khi tắt ứng dụng
+    await image_api.prediction_poller.stop()
+    await close_http_client()
+    await close_async_engine()
+    await asyncio.get_running_loop().run_in_executor(None, close_webdriver_pool)
+
 # Đăng ký exception handler
 register_exception(app)
 
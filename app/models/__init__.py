@@ -1,6 +1,7 @@
 from app.models.user import User, UserRole
 from app.models.token import RefreshToken
 from app.models.video_script import VideoScript, Scene, VoiceAudio, SceneImage
+from app.models.script_batch import ScriptBatchJob, ScriptBatchItem
 from app.core.database import Base
 
 # Export all models
@@ -12,5 +13,7 @@ __all__ = [
     "Scene",
     "VoiceAudio",
     "SceneImage",
+    "ScriptBatchJob",
+    "ScriptBatchItem",
     "Base"
 ] 
\ No newline at end of file
@@ -0,0 +1,46 @@
+from sqlalchemy import Column, String, Integer, Text, ForeignKey, DateTime, Index
+from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
+from app.core.database import Base
+import uuid
+
+
+class ScriptBatchJob(Base):
+    """Job tạo kịch bản hàng loạt (POST /video-scripts/batch), đọc được từ mọi worker"""
+    __tablename__ = "script_batch_jobs"
+
+    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    status = Column(String(20), nullable=False)
+    total = Column(Integer, nullable=False, default=0)
+    completed = Column(Integer, nullable=False, default=0)
+    failed = Column(Integer, nullable=False, default=0)
+    duplicates_skipped = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+    # Relationships
+    items = relationship(
+        "ScriptBatchItem", back_populates="job", cascade="all, delete-orphan",
+        order_by="ScriptBatchItem.position"
+    )
+
+
+class ScriptBatchItem(Base):
+    """Một chủ đề của job: trạng thái và kịch bản đã lưu"""
+    __tablename__ = "script_batch_items"
+
+    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    job_id = Column(String(36), ForeignKey("script_batch_jobs.id", ondelete="CASCADE"), nullable=False)
+    position = Column(Integer, nullable=False)
+    topic = Column(Text, nullable=False)
+    status = Column(String(20), nullable=False)
+    script_id = Column(String(36), ForeignKey("video_scripts.id", ondelete="SET NULL"), nullable=True)
+    error = Column(Text, nullable=True)
+
+    # Relationships
+    job = relationship("ScriptBatchJob", back_populates="items")
+
+    __table_args__ = (
+        # Nạp các chủ đề của job theo thứ tự; cập nhật trạng thái theo (job_id, topic)
+        Index("ix_script_batch_items_job_id_position", "job_id", "position"),
+    )
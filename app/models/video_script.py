@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, Text, Float, ForeignKey, DateTime, Enum
+from sqlalchemy import Column, String, Integer, Text, Float, ForeignKey, DateTime, Enum, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.core.database import Base
@@ -16,6 +16,7 @@ class MediaStatus(enum.Enum):
     PROCESSING = "processing"  # Đang xử lý
     COMPLETED = "completed"  # Đã hoàn thành
     FAILED = "failed"  # Có lỗi xảy ra
+    STALE = "stale"  # Nội dung cảnh đã thay đổi, cần tạo lại media
 
 class VideoScript(Base):
     __tablename__ = "video_scripts"
@@ -26,14 +27,23 @@ class VideoScript(Base):
     description = Column(Text)
     target_audience = Column(String(255))
     total_duration = Column(Integer)
-    status = Column(String(20), default=ScriptStatus.DRAFT.value)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    status = Column(String(20), default=ScriptStatus.DRAFT.value, index=True)
+    # Bắt buộc: là một phần của cursor phân trang keyset
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
     # Relationships
     creator = relationship("User", back_populates="video_scripts")
     scenes = relationship("Scene", back_populates="script", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        # Phân trang keyset danh sách kịch bản của người dùng (lọc theo trạng thái, mới nhất trước);
+        # cũng phục vụ các truy vấn chỉ lọc theo creator_id
+        Index("ix_video_scripts_creator_status_created_id", "creator_id", "status", "created_at", "id"),
+        # Phân trang keyset toàn bộ kịch bản
+        Index("ix_video_scripts_created_id", "created_at", "id"),
+    )
+
 class Scene(Base):
     __tablename__ = "scenes"
 
@@ -55,6 +65,11 @@ class Scene(Base):
     voice_audios = relationship("VoiceAudio", back_populates="scene", cascade="all, delete-orphan")
     images = relationship("SceneImage", back_populates="scene", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        # Nạp cảnh của kịch bản theo thứ tự; cũng phục vụ các truy vấn chỉ lọc theo script_id
+        Index("ix_scenes_script_id_scene_number", "script_id", "scene_number"),
+    )
+
 class VoiceAudio(Base):
     __tablename__ = "voice_audios"
 
@@ -64,24 +79,41 @@ class VoiceAudio(Base):
     text_content = Column(Text)
     voice_id = Column(String(20))
     speed = Column(Float)
+    duration_ms = Column(Integer, nullable=True)  # Thời lượng thực đo từ file audio
     status = Column(String(20), default=MediaStatus.PENDING.value)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     # Relationships
     scene = relationship("Scene", back_populates="voice_audios")
 
+    __table_args__ = (
+        # Voice của scene, mới nhất trước
+        Index("ix_voice_audios_scene_id_created_at", "scene_id", "created_at"),
+    )
+
 class SceneImage(Base):
     __tablename__ = "scene_images"
 
     id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
-    scene_id = Column(String(36), ForeignKey("scenes.id"))
+    scene_id = Column(String(36), ForeignKey("scenes.id"), index=True)
     image_url = Column(Text)  # URL của hình ảnh được tạo
     prompt = Column(Text)  # Prompt được sử dụng để tạo hình ảnh
     width = Column(Integer, default=1024)  # Chiều rộng hình ảnh
     height = Column(Integer, default=768)  # Chiều cao hình ảnh
+    # Tham số tạo ảnh còn lại (NULL: giá trị mặc định của ImageGenerationService), dùng làm khóa cache khi prediction xong
+    negative_prompt = Column(Text, nullable=True)
+    num_inference_steps = Column(Integer, nullable=True)
+    guidance_scale = Column(Float, nullable=True)
+    seed = Column(Integer, nullable=True)
     status = Column(String(20), default=MediaStatus.PENDING.value)
+    prediction_id = Column(String(64), nullable=True, index=True)  # ID prediction Replicate khi tạo ảnh bất đồng bộ
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
     # Relationships
-    scene = relationship("Scene", back_populates="images") 
\ No newline at end of file
+    scene = relationship("Scene", back_populates="images")
+
+    __table_args__ = (
+        # Poller tìm các ảnh đang xử lý, cũ nhất trước
+        Index("ix_scene_images_status_created_at", "status", "created_at"),
+    ) 
\ No newline at end of file
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Dict, List, Optional
 from datetime import datetime
 
 class VideoInfo(BaseModel):
@@ -20,4 +20,15 @@ class SearchRequest(BaseModel):
 
 class SearchResponse(BaseModel):
     videos: List[VideoInfo]
-    total_results: int 
\ No newline at end of file
+    total_results: int 
+
+class SourceStatus(BaseModel):
+    status: str  # "ok", "timeout", "error"
+    count: int = 0
+    elapsed_ms: int
+    error: Optional[str] = None
+
+class AggregatedSearchResponse(BaseModel):
+    videos: List[VideoInfo]
+    total_results: int
+    sources: Dict[str, SourceStatus]
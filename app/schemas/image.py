@@ -7,6 +7,9 @@ class ImageGenerationRequest(BaseModel):
     prompt: Optional[str] = None
     width: int = 1024
     height: int = 768
+    seed: Optional[int] = None
+    # Bỏ qua cache để tạo một biến thể mới cho cùng prompt
+    force_new_variation: bool = False
 
 class SceneImageBase(BaseModel):
     image_url: str
@@ -29,7 +32,7 @@ class SceneImage(SceneImageBase):
 class ImageGenerationResponse(BaseModel):
     id: str
     scene_id: str
-    image_url: str
+    image_url: Optional[str] = None  # None khi ảnh còn đang được tạo (status processing)
     prompt: str
     width: int
     height: int
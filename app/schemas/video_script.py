@@ -1,5 +1,5 @@
 from pydantic import BaseModel, field_validator
-from typing import List, Optional, Union
+from typing import List, Optional, Union, Literal
 from datetime import datetime
 from app.models.video_script import ScriptStatus
 
@@ -41,7 +41,49 @@ class VideoScript(BaseModel):
     class Config:
         from_attributes = True
 
+class VideoScriptSummary(BaseModel):
+    """Thông tin rút gọn của kịch bản cho màn hình danh sách (không kèm nội dung cảnh)"""
+    id: str
+    creator_id: Optional[str] = None
+    title: str
+    target_audience: Optional[str] = None
+    total_duration: Optional[int] = None
+    status: ScriptStatus = ScriptStatus.DRAFT
+    scene_count: int = 0
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
 class CreateScriptRequest(BaseModel):
     topic: str
     target_audience: str
-    duration: int 
\ No newline at end of file
+    duration: int
+    # Ghi đè chế độ tạo kịch bản mặc định (DEEPSEEK_GENERATION_MODE)
+    generation_mode: Optional[Literal["single", "two_step"]] = None
+    # Bỏ qua cache để lấy một phiên bản kịch bản mới
+    bypass_cache: bool = False
+
+class BatchScriptRequest(BaseModel):
+    topics: List[str]
+    target_audience: str
+    duration: int
+    generation_mode: Optional[Literal["single", "two_step"]] = None
+    bypass_cache: bool = False
+    # Số lời gọi LLM chạy song song tối đa (không vượt quá SCRIPT_BATCH_MAX_CONCURRENCY)
+    concurrency: Optional[int] = None
+
+class BatchScriptItem(BaseModel):
+    topic: str
+    status: str
+    script_id: Optional[str] = None
+    error: Optional[str] = None
+
+class BatchScriptJob(BaseModel):
+    job_id: str
+    status: str
+    total: int
+    completed: int = 0
+    failed: int = 0
+    duplicates_skipped: int = 0
+    items: List[BatchScriptItem]
+    created_at: datetime
+    finished_at: Optional[datetime] = None
@@ -28,8 +28,21 @@ class TextToSpeechResponse(BaseModel):
     voice_id: str
     speed: float
     scene_number: int  # Thêm số thứ tự của scene
+    duration_ms: Optional[int] = None  # Thời lượng thực, có sau khi ghép narration
 
 class UpdateVoiceRequest(BaseModel):
     voice_id: str = "vi-VN-Wavenet-A"  # Vietnamese female voice
     speed: float = 1.0
-    voice_over: str  # Text mới cho voice over 
\ No newline at end of file
+    voice_over: str  # Text mới cho voice over 
+class NarrationScene(BaseModel):
+    scene_id: str
+    scene_number: int
+    offset_ms: int  # Vị trí bắt đầu của scene trong track
+    duration_ms: int  # Thời lượng thực của voice audio
+
+class NarrationResponse(BaseModel):
+    script_id: str
+    audio_url: str
+    duration_ms: int
+    pause_ms: int
+    scenes: List[NarrationScene]
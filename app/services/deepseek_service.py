@@ -1,11 +1,19 @@
 import os
 import json
 import requests
+import httpx
 from app.schemas.video_script import VideoScript, Scene
 from app.core.config import get_settings
-from typing import List
+from app.core.http_client import get_http_client
+from typing import List, AsyncIterator, Union
 import logging
 import sys
+import time
+import asyncio
+from typing import Optional, Callable, Dict, Generator, Tuple
+from app.core.metrics import metrics
+from app.core.cache import LRUCache, SQLiteCache, TieredCache, hash_key
+from app.utils.json_stream import IncrementalJSONParser, extract_json_object
 
 # Cấu hình logging với UTF-8
 logging.basicConfig(
@@ -17,16 +25,77 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+GENERATION_MODE_SINGLE = "single"
+GENERATION_MODE_TWO_STEP = "two_step"
+
+# Tăng giá trị này mỗi khi sửa prompt để các response đã cache không còn được dùng
+PROMPT_TEMPLATE_VERSION = "2"
+
+# Các bước của một thao tác LLM, viết một lần cho cả sync và async: yield (payload, thông báo lỗi),
+# nhận lại nội dung response, return kết quả cuối cùng
+LLMSteps = Generator[Tuple[dict, str], str, VideoScript]
+
+
+def _build_response_cache(settings) -> Optional[TieredCache]:
+    """Cache response LLM: LRU trong bộ nhớ, thêm tầng SQLite nếu có cấu hình đường dẫn"""
+    if not settings.LLM_CACHE_ENABLED:
+        return None
+    disk = None
+    if settings.LLM_CACHE_SQLITE_PATH:
+        disk = SQLiteCache(
+            settings.LLM_CACHE_SQLITE_PATH,
+            max_entries=settings.LLM_CACHE_SQLITE_MAX_ENTRIES,
+            max_bytes=settings.LLM_CACHE_SQLITE_MAX_BYTES,
+            ttl_seconds=settings.LLM_CACHE_TTL_SECONDS,
+        )
+    memory = LRUCache(max_entries=settings.LLM_CACHE_MAX_ENTRIES, ttl_seconds=settings.LLM_CACHE_TTL_SECONDS)
+    return TieredCache("llm", memory, disk)
+
+
+def _json_format_block(target_audience: str, duration: int) -> str:
+    """Mô tả cấu trúc JSON kịch bản mà LLM phải trả về"""
+    return f"""Format JSON:
+        {{
+            "title": "Tiêu đề video",
+            "description": "Mô tả tổng quan",
+            "target_audience": "{target_audience}",
+            "total_duration": {duration},
+            "scenes": [
+                {{
+                    "scene_number": Số thứ tự cảnh,
+                    "description": "Mô tả ngắn gọn về cảnh",
+                    "duration": Thời lượng cảnh,
+                    "visual_elements": "Detailed description of space, lighting, characters and weather in English for image generation",
+                    "background_music": "Đề xuất nhạc nền phù hợp với cảm xúc",
+                    "voice_over": "Lời thuyết minh"
+                }}
+            ]
+        }}"""
+
+
+def dedupe_topics(topics: List[str]) -> Dict[str, str]:
+    """Loại bỏ chủ đề trùng, trả về {chủ đề đã chuẩn hóa: chủ đề gốc xuất hiện đầu tiên}"""
+    unique: Dict[str, str] = {}
+    for topic in topics:
+        normalized = " ".join(topic.split()).casefold()
+        if normalized and normalized not in unique:
+            unique[normalized] = topic.strip()
+    return unique
+
+
 class DeepSeekService:
     def __init__(self):
         settings = get_settings()
         self.api_key = settings.DEEPSEEK_API_KEY
+        self.model = settings.DEEPSEEK_MODEL
+        self.generation_mode = settings.DEEPSEEK_GENERATION_MODE
+        self.cache = _build_response_cache(settings)
         if not self.api_key or self.api_key == "your-deepseek-api-key-here":
             logger.warning("Using mock data for testing - DEEPSEEK_API_KEY not set or invalid")
             self.use_mock = True
         else:
             self.use_mock = False
-            self.api_url = "https://openrouter.ai/api/v1/chat/completions"
+            self.api_url = settings.DEEPSEEK_API_URL
             self.headers = {
                 "Authorization": f"Bearer {self.api_key}",
                 "Content-Type": "application/json",
@@ -70,161 +139,301 @@ class DeepSeekService:
             ]
         )
 
-    def generate_video_script(self, topic: str, target_audience: str, duration: int) -> VideoScript:
+    def _build_content_payload(self, topic: str, target_audience: str, duration: int) -> dict:
+        """Payload cho bước 1: tạo nội dung kịch bản tổng thể"""
+        content_prompt = f"""
+        Tạo một kịch bản video hấp dẫn về chủ đề: {topic}
+        Đối tượng mục tiêu: {target_audience}
+        Tổng thời lượng: {duration} giây
+
+        Yêu cầu:
+        1. Viết một bài viết hoàn chỉnh về chủ đề này
+        2. Bài viết phải có cấu trúc rõ ràng với các phần:
+           - Mở đầu: Giới thiệu chủ đề
+           - Thân bài: Phát triển các ý chính
+           - Kết luận: Tổng kết và call-to-action
+        3. Mỗi phần cần có nội dung chi tiết và hấp dẫn
+        4. Sử dụng ngôn ngữ phù hợp với đối tượng mục tiêu
+        """
+
+        return {
+            "model": self.model,
+            "messages": [
+                {"role": "system", "content": "Bạn là một chuyên gia viết kịch bản video chuyên nghiệp."},
+                {"role": "user", "content": content_prompt}
+            ],
+            "temperature": 0.7,
+            "max_tokens": 2000
+        }
+
+    def _build_single_payload(self, topic: str, target_audience: str, duration: int) -> dict:
+        """Payload tạo cả nội dung, tiêu đề và danh sách cảnh trong một lần gọi"""
+        prompt = f"""
+        Tạo một kịch bản video hấp dẫn về chủ đề: {topic}
+        Đối tượng mục tiêu: {target_audience}
+        Tổng thời lượng: {duration} giây
+
+        Yêu cầu:
+        1. Kịch bản có cấu trúc rõ ràng: mở đầu giới thiệu chủ đề, thân bài phát triển các ý chính, kết luận với call-to-action
+        2. Chia kịch bản thành các cảnh logic và hấp dẫn, tổng thời lượng các cảnh là {duration} giây
+        3. visual_elements của mỗi cảnh là một đoạn văn BẰNG TIẾNG ANH mô tả đầy đủ không gian, bối cảnh, đồ vật,
+           ánh sáng (nguồn sáng, hướng, màu sắc, bóng đổ), nhân vật (vị trí, tư thế, biểu cảm, trang phục) và thời tiết, thời điểm trong ngày
+        4. Đề xuất nhạc nền phù hợp với cảm xúc của cảnh
+        5. Lời thuyết minh phù hợp với đối tượng mục tiêu
+        6. Chỉ trả về một object JSON hợp lệ, không kèm giải thích
+
+        {_json_format_block(target_audience, duration)}
+        """
+
+        return {
+            "model": self.model,
+            "messages": [
+                {"role": "system", "content": "Bạn là một chuyên gia viết kịch bản và phân cảnh video, luôn trả lời bằng JSON hợp lệ."},
+                {"role": "user", "content": prompt}
+            ],
+            "response_format": {"type": "json_object"},
+            "temperature": 0.7,
+            "max_tokens": 3000
+        }
+
+    def _build_scenes_payload(self, script_content: str, target_audience: str, duration: int) -> dict:
+        """Payload cho bước 2: tách nội dung thành các cảnh"""
+        scenes_prompt = f"""
+        Dựa vào nội dung kịch bản sau, hãy tách thành các cảnh quay phù hợp:
+        {script_content}
+
+        Yêu cầu:
+        1. Tách nội dung thành các cảnh logic và hấp dẫn
+        2. Mỗi cảnh cần có mô tả chi tiết về:
+           - Không gian và bối cảnh:
+             + Vị trí diễn ra cảnh (phòng khách, phòng ngủ, sân trường, etc.)
+             + Mô tả chi tiết không gian (kích thước, màu sắc tường, sàn, trần)
+             + Các đồ vật trong không gian (bàn, ghế, tủ, etc.)
+             + Vị trí và trạng thái của các đồ vật
+           - Ánh sáng và màu sắc:
+             + Nguồn sáng (ánh sáng tự nhiên, đèn điện, etc.)
+             + Hướng chiếu sáng
+             + Màu sắc và cường độ ánh sáng
+             + Bóng đổ và hiệu ứng ánh sáng
+           - Nhân vật và trang phục:
+             + Vị trí của nhân vật trong khung hình
+             + Tư thế và biểu cảm
+             + Trang phục chi tiết (màu sắc, kiểu dáng)
+             + Các phụ kiện đi kèm
+           - Thời tiết và thời gian:
+             + Thời điểm trong ngày
+             + Điều kiện thời tiết
+             + Các yếu tố thời tiết đặc biệt (mưa, nắng, etc.)
+
+        3. Thời lượng phù hợp (tổng {duration} giây)
+        4. Mô tả chi tiết cho việc tạo hình ảnh (visual_elements) phải là một đoạn văn mô tả đầy đủ về không gian, ánh sáng, nhân vật và thời tiết BẰNG TIẾNG ANH
+        5. Đề xuất nhạc nền phù hợp với cảm xúc của cảnh
+        6. Lời thuyết minh phù hợp
+
+        {_json_format_block(target_audience, duration)}
+        """
+
+        return {
+            "model": self.model,
+            "messages": [
+                {"role": "system", "content": "Bạn là một chuyên gia phân cảnh video và thiết kế hình ảnh, có khả năng tạo ra những mô tả chi tiết và sinh động về bối cảnh, ánh sáng, và nhân vật."},
+                {"role": "user", "content": scenes_prompt}
+            ],
+            "temperature": 0.7,
+            "max_tokens": 2000
+        }
+
+    def _build_enhance_payload(self, script: VideoScript) -> dict:
+        """Payload cho yêu cầu cải thiện kịch bản"""
+        prompt = f"""
+        Cải thiện kịch bản video sau với các đề xuất chi tiết hơn:
+        {script.json()}
+
+        Yêu cầu:
+        1. Thêm chi tiết cho mỗi cảnh
+        2. Đề xuất các hiệu ứng chuyển cảnh
+        3. Tối ưu thời lượng
+        4. Thêm các yếu tố tương tác
+        """
+
+        return {
+            "model": self.model,
+            "messages": [
+                {"role": "system", "content": "Bạn là một chuyên gia chỉnh sửa kịch bản video."},
+                {"role": "user", "content": prompt}
+            ],
+            "temperature": 0.7,
+            "max_tokens": 2000
+        }
+
+    @staticmethod
+    def _parse_scene(scene_data: dict) -> Scene:
+        return Scene(
+            scene_number=scene_data['scene_number'],
+            description=scene_data['description'],
+            duration=scene_data['duration'],
+            visual_elements=scene_data['visual_elements'],
+            background_music=scene_data.get('background_music'),
+            voice_over=scene_data.get('voice_over')
+        )
+
+    def _parse_script(self, scenes_data: str) -> VideoScript:
+        """Parse nội dung JSON từ LLM thành VideoScript"""
         try:
-            logger.info(f"Generating video script for topic: {topic}")
-            
-            if self.use_mock:
-                logger.info("Using mock data for testing")
-                return self._get_mock_script(topic, target_audience, duration)
-
-            # Bước 1: Tạo nội dung kịch bản tổng thể
-            content_prompt = f"""
-            Tạo một kịch bản video hấp dẫn về chủ đề: {topic}
-            Đối tượng mục tiêu: {target_audience}
-            Tổng thời lượng: {duration} giây
-
-            Yêu cầu:
-            1. Viết một bài viết hoàn chỉnh về chủ đề này
-            2. Bài viết phải có cấu trúc rõ ràng với các phần:
-               - Mở đầu: Giới thiệu chủ đề
-               - Thân bài: Phát triển các ý chính
-               - Kết luận: Tổng kết và call-to-action
-            3. Mỗi phần cần có nội dung chi tiết và hấp dẫn
-            4. Sử dụng ngôn ngữ phù hợp với đối tượng mục tiêu
-            """
-
-            content_payload = {
-                "model": "deepseek/deepseek-chat:free",
-                "messages": [
-                    {"role": "system", "content": "Bạn là một chuyên gia viết kịch bản video chuyên nghiệp."},
-                    {"role": "user", "content": content_prompt}
-                ],
-                "temperature": 0.7,
-                "max_tokens": 2000
-            }
+            data = extract_json_object(scenes_data)
+        except json.JSONDecodeError as e:
+            logger.error(f"JSON parsing error: {e}")
+            logger.error(f"Response content: {scenes_data}")
+            raise ValueError("Could not parse scenes response")
+        except ValueError as e:
+            logger.error(f"{e}")
+            raise
 
-            logger.info("Generating overall script content...")
-            content_response = requests.post(self.api_url, headers=self.headers, json=content_payload)
-            
-            if content_response.status_code != 200:
-                logger.error(f"Content generation failed: {content_response.text}")
-                raise ValueError(f"Failed to generate script content: {content_response.text}")
-
-            script_content = content_response.json()['choices'][0]['message']['content']
-            logger.info("Successfully generated overall script content")
-
-            # Bước 2: Tách nội dung thành các cảnh
-            scenes_prompt = f"""
-            Dựa vào nội dung kịch bản sau, hãy tách thành các cảnh quay phù hợp:
-            {script_content}
-
-            Yêu cầu:
-            1. Tách nội dung thành các cảnh logic và hấp dẫn
-            2. Mỗi cảnh cần có mô tả chi tiết về:
-               - Không gian và bối cảnh:
-                 + Vị trí diễn ra cảnh (phòng khách, phòng ngủ, sân trường, etc.)
-                 + Mô tả chi tiết không gian (kích thước, màu sắc tường, sàn, trần)
-                 + Các đồ vật trong không gian (bàn, ghế, tủ, etc.)
-                 + Vị trí và trạng thái của các đồ vật
-               - Ánh sáng và màu sắc:
-                 + Nguồn sáng (ánh sáng tự nhiên, đèn điện, etc.)
-                 + Hướng chiếu sáng
-                 + Màu sắc và cường độ ánh sáng
-                 + Bóng đổ và hiệu ứng ánh sáng
-               - Nhân vật và trang phục:
-                 + Vị trí của nhân vật trong khung hình
-                 + Tư thế và biểu cảm
-                 + Trang phục chi tiết (màu sắc, kiểu dáng)
-                 + Các phụ kiện đi kèm
-               - Thời tiết và thời gian:
-                 + Thời điểm trong ngày
-                 + Điều kiện thời tiết
-                 + Các yếu tố thời tiết đặc biệt (mưa, nắng, etc.)
-
-            3. Thời lượng phù hợp (tổng {duration} giây)
-            4. Mô tả chi tiết cho việc tạo hình ảnh (visual_elements) phải là một đoạn văn mô tả đầy đủ về không gian, ánh sáng, nhân vật và thời tiết BẰNG TIẾNG ANH
-            5. Đề xuất nhạc nền phù hợp với cảm xúc của cảnh
-            6. Lời thuyết minh phù hợp
-
-            Format JSON:
-            {{
-                "title": "Tiêu đề video",
-                "description": "Mô tả tổng quan",
-                "target_audience": "{target_audience}",
-                "total_duration": {duration},
-                "scenes": [
-                    {{
-                        "scene_number": Số thứ tự cảnh,
-                        "description": "Mô tả ngắn gọn về cảnh",
-                        "duration": Thời lượng cảnh,
-                        "visual_elements": "Detailed description of space, lighting, characters and weather in English for image generation",
-                        "background_music": "Đề xuất nhạc nền phù hợp với cảm xúc",
-                        "voice_over": "Lời thuyết minh"
-                    }}
-                ]
-            }}
-            """
-
-            scenes_payload = {
-                "model": "deepseek/deepseek-chat:free",
-                "messages": [
-                    {"role": "system", "content": "Bạn là một chuyên gia phân cảnh video và thiết kế hình ảnh, có khả năng tạo ra những mô tả chi tiết và sinh động về bối cảnh, ánh sáng, và nhân vật."},
-                    {"role": "user", "content": scenes_prompt}
-                ],
-                "temperature": 0.7,
-                "max_tokens": 2000
-            }
+        # Tạo danh sách Scene
+        scenes = [self._parse_scene(scene_data) for scene_data in data.get('scenes', [])]
 
-            logger.info("Splitting content into scenes...")
-            scenes_response = requests.post(self.api_url, headers=self.headers, json=scenes_payload)
-            
-            if scenes_response.status_code != 200:
-                logger.error(f"Scene generation failed: {scenes_response.text}")
-                raise ValueError(f"Failed to generate scenes: {scenes_response.text}")
-
-            scenes_data = scenes_response.json()['choices'][0]['message']['content']
-            logger.info("Successfully generated scenes")
-
-            # Parse response và tạo VideoScript object
-            try:
-                json_start = scenes_data.find('{')
-                json_end = scenes_data.rfind('}') + 1
-                if json_start >= 0 and json_end > json_start:
-                    json_str = scenes_data[json_start:json_end]
-                    data = json.loads(json_str)
-                    
-                    # Tạo danh sách Scene
-                    scenes = []
-                    for scene_data in data.get('scenes', []):
-                        scene = Scene(
-                            scene_number=scene_data['scene_number'],
-                            description=scene_data['description'],
-                            duration=scene_data['duration'],
-                            visual_elements=scene_data['visual_elements'],
-                            background_music=scene_data.get('background_music'),
-                            voice_over=scene_data.get('voice_over')
-                        )
-                        scenes.append(scene)
-
-                    # Tạo VideoScript object
-                    script = VideoScript(
-                        title=data['title'],
-                        description=data['description'],
-                        target_audience=data['target_audience'],
-                        total_duration=data['total_duration'],
-                        scenes=scenes
-                    )
-                    logger.info(f"Successfully generated video script with {len(scenes)} scenes")
-                    return script
-                else:
-                    logger.error("No JSON found in response")
-                    raise ValueError("No JSON found in response")
-            except json.JSONDecodeError as e:
-                logger.error(f"JSON parsing error: {e}")
-                logger.error(f"Response content: {scenes_data}")
-                raise ValueError("Could not parse scenes response")
+        # Tạo VideoScript object
+        script = VideoScript(
+            title=data['title'],
+            description=data['description'],
+            target_audience=data['target_audience'],
+            total_duration=data['total_duration'],
+            scenes=scenes
+        )
+        logger.info(f"Successfully generated video script with {len(scenes)} scenes")
+        return script
+
+    def _apply_enhancement(self, script: VideoScript, script_data: str) -> VideoScript:
+        """Cập nhật VideoScript với nội dung đã được cải thiện từ LLM"""
+        try:
+            data = extract_json_object(script_data)
+        except json.JSONDecodeError as e:
+            logger.error(f"JSON parsing error: {e}")
+            logger.error(f"Response content: {script_data}")
+            raise ValueError("Could not parse OpenRouter response")
+        except ValueError as e:
+            logger.error(f"{e} (enhancement response)")
+            raise
+
+        # Cập nhật script với dữ liệu mới
+        script.title = data.get('title', script.title)
+        script.description = data.get('description', script.description)
+        script.total_duration = data.get('total_duration', script.total_duration)
+
+        # Cập nhật scenes
+        if 'scenes' in data:
+            script.scenes = [self._parse_scene(scene_data) for scene_data in data['scenes']]
+
+        logger.info(f"Successfully enhanced video script with {len(script.scenes)} scenes")
+        return script
+
+    @staticmethod
+    def _extract_content(status_code: int, text: str, body: dict, error_message: str) -> str:
+        """Kiểm tra status code và lấy nội dung message từ response"""
+        if status_code == 401:
+            logger.error("Unauthorized: Invalid API key")
+            raise ValueError("Invalid OpenRouter API key. Please check your API key in .env file")
+        elif status_code != 200:
+            logger.error(f"API request failed with status code: {status_code}")
+            logger.error(f"Response content: {text}")
+            raise ValueError(f"{error_message}: {text}")
+        return body['choices'][0]['message']['content']
+
+    def _chat_completion(self, payload: dict, error_message: str) -> str:
+        """Gọi chat completion API (blocking)"""
+        response = requests.post(self.api_url, headers=self.headers, json=payload)
+        body = response.json() if response.status_code == 200 else {}
+        return self._extract_content(response.status_code, response.text, body, error_message)
+
+    async def _chat_completion_async(self, payload: dict, error_message: str) -> str:
+        """Gọi chat completion API qua HTTP client dùng chung (không chặn event loop)"""
+        client = get_http_client()
+        response = await client.post(self.api_url, headers=self.headers, json=payload)
+        body = response.json() if response.status_code == 200 else {}
+        return self._extract_content(response.status_code, response.text, body, error_message)
+
+    async def _stream_chat_completion(self, payload: dict, error_message: str) -> AsyncIterator[str]:
+        """Gọi chat completion với stream=true, yield từng đoạn nội dung (SSE delta)"""
+        client = get_http_client()
+        async with client.stream("POST", self.api_url, headers=self.headers, json={**payload, "stream": True}) as response:
+            if response.status_code != 200:
+                text = (await response.aread()).decode("utf-8", errors="replace")
+                self._extract_content(response.status_code, text, {}, error_message)
+            async for line in response.aiter_lines():
+                # OpenRouter gửi các dòng comment (": OPENROUTER PROCESSING") để giữ kết nối
+                if not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    break
+                try:
+                    chunk = json.loads(data)
+                except json.JSONDecodeError:
+                    logger.warning(f"Skipping malformed stream chunk: {data[:200]}")
+                    continue
+                choices = chunk.get("choices") or []
+                if choices:
+                    delta = (choices[0].get("delta") or {}).get("content")
+                    if delta:
+                        yield delta
+
+    def _cache_key(self, operation: str, **inputs) -> str:
+        return hash_key({
+            "operation": operation,
+            "model": self.model,
+            "template_version": PROMPT_TEMPLATE_VERSION,
+            "inputs": inputs,
+        })
+
+    def _cache_get(self, key: str) -> Optional[VideoScript]:
+        if self.use_mock or self.cache is None:
+            return None
+        cached = self.cache.get(key)
+        if cached is None:
+            return None
+        logger.info("Using cached LLM response")
+        return VideoScript(**json.loads(cached))
+
+    def _cache_set(self, key: str, script: VideoScript) -> None:
+        if not self.use_mock and self.cache is not None:
+            self.cache.set(key, script.json())
+
+    def _generate_cache_key(self, topic: str, target_audience: str, duration: int, mode: str) -> str:
+        return self._cache_key(
+            "generate", mode=mode, topic=topic, target_audience=target_audience, duration=duration
+        )
+
+    def _enhance_cache_key(self, script: VideoScript) -> str:
+        return self._cache_key(
+            "enhance",
+            script=script.dict(include={"title", "description", "target_audience", "total_duration", "scenes"})
+        )
+
+    def _validate_single_response(self, content: str) -> Optional[VideoScript]:
+        """Parse kết quả của chế độ một lần gọi; trả về None nếu không hợp lệ để fallback"""
+        try:
+            script = self._parse_script(content)
+        except (ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Single-call response failed validation: {e}")
+            return None
+        if not script.scenes:
+            logger.warning("Single-call response contains no scenes")
+            return None
+        return script
+
+    @staticmethod
+    def _record_generation(mode: str, started: float) -> None:
+        metrics.inc("script_generation_total", mode=mode)
+        metrics.observe("script_generation_latency_seconds", time.perf_counter() - started, mode=mode)
 
+    def _run_steps(self, steps: LLMSteps) -> VideoScript:
+        """Chạy các bước của một thao tác LLM, gọi API bằng requests (đồng bộ)"""
+        try:
+            request = next(steps)
+            while True:
+                request = steps.send(self._chat_completion(*request))
+        except StopIteration as done:
+            return done.value
         except requests.exceptions.RequestException as e:
             logger.error(f"Request error: {str(e)}")
             raise ValueError(f"Failed to connect to OpenRouter API: {str(e)}")
@@ -232,96 +441,217 @@ class DeepSeekService:
             logger.error(f"Unexpected error: {str(e)}")
             raise
 
-    def enhance_script(self, script: VideoScript) -> VideoScript:
-        """Cải thiện kịch bản với các đề xuất chi tiết hơn"""
+    async def _run_steps_async(self, steps: LLMSteps) -> VideoScript:
+        """Chạy các bước của một thao tác LLM qua HTTP client async dùng chung"""
         try:
-            logger.info(f"Enhancing video script: {script.title}")
-            
-            if self.use_mock:
-                logger.info("Using mock data for testing")
-                # Thêm một số chi tiết vào script mẫu
-                for scene in script.scenes:
-                    scene.description += " (Đã được cải thiện)"
-                    scene.visual_elements.append("Hiệu ứng chuyển cảnh mượt mà")
+            request = next(steps)
+            while True:
+                request = steps.send(await self._chat_completion_async(*request))
+        except StopIteration as done:
+            return done.value
+        except httpx.HTTPError as e:
+            logger.error(f"Request error: {str(e)}")
+            raise ValueError(f"Failed to connect to OpenRouter API: {str(e)}")
+        except Exception as e:
+            logger.error(f"Unexpected error: {str(e)}")
+            raise
+
+    def generate_video_script(
+        self, topic: str, target_audience: str, duration: int,
+        mode: Optional[str] = None, bypass_cache: bool = False
+    ) -> VideoScript:
+        return self._run_steps(self._generate_steps(topic, target_audience, duration, mode, bypass_cache))
+
+    async def generate_video_script_async(
+        self, topic: str, target_audience: str, duration: int,
+        mode: Optional[str] = None, bypass_cache: bool = False
+    ) -> VideoScript:
+        """Phiên bản async của generate_video_script, dùng connection pool dùng chung"""
+        return await self._run_steps_async(self._generate_steps(topic, target_audience, duration, mode, bypass_cache))
+
+    def _generate_steps(
+        self, topic: str, target_audience: str, duration: int,
+        mode: Optional[str] = None, bypass_cache: bool = False
+    ) -> LLMSteps:
+        """Tạo kịch bản: cache, chế độ một lần gọi và fallback hai bước (dùng chung cho sync và async)"""
+        mode = mode or self.generation_mode
+        cache_key = self._generate_cache_key(topic, target_audience, duration, mode)
+        if not bypass_cache:
+            cached = self._cache_get(cache_key)
+            if cached:
+                return cached
+
+        logger.info(f"Generating video script for topic: {topic}")
+        if self.use_mock:
+            logger.info("Using mock data for testing")
+            return self._get_mock_script(topic, target_audience, duration)
+
+        started = time.perf_counter()
+        if mode == GENERATION_MODE_SINGLE:
+            logger.info("Generating script and scenes in a single call...")
+            script = self._validate_single_response((yield (
+                self._build_single_payload(topic, target_audience, duration),
+                "Failed to generate script"
+            )))
+            if script:
+                self._record_generation(GENERATION_MODE_SINGLE, started)
+                self._cache_set(cache_key, script)
                 return script
+            metrics.inc("script_generation_fallback_total")
+            logger.info("Falling back to two-step generation")
 
-            prompt = f"""
-            Cải thiện kịch bản video sau với các đề xuất chi tiết hơn:
-            {script.json()}
-
-            Yêu cầu:
-            1. Thêm chi tiết cho mỗi cảnh
-            2. Đề xuất các hiệu ứng chuyển cảnh
-            3. Tối ưu thời lượng
-            4. Thêm các yếu tố tương tác
-            """
-
-            payload = {
-                "model": "deepseek/deepseek-chat:free",
-                "messages": [
-                    {"role": "system", "content": "Bạn là một chuyên gia chỉnh sửa kịch bản video."},
-                    {"role": "user", "content": prompt}
-                ],
-                "temperature": 0.7,
-                "max_tokens": 2000
-            }
+        # Bước 1: Tạo nội dung kịch bản tổng thể
+        logger.info("Generating overall script content...")
+        script_content = yield (
+            self._build_content_payload(topic, target_audience, duration),
+            "Failed to generate script content"
+        )
+        logger.info("Successfully generated overall script content")
+
+        # Bước 2: Tách nội dung thành các cảnh
+        logger.info("Splitting content into scenes...")
+        scenes_data = yield (
+            self._build_scenes_payload(script_content, target_audience, duration),
+            "Failed to generate scenes"
+        )
+        logger.info("Successfully generated scenes")
 
-            logger.debug(f"Sending enhancement request to OpenRouter API")
-            response = requests.post(self.api_url, headers=self.headers, json=payload)
-            
-            if response.status_code == 401:
-                logger.error("Unauthorized: Invalid API key")
-                raise ValueError("Invalid OpenRouter API key. Please check your API key in .env file")
-            elif response.status_code != 200:
-                logger.error(f"API request failed with status code: {response.status_code}")
-                logger.error(f"Response content: {response.text}")
-                raise ValueError(f"OpenRouter API request failed: {response.text}")
-                
-            result = response.json()
-            logger.info("Successfully received enhancement response from OpenRouter API")
-
-            # Parse response và cập nhật VideoScript object
-            script_data = result['choices'][0]['message']['content']
-            try:
-                json_start = script_data.find('{')
-                json_end = script_data.rfind('}') + 1
-                if json_start >= 0 and json_end > json_start:
-                    json_str = script_data[json_start:json_end]
-                    data = json.loads(json_str)
-                    
-                    # Cập nhật script với dữ liệu mới
-                    script.title = data.get('title', script.title)
-                    script.description = data.get('description', script.description)
-                    script.total_duration = data.get('total_duration', script.total_duration)
-                    
-                    # Cập nhật scenes
-                    if 'scenes' in data:
-                        scenes = []
-                        for scene_data in data['scenes']:
-                            scene = Scene(
-                                scene_number=scene_data['scene_number'],
-                                description=scene_data['description'],
-                                duration=scene_data['duration'],
-                                visual_elements=scene_data['visual_elements'],
-                                background_music=scene_data.get('background_music'),
-                                voice_over=scene_data.get('voice_over')
-                            )
-                            scenes.append(scene)
-                        script.scenes = scenes
-                    
-                    logger.info(f"Successfully enhanced video script with {len(script.scenes)} scenes")
-                    return script
-                else:
-                    logger.error("No JSON found in enhancement response")
-                    raise ValueError("No JSON found in response")
-            except json.JSONDecodeError as e:
-                logger.error(f"JSON parsing error: {e}")
-                logger.error(f"Response content: {script_data}")
-                raise ValueError("Could not parse OpenRouter response")
+        # Parse response và tạo VideoScript object
+        script = self._parse_script(scenes_data)
+        self._record_generation(
+            "single_fallback" if mode == GENERATION_MODE_SINGLE else GENERATION_MODE_TWO_STEP, started
+        )
+        self._cache_set(cache_key, script)
+        return script
 
-        except requests.exceptions.RequestException as e:
+    async def stream_video_script(
+        self, topic: str, target_audience: str, duration: int, bypass_cache: bool = False
+    ) -> AsyncIterator[Union[Scene, VideoScript]]:
+        """
+        Tạo kịch bản bằng stream: yield từng Scene ngay khi object JSON của cảnh
+        đó hoàn chỉnh, cuối cùng yield VideoScript đầy đủ
+        """
+        logger.info(f"Streaming video script for topic: {topic}")
+
+        cache_key = self._generate_cache_key(topic, target_audience, duration, GENERATION_MODE_SINGLE)
+        cached = None if bypass_cache else self._cache_get(cache_key)
+        if cached:
+            for scene in cached.scenes:
+                yield scene
+            yield cached
+            return
+
+        if self.use_mock:
+            logger.info("Using mock data for testing")
+            script = self._get_mock_script(topic, target_audience, duration)
+            for scene in script.scenes:
+                yield scene
+            yield script
+            return
+
+        started = time.perf_counter()
+        parser = IncrementalJSONParser("scenes")
+        emitted = 0
+        try:
+            async for delta in self._stream_chat_completion(
+                self._build_single_payload(topic, target_audience, duration),
+                "Failed to generate script"
+            ):
+                for scene_data in parser.feed(delta):
+                    scene = self._parse_scene(scene_data)
+                    if emitted == 0:
+                        metrics.observe("script_stream_first_scene_seconds", time.perf_counter() - started)
+                    emitted += 1
+                    yield scene
+        except httpx.HTTPError as e:
             logger.error(f"Request error: {str(e)}")
             raise ValueError(f"Failed to connect to OpenRouter API: {str(e)}")
-        except Exception as e:
-            logger.error(f"Unexpected error: {str(e)}")
-            raise 
\ No newline at end of file
+
+        script = self._validate_single_response(parser.text)
+        if script:
+            self._record_generation("stream", started)
+            self._cache_set(cache_key, script)
+            yield script
+            return
+
+        if emitted:
+            raise ValueError("Streamed script failed validation")
+
+        # Chưa có cảnh nào được gửi đi: chuyển sang cách tạo hai bước
+        metrics.inc("script_generation_fallback_total")
+        logger.info("Falling back to two-step generation")
+        script = await self.generate_video_script_async(
+            topic, target_audience, duration, mode=GENERATION_MODE_TWO_STEP, bypass_cache=bypass_cache
+        )
+        for scene in script.scenes:
+            yield scene
+        yield script
+
+    async def generate_video_scripts_batch(
+        self, topics: List[str], target_audience: str, duration: int,
+        concurrency: int = 8, mode: Optional[str] = None, bypass_cache: bool = False,
+        on_result: Optional[Callable[[str, Union[VideoScript, Exception]], None]] = None
+    ) -> Dict[str, Union[VideoScript, Exception]]:
+        """
+        Tạo kịch bản cho nhiều chủ đề, tối đa `concurrency` lời gọi LLM song song.
+        Các chủ đề trùng nhau (không phân biệt hoa thường, khoảng trắng) chỉ được tạo một lần.
+
+        Returns:
+            Dict[topic, VideoScript | Exception] theo thứ tự xuất hiện đầu tiên của mỗi chủ đề
+        """
+        unique_topics = list(dedupe_topics(topics).values())
+        logger.info(f"Generating {len(unique_topics)} scripts ({len(topics) - len(unique_topics)} duplicates skipped)")
+
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+        results: Dict[str, Union[VideoScript, Exception]] = {}
+
+        async def generate_one(topic: str) -> None:
+            async with semaphore:
+                try:
+                    result = await self.generate_video_script_async(
+                        topic, target_audience, duration, mode=mode, bypass_cache=bypass_cache
+                    )
+                except Exception as e:
+                    logger.error(f"Batch generation failed for topic '{topic}': {str(e)}")
+                    result = e
+            results[topic] = result
+            if on_result:
+                on_result(topic, result)
+
+        await asyncio.gather(*(generate_one(topic) for topic in unique_topics))
+        return {topic: results[topic] for topic in unique_topics}
+
+    def _enhance_mock(self, script: VideoScript) -> VideoScript:
+        logger.info("Using mock data for testing")
+        # Thêm một số chi tiết vào script mẫu
+        for scene in script.scenes:
+            scene.description += " (Đã được cải thiện)"
+            scene.visual_elements += " Hiệu ứng chuyển cảnh mượt mà"
+        return script
+
+    def enhance_script(self, script: VideoScript, bypass_cache: bool = False) -> VideoScript:
+        """Cải thiện kịch bản với các đề xuất chi tiết hơn"""
+        return self._run_steps(self._enhance_steps(script, bypass_cache))
+
+    async def enhance_script_async(self, script: VideoScript, bypass_cache: bool = False) -> VideoScript:
+        """Phiên bản async của enhance_script"""
+        return await self._run_steps_async(self._enhance_steps(script, bypass_cache))
+
+    def _enhance_steps(self, script: VideoScript, bypass_cache: bool = False) -> LLMSteps:
+        logger.info(f"Enhancing video script: {script.title}")
+        if self.use_mock:
+            return self._enhance_mock(script)
+
+        cache_key = self._enhance_cache_key(script)
+        cached = None if bypass_cache else self._cache_get(cache_key)
+        if cached:
+            return cached
+
+        logger.debug(f"Sending enhancement request to OpenRouter API")
+        script_data = yield (self._build_enhance_payload(script), "OpenRouter API request failed")
+        logger.info("Successfully received enhancement response from OpenRouter API")
+
+        # Parse response và cập nhật VideoScript object
+        enhanced = self._apply_enhancement(script, script_data)
+        self._cache_set(cache_key, enhanced)
+        return enhanced
@@ -1,88 +1,146 @@
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
 from bs4 import BeautifulSoup
+import asyncio
 import logging
-from typing import List
+from typing import List, Optional
+from urllib.parse import parse_qs, urlencode, urlparse
+from app.core.config import get_settings
+from app.core.http_client import get_http_client
+from app.core.metrics import metrics
+from app.core.webdriver_pool import WebDriverPool, get_webdriver_pool
 from app.schemas.content_suggestion import VideoInfo
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
+GOOGLE_SEARCH_URL = "https://www.google.com/search"
+# Header giống trình duyệt để Google trả về trang kết quả đầy đủ cho request không chạy JavaScript
+STATIC_HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+        "(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+    ),
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "vi-VN,vi;q=0.9,en-US;q=0.8,en;q=0.7",
+}
+
+
+def _html_parser() -> str:
+    """lxml parse nhanh hơn nhiều so với html.parser, chỉ dùng được khi đã cài package lxml"""
+    try:
+        import lxml  # noqa: F401
+        return "lxml"
+    except ImportError:
+        return "html.parser"
+
+
+HTML_PARSER = _html_parser()
+
+
+def _result_url(href: str) -> Optional[str]:
+    """URL video của một kết quả; trang tĩnh dùng link chuyển hướng dạng /url?q=..."""
+    parsed = urlparse(href)
+    if parsed.path == "/url":
+        href = parse_qs(parsed.query).get("q", [""])[0]
+    return href if href.startswith(("http://", "https://")) else None
+
 class GoogleSearchService:
-    def __init__(self):
-        self.setup_driver()
-
-    def setup_driver(self):
-        """Thiết lập Chrome WebDriver"""
-        chrome_options = Options()
-        chrome_options.add_argument("--headless")  # Chạy ẩn
-        chrome_options.add_argument("--no-sandbox")
-        chrome_options.add_argument("--disable-dev-shm-usage")
-        
-        service = Service(ChromeDriverManager().install())
-        self.driver = webdriver.Chrome(service=service, options=chrome_options)
+    def __init__(self, pool: Optional[WebDriverPool] = None):
+        self._pool = pool
+
+    @property
+    def pool(self) -> WebDriverPool:
+        # Mượn trình duyệt từ pool dùng chung thay vì khởi động Chrome cho mỗi lần tìm
+        return self._pool or get_webdriver_pool()
 
     def search_videos(self, keyword: str, max_results: int = 10) -> List[VideoInfo]:
         """
-        Tìm kiếm video trên Google theo từ khóa
+        Tìm kiếm video trên Google theo từ khóa (bằng trình duyệt headless).
+        Ném exception khi trình duyệt lỗi để kết quả rỗng do lỗi không bị cache như kết quả thật
         """
         try:
             # Tạo URL tìm kiếm Google với filter video
-            search_url = f"https://www.google.com/search?q={keyword}&tbm=vid"
-            self.driver.get(search_url)
-
-            # Đợi cho các kết quả video xuất hiện
-            WebDriverWait(self.driver, 10).until(
-                EC.presence_of_element_located((By.CSS_SELECTOR, "div.g"))
-            )
-
-            # Lấy HTML của trang
-            page_source = self.driver.page_source
-            soup = BeautifulSoup(page_source, 'html.parser')
-
-            # Tìm tất cả các kết quả video
-            video_results = soup.find_all("div", class_="g")[:max_results]
-            videos = []
-
-            for result in video_results:
-                try:
-                    # Lấy thông tin video
-                    title_element = result.find("h3")
-                    link_element = result.find("a")
-                    description_element = result.find("div", class_="VwiC3b")
-                    thumbnail_element = result.find("img")
-
-                    if title_element and link_element:
-                        video = VideoInfo(
-                            title=title_element.text,
-                            description=description_element.text if description_element else "",
-                            url=link_element["href"],
-                            thumbnail_url=thumbnail_element["src"] if thumbnail_element else None,
-                            platform="google",
-                            published_at=datetime.now(),  # Google không cung cấp thời gian chính xác
-                            channel_name="",  # Google không cung cấp tên kênh
-                        )
-                        videos.append(video)
-                except Exception as e:
-                    logger.error(f"Error parsing video result: {e}")
-                    continue
-
-            return videos
+            search_url = f"{GOOGLE_SEARCH_URL}?{urlencode({'q': keyword, 'tbm': 'vid'})}"
+            with self.pool.session() as driver:
+                driver.get(search_url)
+
+                # Đợi cho các kết quả video xuất hiện
+                WebDriverWait(driver, 10).until(
+                    EC.presence_of_element_located((By.CSS_SELECTOR, "div.g"))
+                )
+
+                # Lấy HTML của trang
+                page_source = driver.page_source
+            return self.parse_results(page_source, max_results)
 
         except Exception as e:
             logger.error(f"An error occurred while searching Google: {e}")
-            return []
-        finally:
-            self.driver.quit()
+            raise
 
-    def __del__(self):
-        """Đảm bảo đóng WebDriver khi đối tượng bị hủy"""
-        try:
-            self.driver.quit()
-        except:
-            pass 
\ No newline at end of file
+    async def search(self, keyword: str, max_results: int = 10) -> List[VideoInfo]:
+        """
+        Tìm kiếm video trên Google: thử tải trang kết quả tĩnh bằng HTTP client dùng chung,
+        chỉ dùng trình duyệt khi trang tĩnh không có kết quả (hoặc lỗi)
+        """
+        settings = get_settings()
+        if settings.GOOGLE_SEARCH_STATIC_ENABLED:
+            try:
+                response = await get_http_client().get(
+                    GOOGLE_SEARCH_URL,
+                    params={"q": keyword, "tbm": "vid", "num": max_results},
+                    headers=STATIC_HEADERS,
+                    follow_redirects=True
+                )
+                response.raise_for_status()
+                # BeautifulSoup chạy đồng bộ: parse trong thread pool như đường trình duyệt
+                videos = await asyncio.get_running_loop().run_in_executor(
+                    None, self.parse_results, response.text, max_results
+                )
+                if videos:
+                    metrics.inc("google_search_path_total", path="static")
+                    return videos
+                metrics.inc("google_search_static_fallback_total", reason="empty")
+            except Exception as e:
+                logger.warning(f"Static Google search failed, falling back to browser: {e}")
+                metrics.inc("google_search_static_fallback_total", reason="error")
+
+        metrics.inc("google_search_path_total", path="browser")
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.search_videos, keyword, max_results)
+
+    @staticmethod
+    def parse_results(html: str, max_results: int) -> List[VideoInfo]:
+        """Đọc danh sách video từ HTML trang kết quả Google"""
+        soup = BeautifulSoup(html, HTML_PARSER)
+
+        # Tìm tất cả các kết quả video
+        video_results = soup.find_all("div", class_="g")[:max_results]
+        videos = []
+
+        for result in video_results:
+            try:
+                # Lấy thông tin video
+                title_element = result.find("h3")
+                link_element = result.find("a")
+                description_element = result.find("div", class_="VwiC3b")
+                thumbnail_element = result.find("img")
+
+                url = _result_url(link_element.get("href", "")) if link_element else None
+                if title_element and url:
+                    video = VideoInfo(
+                        title=title_element.text,
+                        description=description_element.text if description_element else "",
+                        url=url,
+                        thumbnail_url=thumbnail_element.get("src") if thumbnail_element else None,
+                        platform="google",
+                        published_at=datetime.now(),  # Google không cung cấp thời gian chính xác
+                        channel_name="",  # Google không cung cấp tên kênh
+                    )
+                    videos.append(video)
+            except Exception as e:
+                logger.error(f"Error parsing video result: {e}")
+                continue
+
+        return videos
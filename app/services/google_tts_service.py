@@ -1,13 +1,90 @@
 import os
+import re
+import asyncio
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from google.cloud import texttospeech
+from google.cloud import texttospeech_v1beta1
 from google.auth.exceptions import DefaultCredentialsError
-from typing import List
-import tempfile
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from xml.sax.saxutils import escape
 from app.core.config import get_settings
+from app.core.cache import BlobCache, hash_key
+from app.core.media_storage import MediaStorage, get_media_storage
+from app.core.metrics import metrics
+from app.utils import mp3
 
 logger = logging.getLogger(__name__)
 
+
+def _build_audio_cache(settings) -> Optional[BlobCache]:
+    """Cache file MP3 theo hash tham số tổng hợp giọng nói"""
+    if not settings.TTS_CACHE_ENABLED:
+        return None
+    return BlobCache("tts", settings.TTS_CACHE_DIR, settings.TTS_CACHE_MAX_BYTES, suffix=".mp3")
+
+
+# Giới hạn input của một request synthesize_speech (byte, tính cả thẻ SSML)
+SSML_MAX_BYTES = 5000
+_SPEAK_OPEN = "<speak>"
+_SPEAK_CLOSE = "</speak>"
+# Dự phòng cho thẻ <mark name="sN"/> và khoảng trắng đi kèm mỗi đoạn
+_MARK_MAX_BYTES = 32
+_SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?…])\s+")
+
+
+def _ssml_size(text: str) -> int:
+    return len(escape(text).encode("utf-8"))
+
+
+def _split_text(text: str, max_bytes: int) -> List[str]:
+    """Chia text dài thành các đoạn không vượt quá max_bytes (sau khi escape), ưu tiên cắt ở cuối câu"""
+    if _ssml_size(text) <= max_bytes:
+        return [text]
+    chunks = []
+    current = ""
+    for sentence in _SENTENCE_BOUNDARY.split(text.strip()):
+        # Câu dài hơn giới hạn thì cắt tiếp theo từ
+        pieces = [sentence] if _ssml_size(sentence) <= max_bytes else sentence.split()
+        for piece in pieces:
+            candidate = f"{current} {piece}" if current else piece
+            if _ssml_size(candidate) <= max_bytes:
+                current = candidate
+                continue
+            if current:
+                chunks.append(current)
+            current = piece
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _plan_ssml_batches(texts: List[str], max_bytes: int = SSML_MAX_BYTES) -> List[List[Tuple[int, int, str]]]:
+    """
+    Gom các text thành các request SSML không vượt quá max_bytes.
+    Mỗi phần tử là (chỉ số text, thứ tự đoạn trong text, đoạn text)
+    """
+    overhead = len(_SPEAK_OPEN) + len(_SPEAK_CLOSE)
+    segment_budget = max_bytes - overhead - _MARK_MAX_BYTES
+    batches = []
+    current = []
+    size = overhead
+    for index, text in enumerate(texts):
+        for seq, segment in enumerate(_split_text(text, segment_budget)):
+            segment_size = _MARK_MAX_BYTES + _ssml_size(segment)
+            if current and size + segment_size > max_bytes:
+                batches.append(current)
+                current = []
+                size = overhead
+            current.append((index, seq, segment))
+            size += segment_size
+    if current:
+        batches.append(current)
+    return batches
+
+
 class GoogleTTSService:
     def __init__(self):
         try:
@@ -33,6 +110,17 @@ class GoogleTTSService:
             
             # Khởi tạo client
             self.client = texttospeech.TextToSpeechClient()
+            # Client v1beta1 (trả về timepoint cho <mark>) chỉ tạo khi dùng chế độ batch
+            self._beta_client = None
+            self._beta_client_lock = threading.Lock()
+
+            # Giới hạn số lời gọi TTS đồng thời trên toàn process (client gRPC dùng chung được giữa các thread)
+            self.max_concurrency = max(1, settings.TTS_MAX_CONCURRENCY)
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="tts")
+
+            self.cache = _build_audio_cache(settings)
+            self.media = get_media_storage()
             logger.info("GoogleTTSService initialized successfully")
             
         except DefaultCredentialsError as e:
@@ -48,18 +136,80 @@ class GoogleTTSService:
             logger.error(f"Unexpected error initializing GoogleTTSService: {str(e)}")
             raise
 
-    def generate_voice(self, text: str, voice_id: str = "vi-VN-Wavenet-A", speed: float = 1.0) -> str:
+    @staticmethod
+    def _cache_key(text: str, voice_id: str, speed: float) -> str:
+        return hash_key({"text": text, "voice_id": voice_id, "speed": speed, "encoding": "MP3"})
+
+    def get_cached_voice(self, text: str, voice_id: str = "vi-VN-Wavenet-A", speed: float = 1.0) -> Optional[str]:
+        """Trả về đường dẫn file audio đã tổng hợp trước đó cho cùng (text, voice_id, speed), nếu có"""
+        if self.cache is None:
+            return None
+        return self.cache.get(self._cache_key(text, voice_id, speed))
+
+    def synthesize(self, text: str, voice_id: str = "vi-VN-Wavenet-A", speed: float = 1.0) -> bytes:
+        """
+        Tổng hợp giọng nói và trả về nội dung MP3 trong bộ nhớ (tra cache trước khi gọi API)
+        """
+        cached_path = self.get_cached_voice(text, voice_id, speed)
+        if cached_path:
+            with open(cached_path, "rb") as f:
+                return f.read()
+        audio_content = self._synthesize(text, voice_id, speed)
+        if self.cache is not None:
+            self.cache.put(self._cache_key(text, voice_id, speed), audio_content)
+        return audio_content
+
+    def generate_voice(
+        self,
+        text: str,
+        voice_id: str = "vi-VN-Wavenet-A",
+        speed: float = 1.0,
+        relative_path: Optional[str] = None
+    ) -> str:
         """
-        Tạo file audio từ text sử dụng Google TTS
+        Tạo file audio từ text sử dụng Google TTS và lưu vào MEDIA_ROOT
         
         Args:
             text: Văn bản cần chuyển thành giọng nói
             voice_id: ID của giọng đọc (mặc định: vi-VN-Wavenet-A)
             speed: Tốc độ đọc (0.25 - 4.0)
+            relative_path: Đường dẫn file trong MEDIA_ROOT (mặc định: tạo tên mới trong voice/)
             
         Returns:
-            str: Đường dẫn đến file audio
+            str: Đường dẫn tương đối của file audio trong MEDIA_ROOT
         """
+        relative_path = relative_path or MediaStorage.new_name("voice", ".mp3")
+        # Tra cache trước khi gọi API; cache hit chỉ link file có sẵn vào thư mục media
+        cached_path = self.get_cached_voice(text, voice_id, speed)
+        if cached_path:
+            logger.info(f"Using cached audio file: {cached_path}")
+            return self.media.import_file(cached_path, relative_path)
+        return self._synthesize_to_media(text, voice_id, speed, relative_path)
+
+    def _synthesize_to_media(self, text: str, voice_id: str, speed: float, relative_path: str) -> str:
+        """Gọi Google TTS (không tra cache) và ghi audio vào cache và thư mục media"""
+        relative_path = self._store_audio(text, voice_id, speed, self._synthesize(text, voice_id, speed), relative_path)
+        logger.info(f"Successfully generated audio file: {relative_path}")
+        return relative_path
+
+    def _store_audio(self, text: str, voice_id: str, speed: float, audio_content: bytes, relative_path: str) -> str:
+        """Ghi audio vào cache (nếu bật) và thư mục media, trả về đường dẫn tương đối"""
+        if self.cache is not None:
+            # Ghi blob một lần rồi hard link sang thư mục media
+            blob_path = self.cache.put(self._cache_key(text, voice_id, speed), audio_content)
+            return self.media.import_file(blob_path, relative_path)
+        return self.media.write_bytes(relative_path, audio_content)
+
+    @staticmethod
+    def _language_code(voice_id: str) -> str:
+        # Tách voice_id thành các phần và xử lý an toàn
+        voice_parts = voice_id.split("-")
+        if len(voice_parts) < 2:
+            raise ValueError(f"Invalid voice_id format: {voice_id}. Expected format: language-region-voice-type")
+        return f"{voice_parts[0]}-{voice_parts[1]}"
+
+    def _synthesize(self, text: str, voice_id: str, speed: float) -> bytes:
+        """Gọi Google TTS API, trả về nội dung MP3"""
         try:
             logger.info(f"Generating voice for text length: {len(text)}")
             logger.info(f"Using voice: {voice_id}, speed: {speed}")
@@ -68,14 +218,8 @@ class GoogleTTSService:
             synthesis_input = texttospeech.SynthesisInput(text=text)
 
             # Cấu hình voice
-            # Tách voice_id thành các phần và xử lý an toàn
-            voice_parts = voice_id.split("-")
-            if len(voice_parts) < 2:
-                raise ValueError(f"Invalid voice_id format: {voice_id}. Expected format: language-region-voice-type")
-            
-            language_code = f"{voice_parts[0]}-{voice_parts[1]}"
             voice = texttospeech.VoiceSelectionParams(
-                language_code=language_code,
+                language_code=self._language_code(voice_id),
                 name=voice_id
             )
 
@@ -87,25 +231,208 @@ class GoogleTTSService:
 
             # Gọi API để tạo audio
             logger.info("Calling Google TTS API...")
+            metrics.inc("tts_requests_total", mode="single")
             response = self.client.synthesize_speech(
                 input=synthesis_input,
                 voice=voice,
                 audio_config=audio_config
             )
             logger.info("Successfully received response from Google TTS API")
-
-            # Tạo file tạm để lưu audio
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.mp3') as temp_file:
-                temp_file.write(response.audio_content)
-                temp_file_path = temp_file.name
-
-            logger.info(f"Successfully generated audio file: {temp_file_path}")
-            return temp_file_path
+            return response.audio_content
 
         except Exception as e:
             logger.error(f"Error generating voice: {str(e)}")
             raise
 
+    def _get_beta_client(self):
+        with self._beta_client_lock:
+            if self._beta_client is None:
+                self._beta_client = texttospeech_v1beta1.TextToSpeechClient()
+            return self._beta_client
+
+    def _synthesize_ssml_batch(self, segments: List[Tuple[int, int, str]], voice_id: str, speed: float) -> List[bytes]:
+        """
+        Tổng hợp nhiều đoạn trong một request SSML, mỗi đoạn bắt đầu bằng một <mark>,
+        rồi cắt audio trả về tại timepoint của các mark
+        """
+        if len(segments) == 1:
+            return [self._synthesize(segments[0][2], voice_id, speed)]
+
+        ssml = _SPEAK_OPEN + " ".join(
+            f'<mark name="s{position}"/>{escape(text)}' for position, (_, _, text) in enumerate(segments)
+        ) + _SPEAK_CLOSE
+        request = texttospeech_v1beta1.SynthesizeSpeechRequest(
+            input=texttospeech_v1beta1.SynthesisInput(ssml=ssml),
+            voice=texttospeech_v1beta1.VoiceSelectionParams(
+                language_code=self._language_code(voice_id),
+                name=voice_id
+            ),
+            audio_config=texttospeech_v1beta1.AudioConfig(
+                audio_encoding=texttospeech_v1beta1.AudioEncoding.MP3,
+                speaking_rate=speed
+            ),
+            enable_time_pointing=[texttospeech_v1beta1.SynthesizeSpeechRequest.TimepointType.SSML_MARK]
+        )
+        logger.info(f"Calling Google TTS API with {len(segments)} SSML segments ({len(ssml.encode('utf-8'))} bytes)")
+        metrics.inc("tts_requests_total", mode="ssml_batch")
+        response = self._get_beta_client().synthesize_speech(request=request)
+
+        mark_times = {timepoint.mark_name: timepoint.time_seconds for timepoint in response.timepoints}
+        try:
+            boundaries = [mark_times[f"s{position}"] for position in range(1, len(segments))]
+        except KeyError:
+            # Thiếu timepoint thì không cắt được: tổng hợp lại từng đoạn
+            logger.warning("SSML response is missing mark timepoints, falling back to per-segment synthesis")
+            return [self._synthesize(text, voice_id, speed) for _, _, text in segments]
+        return mp3.split_at(response.audio_content, boundaries)
+
+    def _prepare_batch(self, texts: List[str], voice_id: str, speed: float):
+        """Tra cache cho từng text; trả về file cache đã có (theo chỉ số) và các request SSML cho phần còn thiếu"""
+        cached: Dict[int, str] = {}
+        missing = []
+        for index, text in enumerate(texts):
+            cached_path = self.get_cached_voice(text, voice_id, speed)
+            if cached_path:
+                cached[index] = cached_path
+            else:
+                missing.append(index)
+        batches = [
+            [(missing[position], seq, segment) for position, seq, segment in batch]
+            for batch in _plan_ssml_batches([texts[index] for index in missing])
+        ]
+        # Số đoạn còn thiếu của mỗi text
+        remaining: Dict[int, int] = {}
+        for batch in batches:
+            for index, _, _ in batch:
+                remaining[index] = remaining.get(index, 0) + 1
+        return cached, batches, remaining
+
+    @staticmethod
+    def _collect_clips(parts: Dict[int, Dict[int, bytes]], remaining: Dict[int, int], batch, clips: List[bytes]):
+        """Gắn audio vừa tạo vào text tương ứng; trả về (chỉ số, audio) của các text đã đủ đoạn"""
+        completed = []
+        for (index, seq, _), clip in zip(batch, clips):
+            parts.setdefault(index, {})[seq] = clip
+            remaining[index] -= 1
+            if remaining[index] == 0:
+                # Text dài được tạo thành nhiều đoạn: nối lại theo thứ tự
+                text_parts = parts.pop(index)
+                ordered = [text_parts[seq] for seq in sorted(text_parts)]
+                completed.append((index, ordered[0] if len(ordered) == 1 else mp3.concat(ordered)))
+        return completed
+
+    def _import_cached(self, cached: Dict[int, str]) -> List[Tuple[int, str]]:
+        """Link các file cache sẵn có vào thư mục media, trả về (chỉ số text, đường dẫn tương đối)"""
+        return [
+            (index, self.media.import_file(cached_path, MediaStorage.new_name("voice", ".mp3")))
+            for index, cached_path in cached.items()
+        ]
+
+    def _store_clips(self, parts: Dict[int, Dict[int, bytes]], remaining: Dict[int, int], batch,
+                     clips: List[bytes], texts: List[str], voice_id: str, speed: float) -> List[Tuple[int, str]]:
+        """Gắn audio của một batch SSML vào text tương ứng và lưu các text đã đủ đoạn vào cache/media"""
+        return [
+            (index, self._store_audio(texts[index], voice_id, speed, audio_content, MediaStorage.new_name("voice", ".mp3")))
+            for index, audio_content in self._collect_clips(parts, remaining, batch, clips)
+        ]
+
+    def synthesize_batch(self, texts: List[str], voice_id: str = "vi-VN-Wavenet-A", speed: float = 1.0) -> List[bytes]:
+        """
+        Chế độ batch: gom nhiều text vào một request SSML (tối đa SSML_MAX_BYTES) và cắt audio
+        theo timepoint của <mark>, nên số request giảm nhiều lần với các scene ngắn.
+        Text dài hơn giới hạn được tách ở cuối câu rồi nối lại. Trả về audio MP3 theo thứ tự texts.
+        """
+        cached, batches, remaining = self._prepare_batch(texts, voice_id, speed)
+        results: Dict[int, bytes] = {}
+        for index, cached_path in cached.items():
+            with open(cached_path, "rb") as f:
+                results[index] = f.read()
+
+        parts: Dict[int, Dict[int, bytes]] = {}
+        for batch in batches:
+            clips = self._synthesize_ssml_batch(batch, voice_id, speed)
+            for index, audio_content in self._collect_clips(parts, remaining, batch, clips):
+                if self.cache is not None:
+                    self.cache.put(self._cache_key(texts[index], voice_id, speed), audio_content)
+                results[index] = audio_content
+        return [results[index] for index in range(len(texts))]
+
+    async def iter_voices_batch(
+        self,
+        texts: List[str],
+        voice_id: str = "vi-VN-Wavenet-A",
+        speed: float = 1.0
+    ) -> AsyncIterator[Tuple[int, Optional[str]]]:
+        """
+        Bản async của chế độ batch, lưu kết quả vào MEDIA_ROOT. Các request SSML chạy song song
+        (tối đa TTS_MAX_CONCURRENCY); yield (chỉ số text, đường dẫn file hoặc None nếu lỗi)
+        ngay khi text đó có đủ audio. Tra cache, nối/cắt audio và ghi file đều chạy trong thread pool
+        """
+        loop = asyncio.get_running_loop()
+        cached, batches, remaining = await loop.run_in_executor(
+            self._executor, partial(self._prepare_batch, texts, voice_id, speed)
+        )
+        if cached:
+            imported = await loop.run_in_executor(self._executor, partial(self._import_cached, cached))
+            for index, relative_path in imported:
+                yield index, relative_path
+
+        async def run(batch):
+            async with self._semaphore:
+                try:
+                    return batch, await loop.run_in_executor(self._executor, partial(
+                        self._synthesize_ssml_batch, batch, voice_id, speed
+                    ))
+                except Exception as e:
+                    logger.error(f"Error synthesizing SSML batch: {str(e)}")
+                    return batch, None
+
+        parts: Dict[int, Dict[int, bytes]] = {}
+        failed = set()
+        for next_done in asyncio.as_completed([run(batch) for batch in batches]):
+            batch, clips = await next_done
+            if clips is None:
+                # Text có đoạn lỗi sẽ không bao giờ đủ đoạn nên chỉ báo lỗi một lần ở đây
+                for index in sorted({index for index, _, _ in batch} - failed):
+                    failed.add(index)
+                    yield index, None
+                continue
+            # parts/remaining chỉ được sửa bởi một lời gọi tại một thời điểm (await tuần tự)
+            stored = await loop.run_in_executor(self._executor, partial(
+                self._store_clips, parts, remaining, batch, clips, texts, voice_id, speed
+            ))
+            for index, relative_path in stored:
+                yield index, relative_path
+
+    async def synthesize_async(self, text: str, voice_id: str = "vi-VN-Wavenet-A", speed: float = 1.0) -> bytes:
+        """Chạy synthesize trong thread pool riêng, tối đa TTS_MAX_CONCURRENCY lời gọi cùng lúc"""
+        async with self._semaphore:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, partial(self.synthesize, text, voice_id, speed))
+
+    async def generate_voice_async(
+        self,
+        text: str,
+        voice_id: str = "vi-VN-Wavenet-A",
+        speed: float = 1.0,
+        relative_path: Optional[str] = None
+    ) -> str:
+        """
+        Chạy generate_voice (blocking) trong thread pool riêng để không chặn event loop,
+        tối đa TTS_MAX_CONCURRENCY lời gọi cùng lúc. Cache hit trả về ngay.
+        """
+        relative_path = relative_path or MediaStorage.new_name("voice", ".mp3")
+        cached_path = self.get_cached_voice(text, voice_id, speed)
+        if cached_path:
+            return self.media.import_file(cached_path, relative_path)
+
+        async with self._semaphore:
+            loop = asyncio.get_running_loop()
+            # Đã tra cache ở trên nên gọi thẳng API trong thread
+            return await loop.run_in_executor(self._executor, partial(
+                self._synthesize_to_media, text, voice_id, speed, relative_path
+            ))
+
     def generate_voices_for_script(self, script_texts: List[str], output_dir: str) -> List[str]:
         """
         Tạo các file audio cho toàn bộ script
@@ -121,21 +448,17 @@ class GoogleTTSService:
             logger.info(f"Generating voices for script with {len(script_texts)} scenes")
             logger.info(f"Output directory: {output_dir}")
 
-            if not os.path.exists(output_dir):
-                os.makedirs(output_dir)
-                logger.info(f"Created output directory: {output_dir}")
+            # Ghi thẳng vào thư mục output, không qua file tạm
+            output_storage = MediaStorage(output_dir)
 
             audio_files = []
             for i, text in enumerate(script_texts):
                 logger.info(f"Processing scene {i+1}/{len(script_texts)}")
                 
-                # Tạo audio file
-                audio_path = self.generate_voice(text)
-                
-                # Di chuyển file vào thư mục output
+                # Tạo audio và ghi vào file scene_<i>.mp3
                 filename = f"scene_{i+1}.mp3"
-                output_path = os.path.join(output_dir, filename)
-                os.rename(audio_path, output_path)
+                output_storage.write_bytes(filename, self.synthesize(text))
+                output_path = output_storage.path(filename)
                 
                 audio_files.append(output_path)
                 logger.info(f"Created audio file: {output_path}")
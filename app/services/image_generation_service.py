@@ -1,11 +1,48 @@
 import replicate
 import os
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from typing import Optional
 import logging
 from app.core.config import get_settings
+from app.core.cache import LRUCache, SQLiteCache, TieredCache, hash_key
+from app.core.metrics import metrics
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_NEGATIVE_PROMPT = "blurry, low quality, distorted, deformed"
+DEFAULT_NUM_INFERENCE_STEPS = 50
+DEFAULT_GUIDANCE_SCALE = 7.5
+
+
+def image_cache_ttl(settings) -> int:
+    """TTL cache ảnh: tối đa một nửa thời gian sống của URL output Replicate"""
+    limit = max(1, settings.REPLICATE_OUTPUT_URL_LIFETIME_SECONDS // 2)
+    if settings.IMAGE_CACHE_TTL_SECONDS > limit:
+        logger.warning(
+            f"IMAGE_CACHE_TTL_SECONDS={settings.IMAGE_CACHE_TTL_SECONDS} exceeds half the Replicate output URL "
+            f"lifetime; using {limit}s"
+        )
+        return limit
+    return settings.IMAGE_CACHE_TTL_SECONDS
+
+
+def _build_image_cache(settings) -> Optional[TieredCache]:
+    """Cache URL ảnh theo hash tham số tạo ảnh"""
+    if not settings.IMAGE_CACHE_ENABLED:
+        return None
+    ttl_seconds = image_cache_ttl(settings)
+    disk = None
+    if settings.IMAGE_CACHE_SQLITE_PATH:
+        disk = SQLiteCache(
+            settings.IMAGE_CACHE_SQLITE_PATH,
+            max_entries=settings.IMAGE_CACHE_SQLITE_MAX_ENTRIES,
+            ttl_seconds=ttl_seconds,
+        )
+    memory = LRUCache(max_entries=settings.IMAGE_CACHE_MAX_ENTRIES, ttl_seconds=ttl_seconds)
+    return TieredCache("image", memory, disk)
+
 class ImageGenerationService:
     def __init__(self):
         settings = get_settings()
@@ -19,7 +56,107 @@ class ImageGenerationService:
         # Model ID cho Stable Diffusion
         self.model_id = settings.REPLICATE_MODEL_ID or "stability-ai/sdxl:39ed52f2a78e934b3ba6e2a89f5b1c712de7dfea535525255b1aa35c5565e08b"
 
-    def generate_image(self, prompt: str, width: int = 1024, height: int = 768) -> Optional[str]:
+        self.cache = _build_image_cache(settings)
+
+        # Giới hạn số lời gọi Replicate đồng thời trên toàn process
+        self.max_concurrency = max(1, settings.IMAGE_GENERATION_MAX_CONCURRENCY)
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="replicate")
+
+    def _cache_key(self, prompt: str, negative_prompt: str, width: int, height: int,
+                   num_inference_steps: int, guidance_scale: float, seed: Optional[int]) -> str:
+        return hash_key({
+            "model_id": self.model_id,
+            "prompt": prompt,
+            "negative_prompt": negative_prompt,
+            "width": width,
+            "height": height,
+            "num_inference_steps": num_inference_steps,
+            "guidance_scale": guidance_scale,
+            "seed": seed,
+        })
+
+    @staticmethod
+    def _build_input(prompt: str, width: int, height: int, negative_prompt: str,
+                     num_inference_steps: int, guidance_scale: float, seed: Optional[int]) -> dict:
+        model_input = {
+            "prompt": prompt,
+            "width": width,
+            "height": height,
+            "num_outputs": 1,
+            "scheduler": "K_EULER",
+            "num_inference_steps": num_inference_steps,
+            "guidance_scale": guidance_scale,
+            "negative_prompt": negative_prompt,
+            "prompt_strength": 0.8,
+            "refine": "expert_ensemble_refiner",
+            "high_noise_frac": 0.8
+        }
+        if seed is not None:
+            model_input["seed"] = seed
+        return model_input
+
+    @staticmethod
+    def extract_output_url(output) -> Optional[str]:
+        """Lấy URL ảnh đầu tiên từ output của model (FileOutput hoặc str)"""
+        if output and isinstance(output, list) and len(output) > 0:
+            # Xử lý FileOutput object
+            image_output = output[0]
+            if hasattr(image_output, 'url'):
+                return image_output.url
+            elif isinstance(image_output, str):
+                return image_output
+            logger.error(f"Unexpected output type: {type(image_output)}")
+        return None
+
+    def get_cached_image(
+        self,
+        prompt: str,
+        width: int = 1024,
+        height: int = 768,
+        negative_prompt: str = DEFAULT_NEGATIVE_PROMPT,
+        num_inference_steps: int = DEFAULT_NUM_INFERENCE_STEPS,
+        guidance_scale: float = DEFAULT_GUIDANCE_SCALE,
+        seed: Optional[int] = None
+    ) -> Optional[str]:
+        if self.cache is None:
+            return None
+        cached_url = self.cache.get(
+            self._cache_key(prompt, negative_prompt, width, height, num_inference_steps, guidance_scale, seed)
+        )
+        if cached_url:
+            logger.info("Using cached image for prompt")
+        return cached_url
+
+    def remember_image(
+        self,
+        image_url: str,
+        prompt: str,
+        width: int,
+        height: int,
+        negative_prompt: str = DEFAULT_NEGATIVE_PROMPT,
+        num_inference_steps: int = DEFAULT_NUM_INFERENCE_STEPS,
+        guidance_scale: float = DEFAULT_GUIDANCE_SCALE,
+        seed: Optional[int] = None
+    ) -> None:
+        """Lưu URL ảnh vào cache theo đúng tham số đã dùng để tạo (dùng khi prediction hoàn thành)"""
+        if self.cache is not None:
+            self.cache.set(
+                self._cache_key(prompt, negative_prompt, width, height, num_inference_steps, guidance_scale, seed),
+                image_url
+            )
+
+    def generate_image(
+        self,
+        prompt: str,
+        width: int = 1024,
+        height: int = 768,
+        negative_prompt: str = DEFAULT_NEGATIVE_PROMPT,
+        num_inference_steps: int = DEFAULT_NUM_INFERENCE_STEPS,
+        guidance_scale: float = DEFAULT_GUIDANCE_SCALE,
+        seed: Optional[int] = None,
+        force_new: bool = False
+    ) -> Optional[str]:
         """
         Tạo hình ảnh từ prompt sử dụng Replicate API
         
@@ -27,41 +164,107 @@ class ImageGenerationService:
             prompt (str): Mô tả chi tiết về hình ảnh cần tạo
             width (int): Chiều rộng hình ảnh
             height (int): Chiều cao hình ảnh
+            negative_prompt (str): Những đặc điểm không mong muốn trong ảnh
+            num_inference_steps (int): Số bước inference
+            guidance_scale (float): Mức độ bám theo prompt
+            seed (int): Seed cố định (None: ngẫu nhiên)
+            force_new (bool): Bỏ qua cache để tạo một biến thể mới
             
         Returns:
             str: URL của hình ảnh được tạo, hoặc None nếu có lỗi
         """
+        cache_key = self._cache_key(prompt, negative_prompt, width, height, num_inference_steps, guidance_scale, seed)
+        if not force_new:
+            cached_url = self.get_cached_image(prompt, width, height, negative_prompt,
+                                               num_inference_steps, guidance_scale, seed)
+            if cached_url:
+                return cached_url
+
         try:
             # Thêm các tham số để cải thiện chất lượng hình ảnh
-            output = self.client.run(
-                self.model_id,
-                input={
-                    "prompt": prompt,
-                    "width": width,
-                    "height": height,
-                    "num_outputs": 1,
-                    "scheduler": "K_EULER",
-                    "num_inference_steps": 50,
-                    "guidance_scale": 7.5,
-                    "negative_prompt": "blurry, low quality, distorted, deformed",
-                    "prompt_strength": 0.8,
-                    "refine": "expert_ensemble_refiner",
-                    "high_noise_frac": 0.8
-                }
-            )
-            
-            if output and isinstance(output, list) and len(output) > 0:
-                # Xử lý FileOutput object
-                image_output = output[0]
-                if hasattr(image_output, 'url'):
-                    return image_output.url
-                elif isinstance(image_output, str):
-                    return image_output
-                else:
-                    logger.error(f"Unexpected output type: {type(image_output)}")
-                    return None
-            return None
+            model_input = self._build_input(prompt, width, height, negative_prompt,
+                                            num_inference_steps, guidance_scale, seed)
+            output = self.client.run(self.model_id, input=model_input)
+            metrics.inc("image_generation_runs_total")
+
+            image_url = self.extract_output_url(output)
+            if image_url and self.cache is not None:
+                self.cache.set(cache_key, image_url)
+            return image_url
             
         except Exception as e:
             logger.error(f"Error generating image: {str(e)}")
-            return None 
\ No newline at end of file
+            return None
+
+    async def generate_image_async(
+        self,
+        prompt: str,
+        width: int = 1024,
+        height: int = 768,
+        negative_prompt: str = DEFAULT_NEGATIVE_PROMPT,
+        num_inference_steps: int = DEFAULT_NUM_INFERENCE_STEPS,
+        guidance_scale: float = DEFAULT_GUIDANCE_SCALE,
+        seed: Optional[int] = None,
+        force_new: bool = False
+    ) -> Optional[str]:
+        """
+        Chạy generate_image (blocking) trong thread pool riêng để không chặn event loop,
+        tối đa IMAGE_GENERATION_MAX_CONCURRENCY lời gọi cùng lúc. Cache hit trả về ngay.
+        """
+        if not force_new:
+            cached_url = self.get_cached_image(prompt, width, height, negative_prompt,
+                                               num_inference_steps, guidance_scale, seed)
+            if cached_url:
+                return cached_url
+
+        async with self._semaphore:
+            loop = asyncio.get_running_loop()
+            # Đã tra cache ở trên nên bỏ qua lần tra thứ hai trong thread
+            return await loop.run_in_executor(self._executor, partial(
+                self.generate_image, prompt, width, height, negative_prompt,
+                num_inference_steps, guidance_scale, seed, True
+            ))
+
+    def submit_prediction(
+        self,
+        prompt: str,
+        width: int = 1024,
+        height: int = 768,
+        seed: Optional[int] = None,
+        webhook_url: Optional[str] = None
+    ):
+        """
+        Tạo prediction trên Replicate và trả về ngay, không chờ model chạy xong.
+        Kết quả được nhận qua webhook (nếu có webhook_url) hoặc qua get_prediction.
+        """
+        if ":" not in self.model_id:
+            raise ValueError(f"REPLICATE_MODEL_ID must include a version to submit predictions: {self.model_id}")
+        version = self.model_id.split(":", 1)[1]
+
+        kwargs = {
+            "version": version,
+            "input": self._build_input(prompt, width, height, DEFAULT_NEGATIVE_PROMPT,
+                                       DEFAULT_NUM_INFERENCE_STEPS, DEFAULT_GUIDANCE_SCALE, seed),
+        }
+        if webhook_url:
+            kwargs["webhook"] = webhook_url
+            kwargs["webhook_events_filter"] = ["completed"]
+        prediction = self.client.predictions.create(**kwargs)
+        metrics.inc("image_generation_runs_total")
+        logger.info(f"Submitted prediction {prediction.id} (status: {prediction.status})")
+        return prediction
+
+    def get_prediction(self, prediction_id: str):
+        """Lấy trạng thái hiện tại của một prediction"""
+        return self.client.predictions.get(prediction_id)
+
+    async def submit_prediction_async(self, prompt: str, width: int = 1024, height: int = 768,
+                                      seed: Optional[int] = None, webhook_url: Optional[str] = None):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, partial(self.submit_prediction, prompt, width, height, seed, webhook_url)
+        )
+
+    async def get_prediction_async(self, prediction_id: str):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self.get_prediction, prediction_id)
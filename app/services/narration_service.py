@@ -0,0 +1,122 @@
+import logging
+import math
+import os
+from datetime import datetime
+from typing import List, Optional, Tuple
+from sqlalchemy.orm import Session
+from app.core.cache import hash_key
+from app.core.media_storage import MediaStorage
+from app.core.metrics import metrics
+from app.models.video_script import VideoScript, Scene, VoiceAudio, MediaStatus
+from app.utils import mp3
+
+logger = logging.getLogger(__name__)
+
+
+class NarrationService:
+    """
+    Ghép voice audio của các scene thành một track thuyết minh cho cả script.
+    Ghép theo frame MP3 (không giải mã/encode lại) và ghi thẳng ra file theo từng clip.
+    """
+
+    def __init__(self, media: MediaStorage):
+        self.media = media
+
+    @staticmethod
+    def latest_voice(scene: Scene) -> Optional[VoiceAudio]:
+        completed = [
+            voice_audio for voice_audio in scene.voice_audios
+            if voice_audio.status == MediaStatus.COMPLETED.value and voice_audio.audio_url
+        ]
+        if not completed:
+            return None
+        # created_at có thể NULL: các bản ghi đó được xem là cũ nhất (không so sánh datetime với None)
+        return max(
+            completed,
+            key=lambda voice_audio: (voice_audio.created_at is not None, voice_audio.created_at or datetime.min)
+        )
+
+    def measure(self, voice_audio: VoiceAudio) -> int:
+        """Thời lượng thực của clip (ms), đo một lần từ các frame rồi lưu vào VoiceAudio.duration_ms"""
+        if voice_audio.duration_ms is None:
+            with open(self.media.path(voice_audio.audio_url), "rb") as f:
+                voice_audio.duration_ms = round(mp3.file_duration_seconds(f) * 1000)
+        return voice_audio.duration_ms
+
+    def _clips(self, script: VideoScript) -> List[Tuple[Scene, VoiceAudio]]:
+        clips = []
+        for scene in sorted(script.scenes, key=lambda scene: scene.scene_number):
+            voice_audio = self.latest_voice(scene)
+            if voice_audio is None:
+                raise ValueError(f"Scene {scene.scene_number} has no completed voice audio")
+            clips.append((scene, voice_audio))
+        if not clips:
+            raise ValueError("Script has no scenes")
+        return clips
+
+    @staticmethod
+    def _track_path(clips: List[Tuple[Scene, VoiceAudio]], pause_ms: int) -> str:
+        # Track được định danh theo danh sách clip và khoảng lặng: chỉ ghép lại khi có scene thay đổi
+        key = hash_key({"clips": [voice_audio.audio_url for _, voice_audio in clips], "pause_ms": pause_ms})
+        return f"narration/{key[:2]}/{key}.mp3"
+
+    def find_track(self, script: VideoScript, pause_ms: int = 0) -> Optional[str]:
+        """
+        Đường dẫn track đã ghép cho voice audio hiện tại của script, hoặc None nếu chưa ghép
+        (không ghi gì vào database hay đĩa). ValueError nếu có scene chưa có voice
+        """
+        relative_path = self._track_path(self._clips(script), pause_ms)
+        return relative_path if os.path.exists(self.media.path(relative_path)) else None
+
+    def assemble(self, db: Session, script: VideoScript, pause_ms: int = 0) -> dict:
+        """
+        Tạo (hoặc lấy lại từ cache) track thuyết minh của script, cập nhật thời lượng thực
+        của từng scene và của script. Trả về đường dẫn track và timeline các scene.
+        Đọc/ghi file và database đồng bộ: gọi qua threadpool từ handler async
+        """
+        clips = self._clips(script)
+
+        timeline = []
+        offset_ms = 0
+        for position, (scene, voice_audio) in enumerate(clips):
+            duration_ms = self.measure(voice_audio)
+            # Scene.duration tính bằng giây: làm tròn lên để không cắt mất lời thoại
+            scene.duration = max(1, math.ceil(duration_ms / 1000))
+            timeline.append({
+                "scene_id": scene.id,
+                "scene_number": scene.scene_number,
+                "offset_ms": offset_ms,
+                "duration_ms": duration_ms
+            })
+            offset_ms += duration_ms
+            if position < len(clips) - 1:
+                offset_ms += pause_ms
+        script.total_duration = math.ceil(offset_ms / 1000)
+
+        relative_path = self._track_path(clips, pause_ms)
+        if os.path.exists(self.media.path(relative_path)):
+            metrics.inc("cache_requests_total", cache="narration", result="hit_disk")
+        else:
+            metrics.inc("cache_requests_total", cache="narration", result="miss")
+            self._write_track(relative_path, [voice_audio.audio_url for _, voice_audio in clips], pause_ms)
+            logger.info(f"Assembled narration for script {script.id}: {relative_path} ({offset_ms} ms)")
+
+        db.commit()
+        return {
+            "script_id": script.id,
+            "audio_path": relative_path,
+            "duration_ms": offset_ms,
+            "pause_ms": pause_ms,
+            "scenes": timeline
+        }
+
+    def _write_track(self, relative_path: str, audio_paths: list, pause_ms: int) -> None:
+        """Ghi lần lượt frame của từng clip (và khoảng lặng giữa các clip) vào file track, đọc dần từng frame"""
+        with self.media.open_writer(relative_path) as track:
+            for position, audio_path in enumerate(audio_paths):
+                with open(self.media.path(audio_path), "rb") as f:
+                    for index, (_, frame) in enumerate(mp3.iter_file_frames(f)):
+                        if index == 0 and position and pause_ms:
+                            # Khoảng lặng cùng định dạng với clip kế tiếp
+                            track.write(mp3.silence(frame, pause_ms / 1000))
+                        track.write(frame)
@@ -0,0 +1,205 @@
+import asyncio
+import base64
+import binascii
+import hashlib
+import hmac
+import logging
+import time
+from typing import Any, Optional
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
+from app.core.config import get_settings
+from app.core.database import get_async_session_factory
+from app.core.metrics import metrics
+from app.models.video_script import VideoScript, Scene, SceneImage, MediaStatus, ScriptStatus
+from app.services.image_generation_service import (
+    ImageGenerationService, DEFAULT_GUIDANCE_SCALE, DEFAULT_NEGATIVE_PROMPT, DEFAULT_NUM_INFERENCE_STEPS
+)
+
+logger = logging.getLogger(__name__)
+
+PREDICTION_SUCCEEDED = "succeeded"
+PREDICTION_FINISHED = ("succeeded", "failed", "canceled")
+# Độ lệch tối đa giữa webhook-timestamp và giờ hiện tại
+WEBHOOK_TIMESTAMP_TOLERANCE_SECONDS = 300
+
+
+def webhook_signing_key(secret: str) -> bytes:
+    """Khóa HMAC từ REPLICATE_WEBHOOK_SECRET ("whsec_<base64>"), ValueError nếu secret không hợp lệ"""
+    try:
+        return base64.b64decode(secret.split("_", 1)[1] if secret.startswith("whsec_") else secret, validate=True)
+    except binascii.Error as e:
+        raise ValueError(f"Invalid REPLICATE_WEBHOOK_SECRET: {e}")
+
+
+def verify_webhook_signature(
+    key: bytes, webhook_id: str, timestamp: str, signature_header: str, body: bytes,
+    now: Optional[float] = None
+) -> bool:
+    """
+    Xác thực chữ ký webhook của Replicate (HMAC-SHA256 trên "id.timestamp.body").
+    Từ chối timestamp lệch quá WEBHOOK_TIMESTAMP_TOLERANCE_SECONDS để không phát lại được webhook cũ
+    """
+    if not (webhook_id and timestamp and signature_header):
+        return False
+    try:
+        sent_at = int(timestamp)
+    except ValueError:
+        return False
+    if abs((time.time() if now is None else now) - sent_at) > WEBHOOK_TIMESTAMP_TOLERANCE_SECONDS:
+        return False
+    signed_content = f"{webhook_id}.{timestamp}.".encode("utf-8") + body
+    expected = base64.b64encode(hmac.new(key, signed_content, hashlib.sha256).digest()).decode("utf-8")
+    # Header có thể chứa nhiều chữ ký dạng "v1,<base64>" cách nhau bởi dấu cách
+    for signature in signature_header.split():
+        _, _, value = signature.partition(",")
+        if hmac.compare_digest(value, expected):
+            return True
+    return False
+
+
+def _or_default(value: Any, default: Any) -> Any:
+    return default if value is None else value
+
+
+def _refresh_script_status(scene_image: SceneImage) -> None:
+    """Cập nhật trạng thái script khi không còn scene nào đang tạo ảnh"""
+    script = scene_image.scene.script if scene_image.scene else None
+    if script is None:
+        return
+    statuses = [scene.image_status for scene in script.scenes]
+    if MediaStatus.PROCESSING.value in statuses:
+        return
+    if all(status == MediaStatus.COMPLETED.value for status in statuses):
+        script.status = ScriptStatus.COMPLETED.value
+    else:
+        script.status = ScriptStatus.FAILED.value
+
+
+def apply_prediction_update(
+    image_service: ImageGenerationService,
+    scene_image: SceneImage,
+    status: str,
+    output: Any,
+    error: Optional[str] = None
+) -> bool:
+    """
+    Cập nhật SceneImage (và scene/script) theo trạng thái prediction. Không commit.
+
+    Returns:
+        bool: True nếu prediction đã kết thúc và bản ghi được cập nhật
+    """
+    if status not in PREDICTION_FINISHED or scene_image.status != MediaStatus.PROCESSING.value:
+        return False
+
+    image_url = image_service.extract_output_url(output) if status == PREDICTION_SUCCEEDED else None
+    scene = scene_image.scene
+    if image_url:
+        scene_image.image_url = image_url
+        scene_image.status = MediaStatus.COMPLETED.value
+        if scene:
+            scene.image_status = MediaStatus.COMPLETED.value
+        image_service.remember_image(
+            image_url,
+            scene_image.prompt,
+            scene_image.width,
+            scene_image.height,
+            # Bản ghi cũ (trước khi lưu tham số) dùng giá trị mặc định như lúc submit
+            negative_prompt=_or_default(scene_image.negative_prompt, DEFAULT_NEGATIVE_PROMPT),
+            num_inference_steps=_or_default(scene_image.num_inference_steps, DEFAULT_NUM_INFERENCE_STEPS),
+            guidance_scale=_or_default(scene_image.guidance_scale, DEFAULT_GUIDANCE_SCALE),
+            seed=scene_image.seed
+        )
+    else:
+        logger.error(f"Prediction {scene_image.prediction_id} ended with status {status}: {error}")
+        scene_image.status = MediaStatus.FAILED.value
+        if scene:
+            scene.image_status = MediaStatus.FAILED.value
+    metrics.inc("image_predictions_finished_total", status=status)
+    _refresh_script_status(scene_image)
+    return True
+
+
+class PredictionPoller:
+    """
+    Task nền kiểm tra định kỳ các prediction đang chạy (phòng khi webhook không tới).
+    Mỗi vòng kiểm tra một lô prediction song song và ghi kết quả trong một transaction (AsyncSession).
+    """
+
+    def __init__(self, image_service: ImageGenerationService):
+        settings = get_settings()
+        self.image_service = image_service
+        self.interval = settings.REPLICATE_POLL_INTERVAL_SECONDS
+        self.batch_size = settings.REPLICATE_POLL_BATCH_SIZE
+        self.max_age = settings.REPLICATE_PREDICTION_MAX_AGE_SECONDS
+        self._task: Optional[asyncio.Task] = None
+
+    async def poll_once(self) -> int:
+        """
+        Kiểm tra một lô prediction đang chạy (cũ nhất trước). Prediction quá
+        REPLICATE_PREDICTION_MAX_AGE_SECONDS mà vẫn chưa kết thúc (hoặc không tra cứu được, vd. 404)
+        được đánh dấu FAILED để không chiếm chỗ của các prediction mới trong lô
+        """
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=self.max_age)
+        async with get_async_session_factory()() as db:
+            try:
+                result = await db.execute(
+                    select(SceneImage, SceneImage.created_at < cutoff)
+                    .options(selectinload(SceneImage.scene).selectinload(Scene.script).selectinload(VideoScript.scenes))
+                    .where(SceneImage.status == MediaStatus.PROCESSING.value, SceneImage.prediction_id.isnot(None))
+                    .order_by(SceneImage.created_at)
+                    .limit(self.batch_size)
+                )
+                pending = result.all()
+                if not pending:
+                    return 0
+
+                predictions = await asyncio.gather(
+                    *(self.image_service.get_prediction_async(image.prediction_id) for image, _ in pending),
+                    return_exceptions=True
+                )
+                updated = 0
+                expired = 0
+                for (scene_image, is_expired), prediction in zip(pending, predictions):
+                    if isinstance(prediction, Exception):
+                        logger.error(f"Error fetching prediction {scene_image.prediction_id}: {prediction}")
+                    elif apply_prediction_update(self.image_service, scene_image, prediction.status,
+                                                 prediction.output, prediction.error):
+                        updated += 1
+                        continue
+                    if is_expired:
+                        apply_prediction_update(self.image_service, scene_image, "failed", None,
+                                                f"no result after {self.max_age}s")
+                        expired += 1
+                await db.commit()
+                if updated or expired:
+                    logger.info(f"Prediction poller: {updated}/{len(pending)} predictions finished, {expired} expired")
+                return updated + expired
+            except Exception:
+                await db.rollback()
+                raise
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.poll_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Prediction poller error: {str(e)}")
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+            logger.info(f"Prediction poller started (interval={self.interval}s)")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
@@ -0,0 +1,216 @@
+import asyncio
+import logging
+import uuid
+from typing import List, Optional, Tuple, Union
+from fastapi.concurrency import run_in_threadpool
+from app.core.config import get_settings
+from app.crud import script_batch as batch_crud
+from app.crud import video_script as crud
+from app.database import SessionLocal
+from app.models.script_batch import ScriptBatchJob
+from app.models.video_script import MediaStatus, ScriptStatus
+from app.schemas.video_script import BatchScriptItem, BatchScriptJob, BatchScriptRequest, VideoScript
+from app.services.deepseek_service import DeepSeekService, dedupe_topics
+
+logger = logging.getLogger(__name__)
+
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+
+# Kết quả của một chủ đề: vị trí trong job và kịch bản sinh được hoặc lỗi
+BatchResult = Tuple[int, Union[VideoScript, Exception]]
+
+
+class ScriptBatchService:
+    """
+    Quản lý các job tạo kịch bản hàng loạt.
+    Trạng thái job và từng chủ đề được lưu trong database (script_batch_jobs, script_batch_items)
+    nên GET /batch/{job_id} trả về cùng kết quả từ mọi worker và sau khi khởi động lại.
+    Job chạy trong background task của worker nhận request: nếu process dừng giữa chừng,
+    job giữ trạng thái "running" và không được chạy tiếp.
+    """
+
+    def __init__(self, deepseek_service: DeepSeekService):
+        self.deepseek_service = deepseek_service
+
+    async def create_job(self, request: BatchScriptRequest) -> BatchScriptJob:
+        settings = get_settings()
+        if not request.topics:
+            raise ValueError("topics must not be empty")
+        if len(request.topics) > settings.SCRIPT_BATCH_MAX_TOPICS:
+            raise ValueError(f"A batch accepts at most {settings.SCRIPT_BATCH_MAX_TOPICS} topics")
+
+        unique_topics = list(dedupe_topics(request.topics).values())
+        return await run_in_threadpool(
+            self._create, unique_topics, len(request.topics) - len(unique_topics)
+        )
+
+    async def get_job(self, job_id: str) -> Optional[BatchScriptJob]:
+        return await run_in_threadpool(self._get, job_id)
+
+    async def run_job(self, job_id: str, request: BatchScriptRequest) -> None:
+        """
+        Tạo kịch bản cho tất cả chủ đề của job. Kết quả được lưu theo từng nhóm
+        SCRIPT_BATCH_PERSIST_CHUNK_SIZE ngay khi sinh xong (trong threadpool), lỗi lưu một nhóm
+        chỉ ảnh hưởng các chủ đề của nhóm đó
+        """
+        job = await self.get_job(job_id)
+        if job is None:
+            return
+        await run_in_threadpool(self._start, job_id)
+
+        settings = get_settings()
+        positions = {item.topic: position for position, item in enumerate(job.items)}
+
+        chunk_size = max(1, settings.SCRIPT_BATCH_PERSIST_CHUNK_SIZE)
+        pending: List[BatchResult] = []
+        # Lưu tuần tự từng nhóm: không chiếm nhiều connection của pool cùng lúc
+        persist_lock = asyncio.Lock()
+        persisting: List[asyncio.Task] = []
+
+        async def persist(chunk: List[BatchResult]) -> None:
+            async with persist_lock:
+                try:
+                    await run_in_threadpool(self._persist, job_id, chunk)
+                except Exception as e:
+                    # Các chủ đề chưa ghi được kết quả sẽ được đánh dấu lỗi khi kết thúc job
+                    logger.error(f"Batch job {job_id}: failed to record {len(chunk)} results: {str(e)}")
+
+        def flush() -> None:
+            if pending:
+                persisting.append(asyncio.create_task(persist(pending[:])))
+                pending.clear()
+
+        def on_result(topic: str, result: Union[VideoScript, Exception]) -> None:
+            pending.append((positions[topic], result))
+            if len(pending) >= chunk_size:
+                flush()
+
+        concurrency = min(request.concurrency or settings.SCRIPT_BATCH_MAX_CONCURRENCY,
+                          settings.SCRIPT_BATCH_MAX_CONCURRENCY)
+        try:
+            await self.deepseek_service.generate_video_scripts_batch(
+                [item.topic for item in job.items],
+                target_audience=request.target_audience,
+                duration=request.duration,
+                concurrency=concurrency,
+                mode=request.generation_mode,
+                bypass_cache=request.bypass_cache,
+                on_result=on_result
+            )
+            flush()
+            await asyncio.gather(*persisting)
+            status, error = JOB_COMPLETED, "Result was not saved"
+        except Exception as e:
+            logger.error(f"Batch job {job_id} failed: {str(e)}")
+            # Các nhóm đang lưu vẫn chạy tiếp; chỉ đánh dấu lỗi các chủ đề chưa được lưu
+            await asyncio.gather(*persisting, return_exceptions=True)
+            status, error = JOB_FAILED, str(e)
+        try:
+            await run_in_threadpool(self._finish, job_id, status, error)
+        except Exception as e:
+            logger.error(f"Batch job {job_id}: failed to record final status: {str(e)}")
+
+    @staticmethod
+    def _to_schema(db_job: ScriptBatchJob) -> BatchScriptJob:
+        return BatchScriptJob(
+            job_id=db_job.id,
+            status=db_job.status,
+            total=db_job.total,
+            completed=db_job.completed,
+            failed=db_job.failed,
+            duplicates_skipped=db_job.duplicates_skipped,
+            items=[
+                BatchScriptItem(topic=item.topic, status=item.status, script_id=item.script_id, error=item.error)
+                for item in db_job.items
+            ],
+            created_at=db_job.created_at,
+            finished_at=db_job.finished_at
+        )
+
+    @classmethod
+    def _create(cls, topics: List[str], duplicates_skipped: int) -> BatchScriptJob:
+        db = SessionLocal()
+        try:
+            return cls._to_schema(batch_crud.create_batch_job(db, JOB_RUNNING, topics, duplicates_skipped))
+        finally:
+            db.close()
+
+    @classmethod
+    def _get(cls, job_id: str) -> Optional[BatchScriptJob]:
+        db = SessionLocal()
+        try:
+            db_job = batch_crud.get_batch_job(db, job_id)
+            return cls._to_schema(db_job) if db_job else None
+        finally:
+            db.close()
+
+    @staticmethod
+    def _start(job_id: str) -> None:
+        db = SessionLocal()
+        try:
+            batch_crud.start_batch_job(db, job_id)
+        finally:
+            db.close()
+
+    @staticmethod
+    def _finish(job_id: str, status: str, error: str) -> None:
+        db = SessionLocal()
+        try:
+            batch_crud.finish_batch_job(db, job_id, status, error)
+        finally:
+            db.close()
+
+    @staticmethod
+    def _persist(job_id: str, chunk: List[BatchResult]) -> None:
+        """
+        Bulk insert VideoScript/Scene của các chủ đề thành công và ghi kết quả cả nhóm vào job
+        trong một transaction. Nếu insert lỗi, các chủ đề thành công của nhóm được ghi là lỗi lưu
+        """
+        results = []
+        saved = []
+        script_rows = []
+        scene_rows = []
+        for position, result in chunk:
+            if isinstance(result, Exception):
+                results.append({"position": position, "status": MediaStatus.FAILED.value, "error": str(result)})
+                continue
+            script_id = str(uuid.uuid4())
+            saved.append({"position": position, "status": MediaStatus.COMPLETED.value, "script_id": script_id})
+            script_rows.append({
+                "id": script_id,
+                "title": result.title,
+                "description": result.description,
+                "target_audience": result.target_audience,
+                "total_duration": result.total_duration,
+                "status": ScriptStatus.DRAFT.value
+            })
+            for scene in result.scenes:
+                scene_rows.append({
+                    "script_id": script_id,
+                    **scene.dict(),
+                    "image_status": MediaStatus.PENDING.value,
+                    "voice_status": MediaStatus.PENDING.value
+                })
+
+        db = SessionLocal()
+        try:
+            try:
+                crud.create_scripts_bulk(db, script_rows, commit=False)
+                crud.create_scenes_bulk(db, scene_rows, commit=False)
+                batch_crud.record_batch_results(db, job_id, results + saved, commit=False)
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                logger.error(f"Batch job {job_id}: failed to save {len(script_rows)} scripts: {str(e)}")
+                failed = [
+                    {"position": row["position"], "status": MediaStatus.FAILED.value,
+                     "error": f"Failed to save script: {str(e)}"}
+                    for row in saved
+                ]
+                batch_crud.record_batch_results(db, job_id, results + failed)
+                return
+        finally:
+            db.close()
+        logger.info(f"Saved {len(script_rows)} batch scripts, {len(scene_rows)} scenes")
@@ -0,0 +1,80 @@
+import re
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+from app.schemas.content_suggestion import VideoInfo
+
+# Hằng số k của Reciprocal Rank Fusion: càng lớn thì chênh lệch giữa các thứ hạng đầu càng nhỏ
+RRF_K = 60
+
+_YOUTUBE_ID = re.compile(r"^[A-Za-z0-9_-]{11}$")
+_TIKTOK_VIDEO = re.compile(r"/video/(\d+)")
+
+
+def to_video_info(video: Dict, platform: str) -> Optional[VideoInfo]:
+    """Chuẩn hóa một video dạng dict (kết quả YouTube/TikTok của router) về VideoInfo"""
+    if not video.get("url"):
+        return None
+    duration = video.get("duration")
+    return VideoInfo(
+        title=video.get("title") or "",
+        description=video.get("description"),
+        url=video["url"],
+        thumbnail_url=video.get("thumbnail_url"),
+        view_count=video.get("view_count"),
+        like_count=video.get("like_count"),
+        published_at=video.get("published_at"),
+        platform=platform,
+        duration=str(duration) if duration is not None else None,
+        channel_name=video.get("channel_name"),
+    )
+
+
+def canonical_key(url: str) -> str:
+    """Khóa định danh video để loại trùng giữa các nguồn (vd. Google trả về link YouTube)"""
+    parsed = urlparse(url)
+    if parsed.path == "/url" and "q" in parse_qs(parsed.query):
+        # Link chuyển hướng của trang kết quả Google
+        parsed = urlparse(parse_qs(parsed.query)["q"][0])
+    host = re.sub(r"^(www\.|m\.)", "", parsed.netloc.lower())
+    if host == "youtu.be":
+        video_id = parsed.path.strip("/")
+        if _YOUTUBE_ID.match(video_id):
+            return f"youtube:{video_id}"
+    if host.endswith("youtube.com"):
+        video_id = parse_qs(parsed.query).get("v", [""])[0]
+        if not video_id and parsed.path.startswith("/shorts/"):
+            video_id = parsed.path.split("/")[2]
+        if _YOUTUBE_ID.match(video_id):
+            return f"youtube:{video_id}"
+    if host.endswith("tiktok.com"):
+        match = _TIKTOK_VIDEO.search(parsed.path)
+        if match:
+            return f"tiktok:{match.group(1)}"
+    query = f"?{parsed.query}" if parsed.query else ""
+    return f"{host}{parsed.path.rstrip('/')}{query}"
+
+
+def _richness(video: VideoInfo) -> int:
+    """Số trường có dữ liệu, dùng để giữ bản ghi đầy đủ nhất khi trùng"""
+    return sum(value is not None and value != "" for value in video.dict().values())
+
+
+def merge_and_rank(results: Dict[str, List[VideoInfo]], limit: Optional[int] = None) -> List[VideoInfo]:
+    """
+    Gộp kết quả của nhiều nguồn: loại trùng theo canonical_key và xếp hạng bằng
+    Reciprocal Rank Fusion (video xuất hiện ở nhiều nguồn / thứ hạng cao được ưu tiên),
+    hòa điểm thì so lượt xem
+    """
+    merged: Dict[str, VideoInfo] = {}
+    scores: Dict[str, float] = {}
+    for videos in results.values():
+        for rank, video in enumerate(videos, start=1):
+            key = canonical_key(video.url)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (RRF_K + rank)
+            current = merged.get(key)
+            if current is None or _richness(video) > _richness(current):
+                merged[key] = video
+
+    ranked = sorted(merged, key=lambda key: (scores[key], merged[key].view_count or 0), reverse=True)
+    videos = [merged[key] for key in ranked]
+    return videos[:limit] if limit else videos
@@ -1,6 +1,6 @@
-from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 from app.core.config import get_settings
+from app.core.google_api import get_google_api_client
 import logging
 from typing import List
 from app.schemas.content_suggestion import VideoInfo
@@ -14,8 +14,11 @@ class YouTubeService:
         self.api_key = settings.YOUTUBE_API_KEY
         if not self.api_key:
             raise ValueError("YOUTUBE_API_KEY is not set in settings")
-        
-        self.youtube = build('youtube', 'v3', developerKey=self.api_key)
+
+    @property
+    def youtube(self):
+        # Client được cache theo thread nên service dùng được từ thread pool
+        return get_google_api_client('youtube', 'v3', self.api_key)
 
     def search_videos(self, keyword: str, max_results: int = 10) -> List[VideoInfo]:
         """
@@ -0,0 +1,100 @@
+import json
+from typing import Any, List, Optional
+
+
+class IncrementalJSONParser:
+    """
+    Parse dần một object JSON được stream từ LLM.
+
+    Mỗi phần tử object của mảng `array_key` ở cấp cao nhất được trả về ngay khi
+    object đó hoàn chỉnh, không cần chờ toàn bộ response. Văn bản bao quanh
+    object gốc (vd. ```json ... ```) được bỏ qua.
+    """
+
+    def __init__(self, array_key: str = "scenes"):
+        self.array_key = array_key
+        self._buffer = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string_start: Optional[int] = None
+        self._last_key: Optional[str] = None
+        self._root_start: Optional[int] = None
+        self._root_end: Optional[int] = None
+        self._in_array = False
+        self._array_closed = False
+        self._item_start: Optional[int] = None
+
+    @property
+    def text(self) -> str:
+        return self._buffer
+
+    @property
+    def started(self) -> bool:
+        return self._root_start is not None
+
+    @property
+    def done(self) -> bool:
+        return self._root_end is not None
+
+    def feed(self, chunk: str) -> List[Any]:
+        """Thêm một đoạn text, trả về các phần tử của mảng vừa hoàn chỉnh"""
+        self._buffer += chunk
+        buf = self._buffer
+        items = []
+        i = self._pos
+        while i < len(buf) and self._root_end is None:
+            ch = buf[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        # Chuỗi cuối cùng ở cấp gốc, là key khi gặp '[' ngay sau đó
+                        self._last_key = buf[self._string_start + 1:i]
+            elif self._root_start is None:
+                if ch == "{":
+                    self._root_start = i
+                    self._depth = 1
+            elif ch == '"':
+                self._in_string = True
+                self._string_start = i
+            elif ch == "{" or ch == "[":
+                if (ch == "[" and self._depth == 1 and not self._in_array
+                        and not self._array_closed and self._last_key == self.array_key):
+                    self._in_array = True
+                elif ch == "{" and self._in_array and self._depth == 2:
+                    self._item_start = i
+                self._depth += 1
+            elif ch == "}" or ch == "]":
+                self._depth -= 1
+                if ch == "}" and self._item_start is not None and self._depth == 2:
+                    items.append(json.loads(buf[self._item_start:i + 1]))
+                    self._item_start = None
+                elif ch == "]" and self._in_array and self._depth == 1:
+                    self._in_array = False
+                    self._array_closed = True
+                if self._depth == 0:
+                    self._root_end = i + 1
+            i += 1
+        self._pos = i
+        return items
+
+    def result(self) -> Any:
+        """Parse toàn bộ object gốc sau khi stream kết thúc"""
+        if self._root_start is None:
+            raise ValueError("No JSON found in response")
+        if self._root_end is None:
+            raise ValueError("Incomplete JSON in response")
+        return json.loads(self._buffer[self._root_start:self._root_end])
+
+
+def extract_json_object(text: str) -> Any:
+    """Lấy object JSON đầu tiên trong một đoạn text, bỏ qua phần text bao quanh"""
+    parser = IncrementalJSONParser()
+    parser.feed(text)
+    return parser.result()
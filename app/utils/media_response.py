@@ -0,0 +1,87 @@
+import mimetypes
+import os
+import re
+from typing import Iterator, Optional, Tuple
+from fastapi import HTTPException
+from starlette.responses import StreamingResponse
+
+CHUNK_SIZE = 64 * 1024
+_RANGE_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+# mimetypes trên một số hệ điều hành không có sẵn kiểu audio
+MEDIA_TYPES = {
+    ".mp3": "audio/mpeg",
+    ".ogg": "audio/ogg",
+    ".wav": "audio/wav",
+}
+
+
+def guess_media_type(path: str) -> str:
+    extension = os.path.splitext(path)[1].lower()
+    return MEDIA_TYPES.get(extension) or mimetypes.guess_type(path)[0] or "application/octet-stream"
+
+
+def parse_range(range_header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Phân tích header Range (một khoảng byte). Trả về (start, end) tính cả end,
+    None nếu không có/không hỗ trợ, và ValueError nếu khoảng nằm ngoài file
+    """
+    if not range_header:
+        return None
+    match = _RANGE_PATTERN.match(range_header.strip())
+    if not match:
+        # Nhiều khoảng hoặc đơn vị khác: trả về toàn bộ file
+        return None
+    start, end = match.groups()
+    if not start and not end:
+        return None
+    if not start:
+        # bytes=-N: N byte cuối
+        length = int(end)
+        if length == 0:
+            raise ValueError("Unsatisfiable range")
+        return max(0, size - length), size - 1
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    if start >= size or start > end:
+        raise ValueError("Unsatisfiable range")
+    return start, end
+
+
+def _iter_file(path: str, start: int, length: int) -> Iterator[bytes]:
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = length
+        while remaining > 0:
+            chunk = f.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def ranged_file_response(path: str, range_header: Optional[str] = None, media_type: Optional[str] = None) -> StreamingResponse:
+    """
+    Stream file theo từng khối với Content-Length, hỗ trợ Range (trả về 206 Partial Content)
+    """
+    if not os.path.isfile(path):
+        raise HTTPException(status_code=404, detail="File not found")
+    size = os.path.getsize(path)
+    media_type = media_type or guess_media_type(path)
+    headers = {"Accept-Ranges": "bytes"}
+
+    try:
+        byte_range = parse_range(range_header, size)
+    except ValueError:
+        raise HTTPException(status_code=416, detail="Requested range not satisfiable",
+                            headers={"Content-Range": f"bytes */{size}"})
+
+    if byte_range is None:
+        headers["Content-Length"] = str(size)
+        return StreamingResponse(_iter_file(path, 0, size), media_type=media_type, headers=headers)
+
+    start, end = byte_range
+    length = end - start + 1
+    headers["Content-Length"] = str(length)
+    headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    return StreamingResponse(_iter_file(path, start, length), status_code=206, media_type=media_type, headers=headers)
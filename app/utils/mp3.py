@@ -0,0 +1,197 @@
+"""
+Đọc cấu trúc frame MP3 (MPEG-1/2/2.5 Layer III) để tính thời lượng, cắt và nối audio
+theo ranh giới frame mà không cần giải mã/encode lại.
+"""
+import os
+from typing import BinaryIO, Iterator, List, NamedTuple, Tuple
+
+# Bitrate (kbps) theo chỉ số, Layer III
+_BITRATES_V1 = [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320]
+_BITRATES_V2 = [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160]
+# Sample rate theo version: 0 = MPEG-2.5, 2 = MPEG-2, 3 = MPEG-1
+_SAMPLE_RATES = {
+    0: [11025, 12000, 8000],
+    2: [22050, 24000, 16000],
+    3: [44100, 48000, 32000],
+}
+
+
+class Mp3Frame(NamedTuple):
+    offset: int
+    size: int
+    duration: float  # giây
+
+
+def _skip_id3v2(data: bytes) -> int:
+    """Vị trí byte đầu tiên sau tag ID3v2 (nếu có)"""
+    if len(data) < 10 or data[:3] != b"ID3":
+        return 0
+    size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+    footer = 10 if data[5] & 0x10 else 0
+    return 10 + size + footer
+
+
+def _parse_header(data: bytes, offset: int):
+    """Trả về (size, duration, version, mono) nếu tại offset là header frame hợp lệ, ngược lại None"""
+    if offset + 4 > len(data):
+        return None
+    b1, b2, b3 = data[offset + 1], data[offset + 2], data[offset + 3]
+    if data[offset] != 0xFF or (b1 & 0xE0) != 0xE0:
+        return None
+    version = (b1 >> 3) & 0x03
+    layer = (b1 >> 1) & 0x03
+    bitrate_index = b2 >> 4
+    sample_rate_index = (b2 >> 2) & 0x03
+    if version == 1 or layer != 1 or bitrate_index in (0, 15) or sample_rate_index == 3:
+        return None
+
+    padding = (b2 >> 1) & 0x01
+    sample_rate = _SAMPLE_RATES[version][sample_rate_index]
+    if version == 3:
+        bitrate = _BITRATES_V1[bitrate_index] * 1000
+        samples = 1152
+        size = 144 * bitrate // sample_rate + padding
+    else:
+        bitrate = _BITRATES_V2[bitrate_index] * 1000
+        samples = 576
+        size = 72 * bitrate // sample_rate + padding
+    mono = (b3 >> 6) == 3
+    return size, samples / sample_rate, version, mono
+
+
+def _is_info_frame(data: bytes, offset: int, version: int, mono: bool) -> bool:
+    """Frame Xing/Info (header VBR, không chứa âm thanh)"""
+    if version == 3:
+        side_info = 17 if mono else 32
+    else:
+        side_info = 9 if mono else 17
+    tag_offset = offset + 4 + side_info
+    return data[tag_offset:tag_offset + 4] in (b"Xing", b"Info")
+
+
+def iter_frames(data: bytes) -> Iterator[Mp3Frame]:
+    """Duyệt các frame audio, bỏ qua tag ID3 và frame Xing/Info"""
+    offset = _skip_id3v2(data)
+    end = len(data)
+    if end >= 128 and data[end - 128:end - 125] == b"TAG":
+        end -= 128  # Tag ID3v1 ở cuối file
+    first = True
+    while offset + 4 <= end:
+        header = _parse_header(data, offset)
+        if header is None or offset + header[0] > end:
+            # Dữ liệu rác giữa các frame: dò tiếp byte đồng bộ
+            offset += 1
+            continue
+        size, duration, version, mono = header
+        if not (first and _is_info_frame(data, offset, version, mono)):
+            yield Mp3Frame(offset, size, duration)
+        first = False
+        offset += size
+
+
+def iter_file_frames(f: BinaryIO, chunk_size: int = 64 * 1024) -> Iterator[Tuple[Mp3Frame, bytes]]:
+    """
+    Như iter_frames nhưng đọc dần từ file đang mở (không nạp cả file vào bộ nhớ),
+    yield từng frame kèm bytes của frame đó
+    """
+    f.seek(0, os.SEEK_END)
+    end = f.tell()
+    if end >= 128:
+        f.seek(end - 128)
+        if f.read(3) == b"TAG":
+            end -= 128  # Tag ID3v1 ở cuối file
+    f.seek(0)
+    offset = _skip_id3v2(f.read(10))
+    f.seek(offset)
+
+    buffer = b""
+    buffer_start = offset
+
+    def fill(size: int) -> int:
+        """Đảm bảo buffer chứa `size` byte từ offset (nếu file còn đủ), trả về vị trí offset trong buffer"""
+        nonlocal buffer, buffer_start
+        position = offset - buffer_start
+        if len(buffer) - position < size:
+            buffer = buffer[position:] + f.read(max(chunk_size, size))
+            buffer_start = offset
+            position = 0
+        return position
+
+    first = True
+    while offset + 4 <= end:
+        # Header và side info (đủ để nhận diện frame Xing/Info)
+        position = fill(40)
+        header = _parse_header(buffer, position)
+        if header is None or offset + header[0] > end:
+            # Dữ liệu rác giữa các frame: dò tiếp byte đồng bộ
+            offset += 1
+            continue
+        size, duration, version, mono = header
+        position = fill(size)
+        if not (first and _is_info_frame(buffer, position, version, mono)):
+            yield Mp3Frame(offset, size, duration), buffer[position:position + size]
+        first = False
+        offset += size
+
+
+def duration_seconds(data: bytes) -> float:
+    """Thời lượng audio tính từ các frame (không giải mã)"""
+    return sum(frame.duration for frame in iter_frames(data))
+
+
+def file_duration_seconds(f: BinaryIO) -> float:
+    """Thời lượng audio của file đang mở, đọc dần từng frame"""
+    return sum(frame.duration for frame, _ in iter_file_frames(f))
+
+
+def split_at(data: bytes, times: List[float]) -> List[bytes]:
+    """
+    Cắt audio tại các mốc thời gian (giây, tăng dần), làm tròn tới ranh giới frame gần nhất.
+    Trả về len(times) + 1 đoạn.
+    """
+    frames = list(iter_frames(data))
+    if not frames:
+        return [b""] * (len(times) + 1)
+
+    pieces = []
+    boundary = 0
+    start_offset = frames[0].offset
+    elapsed = 0.0
+    for frame in frames:
+        # Cắt trước frame này nếu mốc gần đầu frame hơn cuối frame
+        while boundary < len(times) and elapsed + frame.duration / 2 > times[boundary]:
+            pieces.append(data[start_offset:frame.offset])
+            start_offset = frame.offset
+            boundary += 1
+        elapsed += frame.duration
+    last = frames[-1]
+    pieces.append(data[start_offset:last.offset + last.size])
+    while len(pieces) < len(times) + 1:
+        pieces.append(b"")
+    return pieces
+
+
+def concat(chunks: List[bytes]) -> bytes:
+    """Nối nhiều file MP3 thành một, bỏ tag ID3 và frame Xing/Info của từng file"""
+    parts = []
+    for chunk in chunks:
+        frames = list(iter_frames(chunk))
+        if frames:
+            parts.append(chunk[frames[0].offset:frames[-1].offset + frames[-1].size])
+    return b"".join(parts)
+
+
+def silence(reference: bytes, seconds: float) -> bytes:
+    """
+    Các frame im lặng (side info và main data bằng 0) cùng định dạng với frame đầu tiên
+    của `reference`, thời lượng làm tròn tới số frame gần nhất
+    """
+    frame = next(iter_frames(reference), None)
+    if frame is None or seconds <= 0:
+        return b""
+    header = bytearray(reference[frame.offset:frame.offset + 4])
+    header[1] |= 0x01  # Không có CRC
+    header[2] &= 0xFD  # Bỏ bit padding
+    size, duration, _, _ = _parse_header(bytes(header), 0)
+    count = max(1, round(seconds / duration))
+    return (bytes(header) + bytes(size - 4)) * count
@@ -0,0 +1,23 @@
+"""
+Cursor cho phân trang keyset: mã hóa vị trí (created_at, id) của bản ghi cuối trang
+thành chuỗi opaque để client gửi lại khi lấy trang tiếp theo.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Tuple
+
+
+def encode_cursor(created_at: datetime, item_id: str) -> str:
+    payload = json.dumps({"c": created_at.isoformat(), "i": item_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    """Giải mã cursor, ném ValueError nếu cursor không hợp lệ"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(payload["c"]), str(payload["i"])
+    except Exception:
+        raise ValueError("Invalid cursor")
@@ -0,0 +1,36 @@
+"""
+Đếm số câu lệnh SQL thực thi trên một engine, dùng để phát hiện N+1 query
+trong benchmark và khi debug endpoint.
+"""
+from contextlib import contextmanager
+from typing import Iterator, List
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+        self.commits = 0
+        self.statements: List[str] = []
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        # executemany (bulk insert) là một round trip
+        self.count += 1
+        self.statements.append(statement)
+
+    def _on_commit(self, conn) -> None:
+        self.commits += 1
+
+
+@contextmanager
+def count_queries(engine: Engine) -> Iterator[QueryCounter]:
+    """Đếm các câu lệnh chạy trên `engine` trong khối `with`"""
+    counter = QueryCounter()
+    event.listen(engine, "before_cursor_execute", counter._on_execute)
+    event.listen(engine, "commit", counter._on_commit)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, "before_cursor_execute", counter._on_execute)
+        event.remove(engine, "commit", counter._on_commit)
@@ -0,0 +1,41 @@
+"""Thiết lập môi trường chung cho các script benchmark (chạy độc lập, không cần file .env)"""
+import os
+import sys
+import tempfile
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+
+def bootstrap_env(**overrides: str) -> str:
+    """Đặt các biến môi trường bắt buộc của Settings và trả về đường dẫn SQLite tạm"""
+    if ROOT_DIR not in sys.path:
+        sys.path.insert(0, ROOT_DIR)
+
+    db_path = os.path.join(tempfile.mkdtemp(prefix="bench_"), "bench.db")
+    defaults = {
+        "SECRET_KEY": "bench-secret",
+        "ALGORITHM": "HS256",
+        "ACCESS_TOKEN_EXPIRE_MINUTES": "30",
+        "REFRESH_TOKEN_EXPIRE_MINUTES": "10080",
+        "DATABASE_URL": f"sqlite:///{db_path}",
+    }
+    defaults.update(overrides)
+    for key, value in defaults.items():
+        os.environ[key] = value
+    return db_path
+
+
+def make_sqlite_session_factory(database_url: str):
+    """Tạo engine/sessionmaker SQLite dùng được từ nhiều thread (threadpool của FastAPI)"""
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from app.models import Base
+
+    engine = create_engine(database_url, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    return engine, sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def report(label: str, count: int, elapsed: float) -> None:
+    throughput = count / elapsed if elapsed > 0 else float("inf")
+    print(f"{label:<28} requests={count:<5} elapsed={elapsed:8.3f}s  throughput={throughput:8.2f} req/s")
@@ -0,0 +1,115 @@
+"""
+Benchmark: endpoint đọc database bằng Session sync và AsyncSession (SQLite + aiosqlite tạm).
+
+So sánh N request đồng thời tới GET /api/video-scripts/scripts/{id}:
+  - sync:  handler async gọi crud sync như trước đây (query chặn event loop)
+  - async: endpoint hiện tại dùng get_async_db và crud async
+
+Đồng thời đo độ trễ lớn nhất của event loop (heartbeat mỗi 1 ms): với sync, mọi request khác
+phải chờ trong lúc một query đang chạy.
+
+Chạy: python benchmarks/bench_async_db.py --requests 200 --scripts 500 --scenes 10
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from _env import bootstrap_env, make_sqlite_session_factory, report
+
+
+async def heartbeat(stop: asyncio.Event, lags: list) -> None:
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        started = loop.time()
+        await asyncio.sleep(0.001)
+        lags.append(loop.time() - started - 0.001)
+
+
+async def run_round(app, path_for, script_ids, count: int):
+    import httpx
+
+    stop = asyncio.Event()
+    lags = []
+    ticker = asyncio.create_task(heartbeat(stop, lags))
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        started = time.perf_counter()
+        responses = await asyncio.gather(
+            *(client.get(path_for(random.choice(script_ids))) for _ in range(count))
+        )
+        elapsed = time.perf_counter() - started
+    stop.set()
+    await ticker
+
+    failed = [r for r in responses if r.status_code != 200]
+    if failed:
+        raise RuntimeError(f"{len(failed)} requests failed, first: {failed[0].text}")
+    return elapsed, max(lags) if lags else 0.0
+
+
+async def run(args) -> None:
+    from fastapi import Depends, FastAPI
+    from app.api import video_script
+    from app.core.database import close_async_engine
+    from app.crud import video_script as crud
+    from app.schemas.video_script import VideoScript
+
+    engine, SessionFactory = make_sqlite_session_factory(args.database_url)
+    db = SessionFactory()
+    try:
+        script_ids = crud.create_scripts_bulk(db, [
+            {"title": f"Script {i}", "description": "", "target_audience": "Developers",
+             "total_duration": 60, "status": "draft"}
+            for i in range(args.scripts)
+        ], commit=False)
+        crud.create_scenes_bulk(db, [
+            {"script_id": script_id, "scene_number": number, "description": "Scene", "duration": 4,
+             "visual_elements": "A city skyline at dawn", "voice_over": "Xin chào"}
+            for script_id in script_ids for number in range(1, args.scenes + 1)
+        ], commit=False)
+        db.commit()
+    finally:
+        db.close()
+
+    def get_sync_db():
+        session = SessionFactory()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    app = FastAPI()
+    app.include_router(video_script.router, prefix="/api/video-scripts")
+
+    # Tái hiện handler cũ: async def nhưng query bằng Session sync
+    @app.get("/sync/scripts/{script_id}", response_model=VideoScript)
+    async def get_script_sync(script_id: str, session=Depends(get_sync_db)):
+        return crud.get_script(session, script_id, options=crud.WITH_SCENES)
+
+    rounds = (
+        ("sync", lambda script_id: f"/sync/scripts/{script_id}"),
+        ("async", lambda script_id: f"/api/video-scripts/scripts/{script_id}"),
+    )
+    for label, path_for in rounds:
+        elapsed, max_lag = await run_round(app, path_for, script_ids, args.requests)
+        report(f"{label} (max loop lag {max_lag * 1000:.1f} ms)", args.requests, elapsed)
+
+    await close_async_engine()
+    engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--scripts", type=int, default=500)
+    parser.add_argument("--scenes", type=int, default=10)
+    args = parser.parse_args()
+
+    db_path = bootstrap_env()
+    args.database_url = f"sqlite:///{db_path}"
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
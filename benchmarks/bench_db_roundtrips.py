@@ -0,0 +1,91 @@
+"""
+Benchmark: số round trip database khi lưu một kịch bản vừa sinh (SQLite tạm, không gọi LLM).
+
+So sánh:
+  - per-row: create_script + update_script + create_scene cho từng cảnh + get_script
+             như /video-scripts/generate trước đây (add + commit + refresh mỗi bản ghi)
+  - bulk:    create_scripts_bulk + create_scenes_bulk trong một transaction + get_script
+
+Chạy: python benchmarks/bench_db_roundtrips.py --scenes 15 --rounds 20
+"""
+import argparse
+import time
+
+from _env import bootstrap_env, make_sqlite_session_factory
+
+
+def scene_rows(count: int):
+    return [
+        {
+            "scene_number": number,
+            "description": f"Scene {number}",
+            "duration": 4,
+            "visual_elements": "A city skyline at dawn",
+            "background_music": "Lo-fi",
+            "voice_over": "Xin chào các bạn",
+            "image_status": "pending",
+            "voice_status": "pending",
+        }
+        for number in range(1, count + 1)
+    ]
+
+
+def save_per_row(db, crud, request, scenes) -> None:
+    from app.models.video_script import Scene
+
+    db_script = crud.create_script(db, request)
+    crud.update_script(db, db_script.id, {"title": "Benchmark", "description": "", "total_duration": 60})
+    for data in scenes:
+        db_scene = Scene(script_id=db_script.id, **data)
+        db.add(db_scene)
+        db.commit()
+        db.refresh(db_scene)
+    crud.get_script(db, db_script.id)
+
+
+def save_bulk(db, crud, request, scenes) -> None:
+    script_id = crud.create_scripts_bulk(db, [{
+        "title": "Benchmark",
+        "description": "",
+        "target_audience": request.target_audience,
+        "total_duration": 60,
+        "status": "draft",
+    }], commit=False)[0]
+    crud.create_scenes_bulk(db, [{"script_id": script_id, **data} for data in scenes], commit=False)
+    db.commit()
+    crud.get_script(db, script_id)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenes", type=int, default=15)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    db_path = bootstrap_env()
+    from app.crud import video_script as crud
+    from app.schemas.video_script import CreateScriptRequest
+    from app.utils.query_counter import count_queries
+
+    engine, SessionFactory = make_sqlite_session_factory(f"sqlite:///{db_path}")
+
+    request = CreateScriptRequest(topic="Benchmark", target_audience="Developers", duration=60)
+    scenes = scene_rows(args.scenes)
+    for label, save in (("per-row", save_per_row), ("bulk", save_bulk)):
+        started = time.perf_counter()
+        with count_queries(engine) as counter:
+            for _ in range(args.rounds):
+                db = SessionFactory()
+                try:
+                    save(db, crud, request, scenes)
+                finally:
+                    db.close()
+        elapsed = time.perf_counter() - started
+        print(
+            f"{label:<8} scenes={args.scenes:<3} statements/script={counter.count / args.rounds:6.1f}  "
+            f"commits/script={counter.commits / args.rounds:5.1f}  per script={elapsed / args.rounds * 1000:8.2f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
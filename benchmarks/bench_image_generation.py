@@ -0,0 +1,103 @@
+"""
+Benchmark: POST /images/generate-for-script/{script_id} với Replicate giả lập (sleep cố định).
+
+So sánh tạo ảnh tuần tự (concurrency=1) với tạo song song (concurrency=N).
+
+Chạy: python benchmarks/bench_image_generation.py --scenes 12 --latency 1.0 --concurrency 6
+"""
+import argparse
+import asyncio
+import time
+import uuid
+
+from _env import bootstrap_env, make_sqlite_session_factory, report
+
+
+class FakeReplicateClient:
+    """Thay thế replicate.Client: mỗi lần run() chờ `latency` giây rồi trả về URL giả"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    def run(self, model_id, input):
+        time.sleep(self.latency)
+        return [f"https://replicate.stub/{uuid.uuid4()}.png"]
+
+
+def seed_script(SessionFactory, scene_count: int) -> str:
+    from app.models.video_script import VideoScript, Scene
+
+    db = SessionFactory()
+    try:
+        script = VideoScript(title="Benchmark", description="", target_audience="bench", total_duration=scene_count * 5)
+        db.add(script)
+        db.flush()
+        for number in range(1, scene_count + 1):
+            db.add(Scene(script_id=script.id, scene_number=number, description=f"Scene {number}",
+                         duration=5, visual_elements=f"A quiet street at dawn, frame {number}"))
+        db.commit()
+        return script.id
+    finally:
+        db.close()
+
+
+async def run_round(app, script_id: str, concurrency: int) -> float:
+    import httpx
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        started = time.perf_counter()
+        response = await client.post(f"/api/images/generate-for-script/{script_id}", params={"concurrency": concurrency})
+        elapsed = time.perf_counter() - started
+    response.raise_for_status()
+    return elapsed
+
+
+async def run(args) -> None:
+    from fastapi import FastAPI
+    from app.api import image
+    from app.database import get_db
+
+    engine, SessionFactory = make_sqlite_session_factory(args.database_url)
+
+    def bench_get_db():
+        db = SessionFactory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app = FastAPI()
+    app.include_router(image.router, prefix="/api/images")
+    app.dependency_overrides[get_db] = bench_get_db
+    image.image_service.client = FakeReplicateClient(args.latency)
+
+    print(f"scenes={args.scenes} replicate latency={args.latency}s "
+          f"global limit={image.image_service.max_concurrency}")
+    for concurrency in (1, args.concurrency):
+        script_id = seed_script(SessionFactory, args.scenes)
+        elapsed = await run_round(app, script_id, concurrency)
+        report(f"concurrency={concurrency}", args.scenes, elapsed)
+
+    engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenes", type=int, default=12)
+    parser.add_argument("--latency", type=float, default=1.0, help="thời gian giả lập của một lần chạy SDXL (giây)")
+    parser.add_argument("--concurrency", type=int, default=6)
+    args = parser.parse_args()
+
+    db_path = bootstrap_env(
+        REPLICATE_API_TOKEN="bench-token",
+        IMAGE_GENERATION_MAX_CONCURRENCY=str(max(args.concurrency, 1)),
+        # Tắt cache ảnh để mọi vòng đều gọi Replicate giả lập
+        IMAGE_CACHE_ENABLED="False",
+    )
+    args.database_url = f"sqlite:///{db_path}"
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
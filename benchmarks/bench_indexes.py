@@ -0,0 +1,160 @@
+"""
+Benchmark: thời gian các truy vấn CRUD chính trước/sau khi có index (SQLite tạm, dữ liệu lớn).
+
+Seed --scenes cảnh (mặc định 1M, --scenes-per-script cảnh mỗi kịch bản), cứ --media-every cảnh
+thì có một hình ảnh và một voice audio. Đo các truy vấn khi chưa có index của migration
+d5a8e3b2f7c4, rồi tạo index và đo lại.
+
+Chạy: python benchmarks/bench_indexes.py --scenes 1000000 --repeat 50
+"""
+import argparse
+import random
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from _env import bootstrap_env, make_sqlite_session_factory
+
+# Index do migration d5a8e3b2f7c4 thêm vào
+NEW_INDEXES = (
+    "ix_video_scripts_status",
+    "ix_video_scripts_created_id",
+    "ix_scenes_script_id_scene_number",
+    "ix_scene_images_scene_id",
+    "ix_scene_images_status_created_at",
+    "ix_voice_audios_scene_id_created_at",
+)
+CHUNK = 10000
+
+
+def insert_chunked(conn, table, rows) -> None:
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= CHUNK:
+            conn.execute(table.insert(), batch)
+            batch = []
+    if batch:
+        conn.execute(table.insert(), batch)
+
+
+def seed(engine, scenes: int, scenes_per_script: int, media_every: int, users: int):
+    from app.models.video_script import VideoScript, Scene, SceneImage, VoiceAudio
+
+    started = time.perf_counter()
+    scripts = max(1, scenes // scenes_per_script)
+    user_ids = [str(uuid.uuid4()) for _ in range(users)]
+    script_ids = [str(uuid.uuid4()) for _ in range(scripts)]
+    base = datetime(2026, 1, 1)
+    statuses = ("draft", "processing", "completed", "failed")
+    scene_ids = []
+
+    with engine.begin() as conn:
+        insert_chunked(conn, VideoScript.__table__, (
+            {"id": script_id, "creator_id": user_ids[i % users], "title": f"Script {i}", "description": "",
+             "target_audience": "Developers", "total_duration": 60, "status": statuses[i % len(statuses)],
+             "created_at": base + timedelta(seconds=i)}
+            for i, script_id in enumerate(script_ids)
+        ))
+
+        def scene_rows():
+            for i in range(scenes):
+                scene_id = str(uuid.uuid4())
+                if i % media_every == 0:
+                    scene_ids.append(scene_id)
+                yield {"id": scene_id, "script_id": script_ids[i // scenes_per_script % scripts],
+                       "scene_number": i % scenes_per_script + 1, "description": "Scene", "duration": 4,
+                       "visual_elements": "A city skyline at dawn", "voice_over": "Xin chào",
+                       "created_at": base + timedelta(seconds=i)}
+
+        insert_chunked(conn, Scene.__table__, scene_rows())
+        insert_chunked(conn, SceneImage.__table__, (
+            {"id": str(uuid.uuid4()), "scene_id": scene_id, "image_url": "https://example.com/a.png",
+             "prompt": "A city", "status": "processing" if i % 100 == 0 else "completed",
+             "created_at": base + timedelta(seconds=i)}
+            for i, scene_id in enumerate(scene_ids)
+        ))
+        insert_chunked(conn, VoiceAudio.__table__, (
+            {"id": str(uuid.uuid4()), "scene_id": scene_id, "audio_url": "tts/a.mp3", "text_content": "Xin chào",
+             "status": "completed", "created_at": base + timedelta(seconds=i)}
+            for i, scene_id in enumerate(scene_ids)
+        ))
+    print(f"seeded {scripts} scripts, {scenes} scenes, {len(scene_ids)} images/voices in {time.perf_counter() - started:.1f}s")
+    return user_ids, script_ids, scene_ids
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenes", type=int, default=1000000)
+    parser.add_argument("--scenes-per-script", type=int, default=10)
+    parser.add_argument("--media-every", type=int, default=10)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    db_path = bootstrap_env()
+    from sqlalchemy import text
+    from app.crud import video_script as crud
+    from app.models import Base
+    from app.models.video_script import VideoScript, SceneImage, VoiceAudio
+
+    engine, SessionFactory = make_sqlite_session_factory(f"sqlite:///{db_path}")
+    indexes = [index for table in Base.metadata.sorted_tables for index in table.indexes if index.name in NEW_INDEXES]
+    for index in indexes:
+        index.drop(engine)
+
+    user_ids, script_ids, scene_ids = seed(engine, args.scenes, args.scenes_per_script, args.media_every, args.users)
+    with engine.connect() as conn:
+        conn.execute(text("ANALYZE"))
+
+    queries = {
+        "script with scenes": lambda db: crud.get_script(db, random.choice(script_ids), options=crud.WITH_SCENES),
+        "script images list": lambda db: crud.get_script(db, random.choice(script_ids), options=crud.WITH_SCENE_IMAGES),
+        "latest scene voice": lambda db: (
+            db.query(VoiceAudio)
+            .filter(VoiceAudio.scene_id == random.choice(scene_ids), VoiceAudio.status == "completed")
+            .order_by(VoiceAudio.created_at.desc())
+            .first()
+        ),
+        "user scripts page": lambda db: crud.get_scripts_page(db, limit=20, user_id=random.choice(user_ids)),
+        "user summaries page": lambda db: crud.get_script_summaries(db, user_id=random.choice(user_ids), limit=20),
+        "failed scripts": lambda db: db.query(VideoScript).filter(VideoScript.status == "failed").limit(20).all(),
+        "pending predictions": lambda db: (
+            db.query(SceneImage)
+            .filter(SceneImage.status == "processing")
+            .order_by(SceneImage.created_at)
+            .limit(20)
+            .all()
+        ),
+    }
+
+    def measure():
+        timings = {}
+        for label, query in queries.items():
+            started = time.perf_counter()
+            for _ in range(args.repeat):
+                db = SessionFactory()
+                try:
+                    query(db)
+                finally:
+                    db.close()
+            timings[label] = (time.perf_counter() - started) / args.repeat * 1000
+        return timings
+
+    before = measure()
+    started = time.perf_counter()
+    for index in indexes:
+        index.create(engine)
+    with engine.connect() as conn:
+        conn.execute(text("ANALYZE"))
+    print(f"created {len(indexes)} indexes in {time.perf_counter() - started:.1f}s")
+    after = measure()
+
+    print(f"{'query':<22} {'before (ms)':>12} {'after (ms)':>12} {'speedup':>9}")
+    for label in queries:
+        speedup = before[label] / after[label] if after[label] else float("inf")
+        print(f"{label:<22} {before[label]:12.2f} {after[label]:12.2f} {speedup:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Kiểm tra số query của các endpoint danh sách (SQLite tạm, phát hiện N+1).
+
+Với mỗi kiểu truy cập, đếm số câu lệnh SQL khi nạp dữ liệu và serialize response:
+  - lazy:  không có loader option (mỗi script/scene nạp quan hệ bằng một query riêng)
+  - eager: loader option mà endpoint đang dùng (selectinload)
+  - summary: projection chỉ lấy các cột của màn hình danh sách
+
+Ngân sách số query của các endpoint được kiểm tra trong tests/test_query_counts.py.
+
+Chạy: python benchmarks/bench_query_counts.py --scripts 100 --scenes 10
+"""
+import argparse
+
+from _env import bootstrap_env, make_sqlite_session_factory
+
+
+def seed(SessionFactory, crud, scripts: int, scenes: int) -> str:
+    db = SessionFactory()
+    try:
+        script_ids = crud.create_scripts_bulk(db, [
+            {"title": f"Script {i}", "description": "", "target_audience": "Developers",
+             "total_duration": scenes * 4, "status": "draft", "creator_id": None}
+            for i in range(scripts)
+        ], commit=False)
+        scene_rows = [
+            {"script_id": script_id, "scene_number": number, "description": f"Scene {number}", "duration": 4,
+             "visual_elements": "A city skyline at dawn", "voice_over": "Xin chào"}
+            for script_id in script_ids for number in range(1, scenes + 1)
+        ]
+        scene_ids = crud.create_scenes_bulk(db, scene_rows, commit=False)
+        crud.create_scene_images_bulk(db, [
+            {"scene_id": scene_id, "image_url": "https://example.com/a.png", "prompt": "A city", "status": "completed"}
+            for scene_id in scene_ids
+        ], commit=False)
+        crud.create_voice_audios_bulk(db, [
+            {"scene_id": scene_id, "audio_url": "tts/a.mp3", "text_content": "Xin chào", "status": "completed"}
+            for scene_id in scene_ids
+        ], commit=False)
+        db.commit()
+        return script_ids[0]
+    finally:
+        db.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scripts", type=int, default=100)
+    parser.add_argument("--scenes", type=int, default=10)
+    args = parser.parse_args()
+
+    db_path = bootstrap_env()
+    from app.crud import video_script as crud
+    from app.schemas.video_script import VideoScript, VideoScriptSummary
+    from app.utils.query_counter import count_queries
+
+    engine, SessionFactory = make_sqlite_session_factory(f"sqlite:///{db_path}")
+    script_id = seed(SessionFactory, crud, args.scripts, args.scenes)
+
+    def scripts_list(db, options):
+        return [VideoScript.model_validate(script) for script in crud.get_scripts(db, limit=args.scripts, options=options)]
+
+    def scripts_summary(db, _):
+        rows, _ = crud.get_script_summaries(db, limit=args.scripts)
+        return [VideoScriptSummary(**row) for row in rows]
+
+    def images_list(db, options):
+        script = crud.get_script(db, script_id, options=options)
+        return [(scene.scene_number, image.image_url) for scene in script.scenes for image in scene.images]
+
+    def voices_list(db, options):
+        script = crud.get_script(db, script_id, options=options)
+        return [(scene.scene_number, voice.audio_url) for scene in script.scenes for voice in scene.voice_audios]
+
+    cases = [
+        ("scripts list", scripts_list, crud.WITH_SCENES),
+        ("scripts summary", scripts_summary, None),
+        ("images list", images_list, crud.WITH_SCENE_IMAGES),
+        ("voices list", voices_list, crud.WITH_SCENE_VOICES),
+    ]
+
+    for label, load, options in cases:
+        counts = {}
+        for mode, mode_options in (("lazy", ()), ("eager", options)):
+            if mode_options is None:
+                continue
+            db = SessionFactory()
+            try:
+                with count_queries(engine) as counter:
+                    load(db, mode_options)
+            finally:
+                db.close()
+            counts[mode] = counter.count
+        print(f"{label:<16} " + "  ".join(f"{mode}={count:<6}" for mode, count in counts.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Benchmark: N request đồng thời tới POST /video-scripts/generate với stub LLM local.
+
+So sánh:
+  - blocking: handler gọi requests.post (chặn event loop) như trước đây
+  - async:    handler gọi DeepSeekService qua HTTP client dùng chung
+
+Chạy: python benchmarks/bench_script_generation.py --requests 50 --latency 0.5
+"""
+import argparse
+import asyncio
+import time
+
+from _env import bootstrap_env, make_sqlite_session_factory, report
+from stub_llm import start_stub_llm
+
+
+async def run_round(app, count: int) -> float:
+    import httpx
+
+    payload = {"topic": "Benchmark", "target_audience": "Developers", "duration": 60}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        started = time.perf_counter()
+        responses = await asyncio.gather(
+            *(client.post("/api/video-scripts/generate", json=payload) for _ in range(count))
+        )
+        elapsed = time.perf_counter() - started
+
+    failed = [r for r in responses if r.status_code != 200]
+    if failed:
+        raise RuntimeError(f"{len(failed)} requests failed, first: {failed[0].text}")
+    return elapsed
+
+
+async def run(args) -> None:
+    from fastapi import FastAPI
+    from app.api import video_script
+    from app.core.http_client import close_http_client
+    from app.database import get_db
+
+    engine, SessionFactory = make_sqlite_session_factory(args.database_url)
+
+    def bench_get_db():
+        db = SessionFactory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app = FastAPI()
+    app.include_router(video_script.router, prefix="/api/video-scripts")
+    app.dependency_overrides[get_db] = bench_get_db
+
+    service = video_script.deepseek_service
+    async_impl = service.generate_video_script_async
+
+    async def blocking_impl(topic, target_audience, duration, mode=None):
+        # Tái hiện hành vi cũ: gọi requests.post đồng bộ ngay trong coroutine
+        return service.generate_video_script(topic, target_audience, duration, mode=mode)
+
+    print(f"stub latency={args.latency}s per LLM call, generation mode={args.generation_mode}")
+    if "blocking" in args.modes:
+        service.generate_video_script_async = blocking_impl
+        report("blocking (requests.post)", args.requests, await run_round(app, args.requests))
+    if "async" in args.modes:
+        service.generate_video_script_async = async_impl
+        report("async (pooled httpx)", args.requests, await run_round(app, args.requests))
+
+    from app.core.metrics import metrics
+    for key, stats in metrics.snapshot()["timings"].items():
+        print(f"{key}: count={stats['count']} p50={stats['p50']:.3f}s p95={stats['p95']:.3f}s")
+
+    await close_http_client()
+    engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.5, help="độ trễ giả lập của mỗi LLM call (giây)")
+    parser.add_argument("--generation-mode", default="single", choices=["single", "two_step"])
+    parser.add_argument("--modes", nargs="+", default=["blocking", "async"], choices=["blocking", "async"])
+    args = parser.parse_args()
+
+    server, url = start_stub_llm(args.latency)
+    db_path = bootstrap_env(DEEPSEEK_API_KEY="bench-key", DEEPSEEK_API_URL=url,
+                            DEEPSEEK_GENERATION_MODE=args.generation_mode)
+    args.database_url = f"sqlite:///{db_path}"
+    try:
+        asyncio.run(run(args))
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+Benchmark: POST /voice/script-to-speech/{script_id} với Google TTS giả lập (sleep cố định).
+
+So sánh tạo voice tuần tự (concurrency=1), song song (concurrency=N) và chế độ batch SSML
+(nhiều scene trong một request), kèm số lời gọi API của từng cách.
+
+Chạy: python benchmarks/bench_tts.py --scenes 12 --latency 0.5 --concurrency 6
+"""
+import argparse
+import asyncio
+import os
+import re
+import tempfile
+import time
+from types import SimpleNamespace
+
+from _env import bootstrap_env, make_sqlite_session_factory, report
+
+
+# Frame MPEG-2 Layer III mono 24 kHz 32 kbps: 96 byte, 24 ms
+FAKE_FRAME = bytes([0xFF, 0xF3, 0x44, 0xC4]) + bytes(92)
+FRAME_SECONDS = 0.024
+FRAMES_PER_SEGMENT = 40
+
+
+class FakeTTSClient:
+    """
+    Thay thế TextToSpeechClient (v1 và v1beta1): mỗi request chờ `latency` giây và trả về
+    các frame MP3 giả, kèm timepoint cho mỗi <mark> trong SSML
+    """
+
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    def synthesize_speech(self, request=None, **kwargs):
+        time.sleep(self.latency)
+        ssml = getattr(getattr(request, "input", None), "ssml", "") if request is not None else ""
+        marks = re.findall(r'<mark name="([^"]+)"/>', ssml)
+        segments = max(1, len(marks))
+        timepoints = [
+            SimpleNamespace(mark_name=name, time_seconds=position * FRAMES_PER_SEGMENT * FRAME_SECONDS)
+            for position, name in enumerate(marks)
+        ]
+        return SimpleNamespace(audio_content=FAKE_FRAME * (FRAMES_PER_SEGMENT * segments), timepoints=timepoints)
+
+
+def seed_script(SessionFactory, scene_count: int) -> str:
+    from app.models.video_script import VideoScript, Scene
+
+    db = SessionFactory()
+    try:
+        script = VideoScript(title="Benchmark", description="", target_audience="bench", total_duration=scene_count * 5)
+        db.add(script)
+        db.flush()
+        for number in range(1, scene_count + 1):
+            db.add(Scene(script_id=script.id, scene_number=number, description=f"Scene {number}",
+                         duration=5, voice_over=f"Đây là lời dẫn cho cảnh số {number}."))
+        db.commit()
+        return script.id
+    finally:
+        db.close()
+
+
+async def run_round(app, script_id: str, concurrency: int, batch: bool) -> float:
+    import httpx
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        started = time.perf_counter()
+        response = await client.post(
+            f"/api/voice/script-to-speech/{script_id}",
+            params={"concurrency": concurrency, "batch": batch},
+            json={"text": "", "voice_id": "vi-VN-Wavenet-A", "speed": 1.0}
+        )
+        elapsed = time.perf_counter() - started
+    response.raise_for_status()
+    return elapsed
+
+
+async def run(args) -> None:
+    from fastapi import FastAPI
+    from google.cloud import texttospeech, texttospeech_v1beta1
+
+    # Client giả phải được gắn trước khi router voice khởi tạo GoogleTTSService
+    texttospeech.TextToSpeechClient = lambda: FakeTTSClient(args.latency)
+    texttospeech_v1beta1.TextToSpeechClient = lambda: FakeTTSClient(args.latency)
+
+    from app.api import voice
+    from app.core.database import get_db
+    from app.core.metrics import metrics
+
+    engine, SessionFactory = make_sqlite_session_factory(args.database_url)
+
+    def bench_get_db():
+        db = SessionFactory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app = FastAPI()
+    app.include_router(voice.router, prefix="/api/voice")
+    app.dependency_overrides[get_db] = bench_get_db
+
+    print(f"scenes={args.scenes} tts latency={args.latency}s "
+          f"global limit={voice.google_tts_service.max_concurrency}")
+    rounds = [(f"concurrency={concurrency}", concurrency, False) for concurrency in (1, args.concurrency)]
+    rounds.append(("ssml batch", args.concurrency, True))
+    for label, concurrency, batch in rounds:
+        metrics.reset()
+        script_id = seed_script(SessionFactory, args.scenes)
+        elapsed = await run_round(app, script_id, concurrency, batch)
+        report(label, args.scenes, elapsed)
+        api_calls = sum(
+            metrics.get_counter("tts_requests_total", mode=mode) for mode in ("single", "ssml_batch")
+        )
+        print(f"{'':<28} tts api calls={api_calls}")
+
+    engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenes", type=int, default=12)
+    parser.add_argument("--latency", type=float, default=0.5, help="thời gian giả lập của một lần synthesize_speech (giây)")
+    parser.add_argument("--concurrency", type=int, default=6)
+    args = parser.parse_args()
+
+    # GoogleTTSService chỉ kiểm tra file credentials tồn tại và đọc được
+    creds_fd, creds_path = tempfile.mkstemp(suffix=".json")
+    os.close(creds_fd)
+    db_path = bootstrap_env(
+        GOOGLE_APPLICATION_CREDENTIALS=creds_path,
+        TTS_MAX_CONCURRENCY=str(max(args.concurrency, 1)),
+        # Tắt cache audio để mọi vòng đều gọi TTS giả lập
+        TTS_CACHE_ENABLED="False",
+        MEDIA_ROOT=tempfile.mkdtemp(prefix="bench_media_"),
+    )
+    args.database_url = f"sqlite:///{db_path}"
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
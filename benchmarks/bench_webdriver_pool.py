@@ -0,0 +1,53 @@
+"""
+Microbenchmark: chi phí trình duyệt cho mỗi lần tìm Google (cần Chrome, không gọi mạng).
+
+So sánh:
+  - cold: mỗi lần tìm khởi động rồi đóng Chrome như GoogleSearchService trước đây
+          (pool với max_uses=1)
+  - pool: mượn phiên Chrome đã khởi động từ WebDriverPool
+
+Mỗi lần "tìm" mở about:blank để chỉ đo chi phí phiên trình duyệt.
+
+Chạy: python benchmarks/bench_webdriver_pool.py --iterations 10 --concurrency 2
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from _env import bootstrap_env
+
+
+def measure(label: str, pool, iterations: int, concurrency: int) -> None:
+    from app.core.metrics import metrics
+
+    def search(_):
+        with pool.session() as driver:
+            driver.get("about:blank")
+
+    metrics.reset()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(search, range(iterations)))
+    elapsed = time.perf_counter() - started
+    pool.close()
+    launched = metrics.get_counter("webdriver_sessions_total", event="created")
+    print(f"{label:<6} iterations={iterations:<4} concurrency={concurrency:<3} total={elapsed:8.3f}s  "
+          f"per search={elapsed / iterations * 1000:8.1f} ms  chrome launches={launched:.0f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=2)
+    args = parser.parse_args()
+
+    bootstrap_env()
+    from app.core.webdriver_pool import WebDriverPool, chromedriver_path
+
+    chromedriver_path()  # Tải driver trước để không tính vào lần đo đầu
+    measure("cold", WebDriverPool(args.concurrency, max_uses=1, acquire_timeout=120), args.iterations, args.concurrency)
+    measure("pool", WebDriverPool(args.concurrency, max_uses=1000, acquire_timeout=120), args.iterations, args.concurrency)
+
+
+if __name__ == "__main__":
+    main()
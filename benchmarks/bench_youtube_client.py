@@ -0,0 +1,40 @@
+"""
+Microbenchmark: chi phí khởi tạo YouTube client cho mỗi request (không gọi mạng).
+
+So sánh:
+  - build():               build('youtube', 'v3', ...) mỗi request như trước đây
+                           (đọc và parse discovery document mỗi lần)
+  - get_google_api_client: client tạo một lần cho mỗi thread rồi dùng lại
+
+Chạy: python benchmarks/bench_youtube_client.py --iterations 50
+"""
+import argparse
+import time
+
+from _env import bootstrap_env
+
+
+def measure(label: str, factory, iterations: int) -> None:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        # Tạo request giống handler /search/youtube (không execute)
+        factory().search().list(q="benchmark", part="snippet", maxResults=10, type="video")
+    elapsed = time.perf_counter() - started
+    print(f"{label:<24} iterations={iterations:<5} total={elapsed:8.3f}s  per request={elapsed / iterations * 1000:8.2f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=50)
+    args = parser.parse_args()
+
+    bootstrap_env(YOUTUBE_API_KEY="bench-key")
+    from googleapiclient.discovery import build
+    from app.core.google_api import get_google_api_client
+
+    measure("build()", lambda: build("youtube", "v3", developerKey="bench-key", cache_discovery=False), args.iterations)
+    measure("get_google_api_client", lambda: get_google_api_client("youtube", "v3", "bench-key"), args.iterations)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Stub OpenRouter/DeepSeek chat-completion server chạy local cho benchmark"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+STUB_SCRIPT = {
+    "title": "Benchmark script",
+    "description": "Kịch bản sinh ra bởi stub LLM",
+    "target_audience": "Benchmark",
+    "total_duration": 60,
+    "scenes": [
+        {
+            "scene_number": i,
+            "description": f"Cảnh {i}",
+            "duration": 20,
+            "visual_elements": f"A bright modern studio, scene {i}, soft daylight",
+            "background_music": "Lo-fi",
+            "voice_over": f"Lời thuyết minh cho cảnh {i}."
+        }
+        for i in range(1, 4)
+    ]
+}
+
+
+def start_stub_llm(latency: float, port: int = 0, stream_chunks: int = 40):
+    """
+    Khởi động server stub trong thread nền, trả về (server, url).
+
+    Request có "stream": true nhận SSE với nội dung chia thành `stream_chunks`
+    phần, trải đều trong khoảng `latency` giây.
+    """
+    content = json.dumps(STUB_SCRIPT, ensure_ascii=False)
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            payload = json.loads(self.rfile.read(length) or b"{}")
+            if payload.get("stream"):
+                self._stream()
+                return
+            time.sleep(latency)
+            body = json.dumps({
+                "choices": [{"message": {"role": "assistant", "content": content}}]
+            }).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _stream(self):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            self.close_connection = True
+            size = max(1, len(content) // stream_chunks + 1)
+            for start in range(0, len(content), size):
+                time.sleep(latency / stream_chunks)
+                chunk = {"choices": [{"delta": {"content": content[start:start + size]}}]}
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+                self.wfile.flush()
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/api/v1/chat/completions"
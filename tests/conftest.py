@@ -0,0 +1,116 @@
+"""
+Fixture dùng chung cho test: database SQLite trong bộ nhớ (dùng chung giữa engine sync và
+async của cùng một test) và ứng dụng FastAPI chỉ gồm các router cần kiểm thử.
+"""
+import os
+import uuid
+
+# Settings đọc biến môi trường khi import: đặt trước khi import app, không bao giờ dùng database thật
+os.environ.update({
+    "SECRET_KEY": "test-secret",
+    "ALGORITHM": "HS256",
+    "ACCESS_TOKEN_EXPIRE_MINUTES": "30",
+    "REFRESH_TOKEN_EXPIRE_MINUTES": "10080",
+    "DATABASE_URL": "sqlite://",
+})
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool, StaticPool
+
+from app.api import image, video_script, voice
+from app.core.database import get_async_db
+from app.crud import video_script as crud
+from app.database import get_db
+from app.models import Base
+from app.models.video_script import MediaStatus
+
+
+@pytest.fixture
+def engine():
+    # Shared cache: engine async mở connection riêng nhưng thấy cùng database trong bộ nhớ.
+    # StaticPool giữ một connection mở suốt test để database không bị xoá
+    url = f"sqlite:///file:test_{uuid.uuid4().hex}?mode=memory&cache=shared&uri=true"
+    engine = create_engine(url, connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def async_engine(engine):
+    # NullPool: TestClient chạy app trên event loop riêng, không giữ connection aiosqlite giữa các request
+    return create_async_engine(
+        engine.url.set(drivername="sqlite+aiosqlite").render_as_string(hide_password=False),
+        poolclass=NullPool
+    )
+
+
+@pytest.fixture
+def session_factory(engine):
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+@pytest.fixture
+def client(session_factory, async_engine):
+    async_session_factory = sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+    def override_get_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    async def override_get_async_db():
+        async with async_session_factory() as db:
+            yield db
+
+    app = FastAPI()
+    app.include_router(video_script.router, prefix="/api/video-scripts")
+    app.include_router(image.router, prefix="/api/images")
+    app.include_router(voice.router, prefix="/api/voice")
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def seed_scripts(session_factory):
+    """Tạo `scripts` kịch bản, mỗi kịch bản `scenes` cảnh (tuỳ chọn kèm một ảnh và một voice mỗi cảnh)"""
+    def seed(scripts: int, scenes: int, with_media: bool = True):
+        db = session_factory()
+        try:
+            script_ids = crud.create_scripts_bulk(db, [
+                {"title": f"Script {i}", "description": "", "target_audience": "Developers",
+                 "total_duration": 60, "status": "draft"}
+                for i in range(scripts)
+            ], commit=False)
+            scene_ids = crud.create_scenes_bulk(db, [
+                {"script_id": script_id, "scene_number": number, "description": "Scene", "duration": 4,
+                 "visual_elements": "A city skyline at dawn", "voice_over": "Xin chào",
+                 "image_status": MediaStatus.PENDING.value, "voice_status": MediaStatus.PENDING.value}
+                for script_id in script_ids for number in range(1, scenes + 1)
+            ], commit=False)
+            if with_media:
+                crud.create_scene_images_bulk(db, [
+                    {"scene_id": scene_id, "image_url": "https://example.com/a.png", "prompt": "A city",
+                     "width": 1024, "height": 768, "status": MediaStatus.COMPLETED.value}
+                    for scene_id in scene_ids
+                ], commit=False)
+                crud.create_voice_audios_bulk(db, [
+                    {"scene_id": scene_id, "audio_url": "tts/a.mp3", "text_content": "Xin chào",
+                     "voice_id": "vi", "speed": 1.0, "status": MediaStatus.COMPLETED.value}
+                    for scene_id in scene_ids
+                ], commit=False)
+            db.commit()
+            return script_ids
+        finally:
+            db.close()
+
+    return seed
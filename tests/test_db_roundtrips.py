@@ -0,0 +1,109 @@
+"""
+Số câu lệnh SQL / commit khi lưu nội dung vừa sinh: không được tăng theo số cảnh
+(/video-scripts/generate) và mỗi ảnh hoàn thành được commit ngay (/images/generate-for-script).
+Trạng thái job hàng loạt (/video-scripts/batch) được lưu trong database, không nằm trong bộ nhớ process.
+"""
+import pytest
+
+from app.api import image, video_script
+from app.models.script_batch import ScriptBatchJob
+from app.models.video_script import SceneImage, Scene, MediaStatus
+from app.schemas.video_script import Scene as SceneSchema, VideoScript
+from app.utils.query_counter import count_queries
+
+# INSERT kịch bản, INSERT tất cả cảnh (executemany), SELECT kịch bản, SELECT cảnh (selectinload)
+GENERATE_STATEMENTS = 4
+
+
+def generated_script(scenes: int) -> VideoScript:
+    return VideoScript(
+        title="Generated",
+        description="",
+        target_audience="Developers",
+        total_duration=scenes * 4,
+        scenes=[
+            SceneSchema(scene_number=number, description=f"Scene {number}", duration=4,
+                        visual_elements="A city skyline at dawn", voice_over="Xin chào")
+            for number in range(1, scenes + 1)
+        ]
+    )
+
+
+@pytest.mark.parametrize("scenes", [1, 5, 20])
+def test_generate_statement_count_is_constant(client, async_engine, monkeypatch, scenes):
+    async def fake_generate(**kwargs):
+        return generated_script(scenes)
+
+    monkeypatch.setattr(video_script.deepseek_service, "generate_video_script_async", fake_generate)
+
+    with count_queries(async_engine.sync_engine) as counter:
+        response = client.post("/api/video-scripts/generate", json={
+            "topic": "Benchmark", "target_audience": "Developers", "duration": 60
+        })
+
+    assert response.status_code == 200, response.text
+    assert len(response.json()["scenes"]) == scenes
+    assert counter.count == GENERATE_STATEMENTS, counter.statements
+    assert counter.commits == 1
+
+
+def test_generate_for_script_commits_each_image(client, engine, session_factory, seed_scripts, monkeypatch):
+    script_id = seed_scripts(1, 4, with_media=False)[0]
+
+    async def fake_generate_image(prompt, force_new=False):
+        return "https://example.com/generated.png"
+
+    monkeypatch.setattr(image.image_service, "generate_image_async", fake_generate_image)
+
+    with count_queries(engine) as counter:
+        response = client.post(f"/api/images/generate-for-script/{script_id}")
+
+    assert response.status_code == 200, response.text
+    assert len(response.json()) == 4
+    # Trạng thái processing, một commit cho mỗi ảnh hoàn thành, trạng thái cuối của kịch bản
+    assert counter.commits == 1 + 4 + 1
+
+    db = session_factory()
+    try:
+        assert db.query(SceneImage).join(Scene).filter(Scene.script_id == script_id).count() == 4
+        statuses = {scene.image_status for scene in db.query(Scene).filter(Scene.script_id == script_id)}
+        assert statuses == {MediaStatus.COMPLETED.value}
+    finally:
+        db.close()
+
+
+def test_batch_job_state_is_persisted(client, session_factory, monkeypatch):
+    async def fake_batch(topics, on_result=None, **kwargs):
+        on_result(topics[0], generated_script(2))
+        on_result(topics[1], RuntimeError("LLM timeout"))
+
+    monkeypatch.setattr(video_script.deepseek_service, "generate_video_scripts_batch", fake_batch)
+    monkeypatch.setattr("app.services.script_batch_service.SessionLocal", session_factory)
+
+    response = client.post("/api/video-scripts/batch", json={
+        "topics": ["Alpha", "Beta", " alpha "], "target_audience": "Developers", "duration": 60
+    })
+    assert response.status_code == 202
+    job_id = response.json()["job_id"]
+
+    # Background task đã chạy xong; trạng thái đọc lại từ database
+    response = client.get(f"/api/video-scripts/batch/{job_id}")
+    assert response.status_code == 200
+    job = response.json()
+    assert (job["status"], job["total"], job["completed"], job["failed"], job["duplicates_skipped"]) == (
+        "completed", 2, 1, 1, 1
+    )
+    assert [item["topic"] for item in job["items"]] == ["Alpha", "Beta"]
+    assert job["items"][0]["status"] == MediaStatus.COMPLETED.value
+    assert job["items"][1] == {
+        "topic": "Beta", "status": MediaStatus.FAILED.value, "script_id": None, "error": "LLM timeout"
+    }
+
+    db = session_factory()
+    try:
+        assert db.query(ScriptBatchJob).filter_by(id=job_id).one().finished_at is not None
+        assert db.query(Scene).filter_by(script_id=job["items"][0]["script_id"]).count() == 2
+    finally:
+        db.close()
+
+    assert client.get("/api/video-scripts/batch/missing").status_code == 404
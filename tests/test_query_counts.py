@@ -0,0 +1,67 @@
+"""
+Ngân sách số query của các endpoint danh sách: không phụ thuộc số kịch bản/cảnh,
+test fail nếu endpoint quay lại nạp quan hệ từng bản ghi (N+1).
+"""
+import pytest
+
+from app.utils.query_counter import count_queries
+
+# Số query tối đa (SELECT chính + một SELECT cho mỗi cấp selectinload)
+QUERY_BUDGETS = {
+    "scripts list": 2,
+    "scripts summary": 1,
+    "images list": 3,
+    "voices list": 3,
+}
+
+# Dữ liệu nhỏ và lớn: số query phải như nhau
+SIZES = [(1, 1), (20, 10)]
+
+
+@pytest.mark.parametrize("scripts, scenes", SIZES)
+def test_scripts_list_query_budget(client, async_engine, seed_scripts, scripts, scenes):
+    seed_scripts(scripts, scenes)
+
+    with count_queries(async_engine.sync_engine) as counter:
+        response = client.get("/api/video-scripts/scripts", params={"limit": 100})
+
+    assert response.status_code == 200, response.text
+    assert len(response.json()) == scripts
+    assert all(len(script["scenes"]) == scenes for script in response.json())
+    assert counter.count <= QUERY_BUDGETS["scripts list"], counter.statements
+
+
+@pytest.mark.parametrize("scripts, scenes", SIZES)
+def test_scripts_summary_query_budget(client, async_engine, seed_scripts, scripts, scenes):
+    seed_scripts(scripts, scenes)
+
+    with count_queries(async_engine.sync_engine) as counter:
+        response = client.get("/api/video-scripts/scripts/summary", params={"limit": 100})
+
+    assert response.status_code == 200, response.text
+    assert [summary["scene_count"] for summary in response.json()] == [scenes] * scripts
+    assert counter.count <= QUERY_BUDGETS["scripts summary"], counter.statements
+
+
+@pytest.mark.parametrize("scripts, scenes", SIZES)
+def test_images_list_query_budget(client, async_engine, seed_scripts, scripts, scenes):
+    script_id = seed_scripts(scripts, scenes)[0]
+
+    with count_queries(async_engine.sync_engine) as counter:
+        response = client.get(f"/api/images/list/{script_id}")
+
+    assert response.status_code == 200, response.text
+    assert len(response.json()) == scenes
+    assert counter.count <= QUERY_BUDGETS["images list"], counter.statements
+
+
+@pytest.mark.parametrize("scripts, scenes", SIZES)
+def test_voices_list_query_budget(client, async_engine, seed_scripts, scripts, scenes):
+    script_id = seed_scripts(scripts, scenes)[0]
+
+    with count_queries(async_engine.sync_engine) as counter:
+        response = client.get(f"/api/voice/list/{script_id}")
+
+    assert response.status_code == 200, response.text
+    assert len(response.json()) == scenes
+    assert counter.count <= QUERY_BUDGETS["voices list"], counter.statements